@@ -0,0 +1,416 @@
+"""Time the main stages of solving and drawing a grid, across a ladder of grid sizes.
+
+The results are written as JSON, and compared against a stored baseline of results.
+Any benchmark which has become slower than the baseline allows is timed again, and is
+reported if it is still too slow. With `--fail-on-regression` the exit code is then
+non-zero.
+"""
+
+import argparse
+import gc
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pipes_game import drawer, generator, parser, solver
+from pipes_game.grid import PipesGrid
+
+BENCHMARKS_DIR = pathlib.Path(__file__).parent
+
+# The number of rows and columns of each grid in the ladder
+DEFAULT_SIZES = [16, 64, 256]
+
+# The number of pixels along each side of a cell, when drawing
+CELL_PIXELS = 4
+
+# The minimum total time, in seconds, to run a benchmark for when timing it again
+RETRY_SECONDS = 1.0
+
+# A benchmark takes a grid size, does any setup which shouldn't be timed, and returns
+# the function to time
+Benchmark = Callable[[int], Callable[[], None]]
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+class SkipBenchmark(Exception):
+    """The benchmark can't be run in this environment."""
+
+
+def benchmark(name: str) -> Callable[[Benchmark], Benchmark]:
+    """Register a benchmark.
+
+    :param name: the name of the benchmark
+
+    :returns: a decorator which registers the benchmark
+    """
+
+    def register(func: Benchmark) -> Benchmark:
+        """Register the benchmark.
+
+        :param func: the benchmark
+
+        :returns: the benchmark, unchanged
+        """
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def get_lines(size: int) -> List[str]:
+    """Get the lines of text of a square game grid.
+
+    :param size: the number of rows and columns of the game grid
+
+    :returns: the lines of text of the game grid
+    """
+    return generator.generate(size, size, size * size // 16, seed=size)
+
+
+@benchmark("parser.parse_from_lines")
+def parse_from_lines(size: int) -> Callable[[], None]:
+    """Parse the lines of text of a game grid.
+
+    :param size: the number of rows and columns of the game grid
+
+    :returns: the function to time
+    """
+    lines = get_lines(size)
+    return lambda: parser.parse_from_lines(lines)
+
+
+@benchmark("PipesGrid")
+def pipes_grid(size: int) -> Callable[[], None]:
+    """Construct a game grid from an array.
+
+    :param size: the number of rows and columns of the game grid
+
+    :returns: the function to time
+    """
+    game_grid = parser.parse_from_lines(get_lines(size))
+    array = game_grid.array
+    pipe_labels = game_grid.pipe_labels
+    return lambda: PipesGrid(size, size, array, pipe_labels)
+
+
+@benchmark("solver.iter_solve")
+def iter_solve(size: int) -> Callable[[], None]:
+    """Make forced moves until there are none left.
+
+    :param size: the number of rows and columns of the game grid
+
+    :returns: the function to time
+    """
+    game_grid = parser.parse_from_lines(get_lines(size))
+
+    def run() -> None:
+        """Make forced moves until there are none left."""
+        while True:
+            try:
+                solver.iter_solve(game_grid)
+            except RuntimeError:
+                break
+
+    return run
+
+
+@benchmark("drawer.grid_to_frame")
+def grid_to_frame(size: int) -> Callable[[], None]:
+    """Draw a frame of a game grid.
+
+    :param size: the number of rows and columns of the game grid
+
+    :returns: the function to time
+    """
+    game_grid = parser.parse_from_lines(get_lines(size))
+    return lambda: drawer.grid_to_frame(
+        game_grid, size * CELL_PIXELS, size * CELL_PIXELS
+    )
+
+
+@benchmark("Display.update")
+def display_update(size: int) -> Callable[[], None]:
+    """Show a frame which was drawn straight into the pixel buffer of the display.
+
+    :param size: the number of rows and columns of the game grid
+
+    :raises SkipBenchmark: if there is no display to open a window on
+
+    :returns: the function to time
+    """
+    try:
+        from pipes_game import display  # pylint: disable=import-outside-toplevel
+
+        display_ = display.Display((size * CELL_PIXELS, size * CELL_PIXELS), "Pipes")
+    except (ImportError, ValueError, RuntimeError) as e:
+        raise SkipBenchmark(str(e)) from e
+    game_grid = parser.parse_from_lines(get_lines(size))
+    renderer = drawer.GridRenderer(
+        size * CELL_PIXELS, size * CELL_PIXELS, frame=display_.frame
+    )
+    frame = renderer.render(game_grid)
+    return lambda: display_.update(frame)
+
+
+def time_benchmark(
+    func: Benchmark,
+    size: int,
+    min_runs: int = 5,
+    min_seconds: float = 0.2,
+) -> Dict[str, float]:
+    """Time a benchmark, setting it up afresh for each run.
+
+    Garbage collection is turned off while each run is timed, as `timeit` does, so the
+    times don't depend on the garbage left by whatever ran before.
+
+    :param func: the benchmark
+    :param size: the number of rows and columns of the game grid
+    :param min_runs: the minimum number of times to run the benchmark
+    :param min_seconds: the minimum total time to run the benchmark for
+
+    :returns: the fastest and median times of a run, in seconds, and the number of runs
+    """
+    times = []
+    while len(times) < min_runs or sum(times) < min_seconds:
+        run = func(size)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+        if len(times) >= 1000:
+            break
+    return {"min": min(times), "median": statistics.median(times), "runs": len(times)}
+
+
+def run_benchmarks(sizes: List[int]) -> Dict[str, Dict[str, float]]:
+    """Run every benchmark with each grid size.
+
+    :param sizes: the number of rows and columns of each grid
+
+    :returns: the timings of each benchmark, keyed by "name[size]"
+    """
+    results = {}
+    for name, func in BENCHMARKS.items():
+        for size in sizes:
+            key = f"{name}[{size}]"
+            try:
+                results[key] = time_benchmark(func, size)
+            except SkipBenchmark as e:
+                print(f"{key}: skipped ({e})", file=sys.stderr)
+                break
+            print(f"{key}: {results[key]['min'] * 1000:.3f}ms", file=sys.stderr)
+    return results
+
+
+def split_key(key: str) -> Tuple[str, int]:
+    """Split the key of a result into the name of its benchmark and its grid size.
+
+    :param key: the key of the result, as "name[size]"
+
+    :returns: the name of the benchmark and the number of rows and columns of the grid
+    """
+    name, size = key[:-1].rsplit("[", 1)
+    return name, int(size)
+
+
+def is_regression(
+    result: Dict[str, float],
+    baseline_result: Dict[str, float],
+    max_slowdown: float,
+    min_difference: float,
+) -> bool:
+    """Check whether a benchmark has become slower than its baseline allows.
+
+    :param result: the timings of the benchmark
+    :param baseline_result: the baseline timings of the benchmark
+    :param max_slowdown: the largest allowed ratio of a fastest time to its baseline
+    :param min_difference: the smallest difference, in seconds, between a fastest time
+        and its baseline which counts as a regression
+
+    :returns: True if the benchmark is slower than its baseline allows
+    """
+    fastest, baseline_fastest = result["min"], baseline_result["min"]
+    return (
+        fastest > baseline_fastest * max_slowdown
+        and fastest - baseline_fastest > min_difference
+    )
+
+
+def retry_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    max_slowdown: float,
+    min_difference: float,
+    retries: int,
+) -> None:
+    """Time again each benchmark which has become slower than the baseline allows.
+
+    Another process on the machine can slow down every run of a benchmark, so a
+    benchmark is only reported once it has been too slow each time it was timed. Each
+    attempt runs the benchmark for longer, to see past a busy spell, and the results of
+    the fastest attempt are kept.
+
+    :param results: the timings of each benchmark, which are updated in place
+    :param baseline: the baseline timings of each benchmark
+    :param max_slowdown: the largest allowed ratio of a fastest time to its baseline
+    :param min_difference: the smallest difference, in seconds, between a fastest time
+        and its baseline which counts as a regression
+    :param retries: the most times to time each such benchmark again
+    """
+    for _ in range(retries):
+        keys = [
+            key
+            for key, result in results.items()
+            if key in baseline
+            and is_regression(result, baseline[key], max_slowdown, min_difference)
+        ]
+        if not keys:
+            return
+        for key in keys:
+            name, size = split_key(key)
+            result = time_benchmark(BENCHMARKS[name], size, min_seconds=RETRY_SECONDS)
+            print(f"{key}: {result['min'] * 1000:.3f}ms (retried)", file=sys.stderr)
+            if result["min"] < results[key]["min"]:
+                results[key] = result
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    max_slowdown: float,
+    min_difference: float,
+) -> List[str]:
+    """Find the benchmarks which have become slower than the baseline allows.
+
+    :param results: the timings of each benchmark
+    :param baseline: the baseline timings of each benchmark
+    :param max_slowdown: the largest allowed ratio of a fastest time to its baseline
+    :param min_difference: the smallest difference, in seconds, between a fastest time
+        and its baseline which counts as a regression. It stops the noise in the times
+        of the quickest benchmarks from being reported.
+
+    :returns: a description of each regression
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline or not is_regression(
+            result, baseline[key], max_slowdown, min_difference
+        ):
+            continue
+        fastest, baseline_fastest = result["min"], baseline[key]["min"]
+        regressions.append(
+            f"{key}: {fastest * 1000:.3f}ms, baseline "
+            f"{baseline_fastest * 1000:.3f}ms "
+            f"({fastest / baseline_fastest:.2f}x slower)"
+        )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command-line arguments.
+
+    :param argv: the arguments to parse, or None to parse `sys.argv`
+
+    :returns: the parsed arguments
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        nargs="+",
+        type=int,
+        help="The number of rows and columns of each grid in the ladder",
+    )
+    arg_parser.add_argument(
+        "--output",
+        "-o",
+        default=BENCHMARKS_DIR / "results.json",
+        type=pathlib.Path,
+        help="Path to write the results to",
+    )
+    arg_parser.add_argument(
+        "--baseline",
+        default=BENCHMARKS_DIR / "baseline.json",
+        type=pathlib.Path,
+        help="Path to the baseline results to compare against",
+    )
+    arg_parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the new baseline, rather than comparing against it",
+    )
+    arg_parser.add_argument(
+        "--max-slowdown",
+        default=1.5,
+        type=float,
+        help="The largest allowed ratio of a time to its baseline",
+    )
+    arg_parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with a non-zero code if any time is slower than the baseline allows",
+    )
+    arg_parser.add_argument(
+        "--min-difference",
+        default=0.001,
+        type=float,
+        help="The smallest difference from the baseline, in seconds, to report",
+    )
+    arg_parser.add_argument(
+        "--retries",
+        default=3,
+        type=int,
+        help="The most times to time again a benchmark which is slower than allowed",
+    )
+    return arg_parser.parse_args(argv)
+
+
+def main() -> None:
+    """Run the benchmarks."""
+    args = parse_args()
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": run_benchmarks(args.sizes),
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Stored the baseline in {args.baseline}", file=sys.stderr)
+        sys.exit(0)
+    if not args.baseline.exists():
+        print(f"No baseline to compare against at {args.baseline}", file=sys.stderr)
+        sys.exit(0)
+
+    baseline = json.loads(args.baseline.read_text())["results"]
+    retry_regressions(
+        report["results"],
+        baseline,
+        args.max_slowdown,
+        args.min_difference,
+        args.retries,
+    )
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    regressions = find_regressions(
+        report["results"],
+        baseline,
+        args.max_slowdown,
+        args.min_difference,
+    )
+    for regression in regressions:
+        print(f"Regression in {regression}", file=sys.stderr)
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+
+if __name__ == "__main__":
+    main()
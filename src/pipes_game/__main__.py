@@ -2,70 +2,603 @@
 
 import argparse
 import pathlib
+import sys
+from typing import List, Optional
 
-from . import display, drawer, parser, solver
-from .gobject import GLib
+from . import background, batch, cache, generator, parser, solver
+from .grid import PipesGrid
 
 
-def parse_args() -> argparse.Namespace:
+def _parse_int_at_least(value: str, minimum: int) -> int:
+    """Parse a command-line argument which must be a whole number of at least a minimum.
+
+    :param value: the argument
+    :param minimum: the smallest number allowed
+
+    :returns: the number
+
+    :raises argparse.ArgumentTypeError: if the argument is not a number, or is less
+        than `minimum`
+    """
+    try:
+        number = int(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from e
+    if number < minimum:
+        raise argparse.ArgumentTypeError(f"must be at least {minimum}: {number}")
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """Parse a command-line argument which must be a whole number of at least 0.
+
+    :param value: the argument
+
+    :returns: the number
+
+    :raises argparse.ArgumentTypeError: if the argument is not a number, or is negative
+    """
+    return _parse_int_at_least(value, 0)
+
+
+def positive_int(value: str) -> int:
+    """Parse a command-line argument which must be a whole number of at least 1.
+
+    :param value: the argument
+
+    :returns: the number
+
+    :raises argparse.ArgumentTypeError: if the argument is not a number, or is less
+        than 1
+    """
+    return _parse_int_at_least(value, 1)
+
+
+def parse_args(  # pylint: disable=too-many-statements
+    argv: Optional[List[str]] = None,
+) -> argparse.Namespace:
     """Parse the command-line arguments.
 
+    :param argv: the arguments to parse, or None to parse `sys.argv`
+
     :returns: the parsed arguments
     """
     arg_parser = argparse.ArgumentParser()
-    arg_parser.add_argument(
+    subparsers = arg_parser.add_subparsers(
+        dest="command",
+        metavar="COMMAND",
+        required=True,
+    )
+
+    show_parser = subparsers.add_parser(
+        "show",
+        help="Solve a grid in a window (the default command)",
+    )
+    show_parser.set_defaults(func=show)
+    show_parser.add_argument(
         "grid_file",
         metavar="FILE",
         type=pathlib.Path,
         help="Path to the grid file to solve",
     )
-    arg_parser.add_argument(
+    show_parser.add_argument(
         "--width",
         default=500,
         type=int,
         help="Default width of app in pixels",
     )
-    arg_parser.add_argument(
+    show_parser.add_argument(
         "--height",
         default=500,
         type=int,
         help="Default height of app in pixels",
     )
-    arg_parser.add_argument(
+    show_parser.add_argument(
         "--refresh-rate",
         default=200,
         type=int,
-        help="The refresh rate of the solver, in milliseconds",
+        help="The refresh rate of the display, in milliseconds",
+    )
+    show_parser.add_argument(
+        "--timeout",
+        default=None,
+        type=float,
+        help="Give up on the grid after searching for this many seconds",
     )
-    return arg_parser.parse_args()
 
+    solve_parser = subparsers.add_parser(
+        "solve",
+        help="Solve a grid without a display, spreading the search across processes",
+    )
+    solve_parser.set_defaults(func=solve_grid)
+    solve_parser.add_argument(
+        "grid_file",
+        metavar="FILE",
+        type=pathlib.Path,
+        help="Path to the grid file to solve",
+    )
+    solve_parser.add_argument(
+        "--workers",
+        "-j",
+        default=None,
+        type=positive_int,
+        help="The number of processes to search with (default: one per CPU)",
+    )
+    solve_parser.add_argument(
+        "--max-nodes",
+        default=None,
+        type=int,
+        help="Give up on the grid after searching this many nodes",
+    )
+    solve_parser.add_argument(
+        "--timeout",
+        default=None,
+        type=float,
+        help="Give up on the grid after searching for this many seconds",
+    )
+    solve_parser.add_argument(
+        "--backend",
+        default="search",
+        choices=batch.BACKENDS,
+        help="The solver to use. The sat backend runs in a single process.",
+    )
+    solve_parser.add_argument(
+        "--decompose",
+        action="store_true",
+        help="Solve the independent parts of the grid separately, across processes",
+    )
+    solve_parser.add_argument(
+        "--cache",
+        default=None,
+        type=pathlib.Path,
+        help="Path to a database of solutions to look the grid up in, and to add its "
+        "solution to",
+    )
 
-def main() -> None:
-    """Run the CLI."""
-    args = parse_args()
+    batch_parser = subparsers.add_parser(
+        "batch",
+        help="Solve many grids without a display, writing the results as JSON Lines",
+    )
+    batch_parser.set_defaults(func=solve_batch)
+    batch_parser.add_argument(
+        "paths",
+        metavar="PATH",
+        nargs="+",
+        type=pathlib.Path,
+        help="Path to a grid file, or to a directory to search for *.txt grid files",
+    )
+    batch_parser.add_argument(
+        "--output",
+        "-o",
+        default="-",
+        type=argparse.FileType("w"),
+        help="Path to write the results to, or - for stdout",
+    )
+    batch_parser.add_argument(
+        "--workers",
+        "-j",
+        default=None,
+        type=positive_int,
+        help="The number of processes to solve with (default: one per CPU)",
+    )
+    batch_parser.add_argument(
+        "--max-nodes",
+        default=None,
+        type=int,
+        help="Give up on a grid after searching this many nodes",
+    )
+    batch_parser.add_argument(
+        "--timeout",
+        default=None,
+        type=float,
+        help="Give up on a grid after searching for this many seconds",
+    )
+    batch_parser.add_argument(
+        "--backend",
+        default="search",
+        choices=batch.BACKENDS,
+        help="The solver to use",
+    )
+    batch_parser.add_argument(
+        "--table-size",
+        default=solver.DEFAULT_TABLE_SIZE,
+        type=non_negative_int,
+        help="The number of refuted search states to remember for each grid, or 0 "
+        "to not remember any",
+    )
+    batch_parser.add_argument(
+        "--cache",
+        default=None,
+        type=pathlib.Path,
+        help="Path to a database of solutions to look each grid up in, and to add "
+        "their solutions to",
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Solve grids sent as JSON Lines to a Unix socket, until interrupted",
+    )
+    serve_parser.set_defaults(func=serve)
+    serve_parser.add_argument(
+        "socket",
+        metavar="SOCKET",
+        type=pathlib.Path,
+        help="Path of the Unix socket to listen on",
+    )
+    serve_parser.add_argument(
+        "--workers",
+        "-j",
+        default=None,
+        type=positive_int,
+        help="The number of processes to solve with (default: one per CPU)",
+    )
+    serve_parser.add_argument(
+        "--queue-size",
+        default=None,
+        type=int,
+        help="The number of grids which can wait to be solved, before no more "
+        "requests are read (default: 64)",
+    )
+    serve_parser.add_argument(
+        "--max-nodes",
+        default=None,
+        type=int,
+        help="Give up on a grid after searching this many nodes",
+    )
+    serve_parser.add_argument(
+        "--timeout",
+        default=None,
+        type=float,
+        help="Give up on a grid after searching for this many seconds",
+    )
+    serve_parser.add_argument(
+        "--backend",
+        default="search",
+        choices=batch.BACKENDS,
+        help="The solver to use",
+    )
+    serve_parser.add_argument(
+        "--cache",
+        default=None,
+        type=pathlib.Path,
+        help="Path to a database of solutions to look each grid up in, and to add "
+        "their solutions to",
+    )
+
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Record a solve of a grid to a video file or image sequence",
+    )
+    export_parser.set_defaults(func=export_solve)
+    export_parser.add_argument(
+        "grid_file",
+        metavar="FILE",
+        type=pathlib.Path,
+        help="Path to the grid file to solve",
+    )
+    export_parser.add_argument(
+        "output",
+        metavar="OUTPUT",
+        type=pathlib.Path,
+        help="Path to a .mp4 or .avi file, or to a directory to write PNG frames to",
+    )
+    export_parser.add_argument(
+        "--width",
+        default=500,
+        type=int,
+        help="Width of the frames in pixels",
+    )
+    export_parser.add_argument(
+        "--height",
+        default=500,
+        type=int,
+        help="Height of the frames in pixels",
+    )
+    export_parser.add_argument(
+        "--every",
+        default=1,
+        type=positive_int,
+        help="Record a frame every this many moves",
+    )
+    export_parser.add_argument(
+        "--fps",
+        default=30,
+        type=float,
+        help="The number of frames per second of a video file",
+    )
+    export_parser.add_argument(
+        "--max-nodes",
+        default=None,
+        type=int,
+        help="Give up on the grid after searching this many nodes",
+    )
+    export_parser.add_argument(
+        "--timeout",
+        default=None,
+        type=float,
+        help="Give up on the grid after searching for this many seconds",
+    )
+
+    generate_parser = subparsers.add_parser(
+        "generate",
+        help="Generate a random grid which is known to have a solution",
+    )
+    generate_parser.set_defaults(func=generate_grid)
+    generate_parser.add_argument(
+        "num_cols",
+        metavar="COLS",
+        type=int,
+        help="The number of columns in the grid",
+    )
+    generate_parser.add_argument(
+        "num_rows",
+        metavar="ROWS",
+        type=int,
+        help="The number of rows in the grid",
+    )
+    generate_parser.add_argument(
+        "num_pipes",
+        metavar="PIPES",
+        type=int,
+        help=(
+            "The number of pipes in the grid. It must be at least 1 + half the "
+            "shorter side, rounded down. It can be at most a quarter of the cells, or "
+            "that minimum if it is more, and at most the number of pipe labels"
+        ),
+    )
+    generate_parser.add_argument(
+        "--seed",
+        default=None,
+        type=int,
+        help="Seed the random number generator, to generate the same grid every time",
+    )
+    generate_parser.add_argument(
+        "--solution",
+        action="store_true",
+        help="Write the solution of the grid rather than the grid itself",
+    )
+    generate_parser.add_argument(
+        "--output",
+        "-o",
+        default="-",
+        type=argparse.FileType("w", encoding="utf-8"),
+        help="Path to write the grid to, or - for stdout",
+    )
+
+    if argv is None:
+        argv = sys.argv[1:]
+    # Running without a command shows a grid, as the CLI did before it had commands
+    if argv and argv[0] not in subparsers.choices and argv[0] not in ("-h", "--help"):
+        argv = ["show", *argv]
+    return arg_parser.parse_args(argv)
+
+
+def show(args: argparse.Namespace) -> int:
+    """Solve a grid in a window.
+
+    :param args: the parsed arguments
+
+    :returns: the exit code
+    """
+    # pylint: disable=import-outside-toplevel
+    from . import display, drawer
+    from .gobject import GLib
 
     display_ = display.Display((args.width, args.height), "Pipes")
 
     game_grid = parser.parse_from_file(args.grid_file)
-    frame = drawer.grid_to_frame(game_grid, args.width, args.height)
-    display_.update(frame)
+    renderer = drawer.GridRenderer(args.width, args.height, frame=display_.frame)
+    display_.update(renderer.render(game_grid))
+
+    solver_thread = background.SolverThread(game_grid, timeout=args.timeout)
 
     def update() -> bool:
-        """Update the game grid and display.
+        """Update the display with the latest state of the solver.
 
-        :returns: True while the game grid is unsolved, thus meaning that the callback
-            is called against to iterate the solve
+        :returns: True while the solver is running, thus meaning that the callback is
+            called again to update the display
         """
-        solver.iter_solve(game_grid)
-        frame = drawer.grid_to_frame(game_grid, args.width, args.height)
-        display_.update(frame)
-        if complete := game_grid.is_complete():
+        # Check before taking the snapshot, so the final one isn't missed
+        running = solver_thread.is_alive()
+        if (snapshot := solver_thread.take_snapshot()) is not None:
+            display_.update(renderer.render(snapshot))
+
+        if running:
+            return True
+        if solver_thread.solution is not None:
             print("Game is fully solved!")
-        return not complete
+        else:
+            print(f"Game could not be solved: {solver_thread.error}")
+        return False
 
+    solver_thread.start()
     GLib.timeout_add(args.refresh_rate, update)
 
     display_.start()
+    return 0
+
+
+def solve_grid(args: argparse.Namespace) -> int:
+    """Solve a grid without a display, writing the solution to stdout.
+
+    :param args: the parsed arguments
+
+    :returns: the exit code, which is non-zero if the grid was not solved
+    """
+    # pylint: disable=import-outside-toplevel
+    from . import parallel, sat
+
+    if (game_grid := read_grid_file(args.grid_file)) is None:
+        return 1
+    lines = parser.grid_to_lines(game_grid)
+    if args.cache is not None:
+        with cache.SolutionCache(args.cache) as solution_cache:
+            cached = solution_cache.get(lines)
+        if cached is not None:
+            print("\n".join(cached))
+            print("Found the solution in the cache", file=sys.stderr)
+            return 0
+
+    if args.backend == "sat":
+        search = sat.SatSolver(max_nodes=args.max_nodes, timeout=args.timeout)
+    else:
+        solver_type = parallel.ParallelSolver
+        if args.decompose:
+            solver_type = parallel.ComponentSolver
+        search = solver_type(
+            workers=args.workers,
+            max_nodes=args.max_nodes,
+            timeout=args.timeout,
+        )
+    try:
+        solution = search.solve(game_grid)
+    except (solver.UnsolvableError, solver.SearchLimitError) as e:
+        print(f"Game could not be solved: {e}", file=sys.stderr)
+        return 1
+
+    solution_lines = parser.grid_to_lines(solution)
+    if args.cache is not None:
+        with cache.SolutionCache(args.cache) as solution_cache:
+            solution_cache.put(lines, solution_lines)
+    print("\n".join(solution_lines))
+    print(f"Solved after {search.nodes} search nodes", file=sys.stderr)
+    return 0
+
+
+def solve_batch(args: argparse.Namespace) -> int:
+    """Solve many grids without a display.
+
+    :param args: the parsed arguments
+
+    :returns: the exit code, which is non-zero if any grid was not solved
+    """
+    with args.output:
+        statuses = batch.run_batch(
+            args.paths,
+            args.output,
+            workers=args.workers,
+            max_nodes=args.max_nodes,
+            timeout=args.timeout,
+            table_size=args.table_size or None,
+            backend=args.backend,
+            cache_path=args.cache,
+        )
+    summary = ", ".join(
+        f"{count} {status}" for status, count in sorted(statuses.items())
+    )
+    print(f"Batch finished: {summary or 'no grids found'}", file=sys.stderr)
+    return 0 if set(statuses) <= {"solved"} else 1
+
+
+def serve(args: argparse.Namespace) -> int:
+    """Solve grids sent to a Unix socket, until interrupted.
+
+    :param args: the parsed arguments
+
+    :returns: the exit code
+    """
+    # pylint: disable=import-outside-toplevel
+    import asyncio
+
+    from . import server
+
+    queue_size = args.queue_size
+    if queue_size is None:
+        queue_size = server.DEFAULT_QUEUE_SIZE
+    solve_server = server.SolveServer(
+        args.socket,
+        workers=args.workers,
+        queue_size=queue_size,
+        max_nodes=args.max_nodes,
+        timeout=args.timeout,
+        backend=args.backend,
+        cache_path=args.cache,
+    )
+    print(f"Listening on {args.socket}", file=sys.stderr)
+    try:
+        asyncio.run(solve_server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def export_solve(args: argparse.Namespace) -> int:
+    """Record a solve of a grid without a display.
+
+    :param args: the parsed arguments
+
+    :returns: the exit code, which is non-zero if the grid was not solved
+    """
+    # pylint: disable=import-outside-toplevel
+    from . import export
+
+    if (game_grid := read_grid_file(args.grid_file)) is None:
+        return 1
+    try:
+        frames = export.export_solve(
+            game_grid,
+            args.output,
+            args.width,
+            args.height,
+            every=args.every,
+            fps=args.fps,
+            max_nodes=args.max_nodes,
+            timeout=args.timeout,
+        )
+    except (solver.UnsolvableError, solver.SearchLimitError) as e:
+        print(f"Game could not be solved: {e}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f"Solve could not be recorded to {args.output}: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Wrote {frames} frames to {args.output}", file=sys.stderr)
+    return 0
+
+
+def read_grid_file(grid_file: pathlib.Path) -> Optional[PipesGrid]:
+    """Parse a grid file, reporting why it can't be parsed on stderr.
+
+    :param grid_file: the path to the grid file
+
+    :returns: the game grid, or None if the file can't be read or is not a valid grid
+    """
+    try:
+        return parser.parse_from_file(grid_file)
+    except (OSError, ValueError) as e:
+        print(f"Grid could not be read from {grid_file}: {e}", file=sys.stderr)
+        return None
+
+
+def generate_grid(args: argparse.Namespace) -> int:
+    """Generate a random grid which is known to have a solution.
+
+    :param args: the parsed arguments
+
+    :returns: the exit code
+    """
+    try:
+        lines = generator.generate(
+            args.num_cols,
+            args.num_rows,
+            args.num_pipes,
+            seed=args.seed,
+            solution=args.solution,
+        )
+    except ValueError as e:
+        print(f"Grid could not be generated: {e}", file=sys.stderr)
+        return 1
+
+    with args.output:
+        for line in lines:
+            args.output.write(line + "\n")
+    return 0
+
+
+def main() -> None:
+    """Run the CLI."""
+    args = parse_args()
+    sys.exit(args.func(args))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""Solve a game grid in a background thread, for display by a UI."""
+
+import threading
+from typing import Optional
+
+from . import solver
+from .grid import PipesGrid
+
+
+class SolverThread(threading.Thread):
+    """Thread which solves a game grid, publishing snapshots of the search.
+
+    The search runs as fast as it can, independently of how often snapshots are taken.
+    A snapshot is only copied from the search after one has been asked for, and only
+    the latest snapshot is kept, so intermediate states are skipped rather than queued.
+    """
+
+    def __init__(
+        self,
+        game_grid: PipesGrid,
+        max_nodes: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Create a new instance of `SolverThread`.
+
+        :param game_grid: the game grid to solve. It is not modified.
+        :param max_nodes: the maximum number of search nodes to visit before giving
+            up, or None for no limit
+        :param timeout: the maximum number of seconds to search for before giving up,
+            or None for no limit
+        """
+        super().__init__(name="solver", daemon=True)
+        self._game_grid = game_grid
+        self._search = solver.SearchSolver(
+            max_nodes=max_nodes,
+            timeout=timeout,
+            observer=self._observe,
+        )
+        self._lock = threading.Lock()
+        self._snapshot_wanted = threading.Event()
+        self._snapshot_wanted.set()
+        self._snapshot = None
+
+        self.solution: Optional[PipesGrid] = None
+        self.error: Optional[Exception] = None
+
+    def run(self) -> None:
+        """Solve the game grid, recording the solution or the reason there isn't one."""
+        try:
+            self.solution = self._search.solve(self._game_grid)
+        # Any error is kept for the UI to report, rather than ending the thread silently
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.error = e
+        else:
+            with self._lock:
+                self._snapshot = self.solution
+
+    def _observe(self, game_grid: PipesGrid) -> None:
+        """Copy the working game grid if a snapshot has been asked for.
+
+        :param game_grid: the working game grid of the search
+        """
+        if self._snapshot_wanted.is_set():
+            self._snapshot_wanted.clear()
+            snapshot = game_grid.copy()
+            with self._lock:
+                self._snapshot = snapshot
+
+    def take_snapshot(self) -> Optional[PipesGrid]:
+        """Take the latest snapshot of the search, and ask for another.
+
+        Once the search has finished, the final snapshot is the solution, if there is
+        one.
+
+        :returns: the latest snapshot, or None if there is no new snapshot since the
+            previous call
+        """
+        with self._lock:
+            snapshot, self._snapshot = self._snapshot, None
+        self._snapshot_wanted.set()
+        return snapshot
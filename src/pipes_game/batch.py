@@ -0,0 +1,256 @@
+"""Solve many grid files at once, without a display."""
+
+import collections
+import concurrent.futures
+import functools
+import json
+import time
+from pathlib import Path
+from typing import Callable, Counter, Iterable, List, Optional, TextIO
+
+from . import cache, parser, sat, solver
+from .grid import PipesGrid
+
+# The solvers which can be used, by name
+BACKENDS = ("search", "sat")
+
+
+def find_grid_files(paths: Iterable[Path], pattern: str = "*.txt") -> List[Path]:
+    """Find the grid files to solve.
+
+    :param paths: paths to grid files, or to directories to search for grid files
+    :param pattern: the glob pattern that grid files within directories must match
+
+    :returns: the paths of the grid files, with those found in each directory sorted
+    """
+    grid_files = []
+    for path in paths:
+        if path.is_dir():
+            grid_files.extend(sorted(p for p in path.rglob(pattern) if p.is_file()))
+        else:
+            grid_files.append(path)
+    return grid_files
+
+
+def solve_file(  # pylint: disable=too-many-arguments
+    path: Path,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    table_size: Optional[int] = solver.DEFAULT_TABLE_SIZE,
+    backend: str = "search",
+    cache_path: Optional[Path] = None,
+) -> dict:
+    """Solve a grid file, catching any failure to do so.
+
+    :param path: the path to the grid file
+    :param max_nodes: the maximum number of search nodes to visit before giving up, or
+        None for no limit
+    :param timeout: the maximum number of seconds to search for before giving up, or
+        None for no limit
+    :param table_size: the maximum number of refuted search states to remember, or
+        None to not remember any. Only used by the "search" backend.
+    :param backend: the solver to use, one of `BACKENDS`
+    :param cache_path: the path to a `cache.SolutionCache` to look the grid up in
+        before solving it, and to add its solution to, or None to not use a cache
+
+    :returns: a JSON-serialisable record of the result. Its "status" is one of
+        "solved", "unsolvable", "gave-up" or "invalid".
+    """
+    return _solve(
+        {"file": str(path)},
+        functools.partial(parser.parse_from_file, path),
+        max_nodes,
+        timeout,
+        table_size,
+        backend,
+        cache_path,
+    )
+
+
+def solve_lines(  # pylint: disable=too-many-arguments
+    lines: List[str],
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    table_size: Optional[int] = solver.DEFAULT_TABLE_SIZE,
+    backend: str = "search",
+    cache_path: Optional[Path] = None,
+) -> dict:
+    """Solve a grid given as lines of text, catching any failure to do so.
+
+    :param lines: the lines of the grid, as parsed by `parser.parse_from_lines`
+    :param max_nodes: the maximum number of search nodes to visit before giving up, or
+        None for no limit
+    :param timeout: the maximum number of seconds to search for before giving up, or
+        None for no limit
+    :param table_size: the maximum number of refuted search states to remember, or
+        None to not remember any. Only used by the "search" backend.
+    :param backend: the solver to use, one of `BACKENDS`
+    :param cache_path: the path to a `cache.SolutionCache` to look the grid up in
+        before solving it, and to add its solution to, or None to not use a cache
+
+    :returns: a JSON-serialisable record of the result, as from `solve_file`
+    """
+    return _solve(
+        {},
+        functools.partial(parser.parse_from_lines, lines),
+        max_nodes,
+        timeout,
+        table_size,
+        backend,
+        cache_path,
+    )
+
+
+def _solve(  # pylint: disable=too-many-arguments
+    result: dict,
+    load: Callable[[], PipesGrid],
+    max_nodes: Optional[int],
+    timeout: Optional[float],
+    table_size: Optional[int],
+    backend: str,
+    cache_path: Optional[Path],
+) -> dict:
+    """Load and solve a grid, catching any failure to do so.
+
+    :param result: the record of the result to fill in
+    :param load: loads the grid
+    :param max_nodes: the maximum number of search nodes to visit before giving up, or
+        None for no limit
+    :param timeout: the maximum number of seconds to search for before giving up, or
+        None for no limit
+    :param table_size: the maximum number of refuted search states to remember, or
+        None to not remember any
+    :param backend: the solver to use, one of `BACKENDS`
+    :param cache_path: the path to a `cache.SolutionCache`, or None to not use a cache
+
+    :returns: the record of the result
+    """
+    result["backend"] = backend
+    start = time.perf_counter()
+    try:
+        game_grid = load()
+        parsed = time.perf_counter()
+        result["parse_seconds"] = parsed - start
+
+        lines = parser.grid_to_lines(game_grid)
+        if cache_path is not None:
+            with cache.SolutionCache(cache_path) as solution_cache:
+                cached = solution_cache.get(lines)
+            result["cached"] = cached is not None
+            if cached is not None:
+                result.update(
+                    status="solved",
+                    solution=cached,
+                    solve_seconds=time.perf_counter() - parsed,
+                )
+                return result
+
+        try:
+            solution = _search(game_grid, result, max_nodes, timeout, table_size)
+        finally:
+            result["solve_seconds"] = time.perf_counter() - parsed
+    except (OSError, ValueError) as e:
+        result.update(status="invalid", error=str(e))
+    except solver.UnsolvableError as e:
+        result.update(status="unsolvable", error=str(e))
+    except solver.SearchLimitError as e:
+        result.update(status="gave-up", error=str(e))
+    else:
+        result.update(status="solved", solution=parser.grid_to_lines(solution))
+        if cache_path is not None:
+            with cache.SolutionCache(cache_path) as solution_cache:
+                solution_cache.put(lines, result["solution"])
+
+    return result
+
+
+def _search(
+    game_grid: PipesGrid,
+    result: dict,
+    max_nodes: Optional[int],
+    timeout: Optional[float],
+    table_size: Optional[int],
+) -> PipesGrid:
+    """Solve a game grid with the backend named in a result, recording its stats.
+
+    :param game_grid: the game grid to solve
+    :param result: the record of the result, which has the "backend" to use, and is
+        updated with the stats of the solver
+    :param max_nodes: the maximum number of search nodes to visit before giving up, or
+        None for no limit
+    :param timeout: the maximum number of seconds to search for before giving up, or
+        None for no limit
+    :param table_size: the maximum number of refuted search states to remember, or
+        None to not remember any
+
+    :returns: the solved game grid
+
+    :raises UnsolvableError: if the game grid has no solution
+    :raises SearchLimitError: if the node or time limit has been exceeded
+    """
+    if result["backend"] == "sat":
+        search = sat.SatSolver(max_nodes=max_nodes, timeout=timeout)
+    else:
+        search = solver.SearchSolver(
+            max_nodes=max_nodes,
+            timeout=timeout,
+            table_size=table_size,
+        )
+    try:
+        return search.solve(game_grid)
+    finally:
+        result["nodes"] = search.nodes
+        if result["backend"] == "sat":
+            result["conflicts"] = search.conflicts
+        else:
+            result["rule_hits"] = dict(search.rule_hits)
+            if search.table is not None:
+                result["table_hit_rate"] = search.table.hit_rate
+
+
+def run_batch(  # pylint: disable=too-many-arguments
+    paths: Iterable[Path],
+    output: TextIO,
+    *,
+    workers: Optional[int] = None,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    table_size: Optional[int] = solver.DEFAULT_TABLE_SIZE,
+    backend: str = "search",
+    cache_path: Optional[Path] = None,
+) -> Counter[str]:
+    """Solve grid files across a pool of processes.
+
+    A JSON Lines record of each result is written to `output` as soon as it is ready,
+    so results are not written in the same order as `paths`.
+
+    :param paths: paths to grid files, or to directories to search for grid files
+    :param output: the file to write the results to
+    :param workers: the number of processes to solve with, or None for one per CPU
+    :param max_nodes: the maximum number of search nodes to visit before giving up on a
+        grid, or None for no limit
+    :param timeout: the maximum number of seconds to search for before giving up on a
+        grid, or None for no limit
+    :param table_size: the maximum number of refuted search states to remember for
+        each grid, or None to not remember any
+    :param backend: the solver to use, one of `BACKENDS`
+    :param cache_path: the path to a `cache.SolutionCache` to look each grid up in
+        before solving it, or None to not use a cache
+
+    :returns: the number of results with each status
+    """
+    statuses = collections.Counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                solve_file, path, max_nodes, timeout, table_size, backend, cache_path
+            )
+            for path in find_grid_files(paths)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            statuses[result["status"]] += 1
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+    return statuses
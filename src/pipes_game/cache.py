@@ -0,0 +1,152 @@
+"""Remember the solutions of game grids on disk, across runs."""
+
+import sqlite3
+from pathlib import Path
+from types import TracebackType
+from typing import List, Optional, Type
+
+from . import canonical
+
+# The default maximum total size of the cached solutions, in bytes
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class SolutionCache:
+    """An SQLite database of solutions, keyed by the canonical form of their grids.
+
+    A game grid which is a rotation, reflection or relabelling of one already solved
+    is thus found in the cache, and the cached solution is mapped back onto it. When
+    the solutions add up to more than the maximum size, the least recently used are
+    evicted.
+
+    The database can be shared by many processes at once.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """Create a new instance of `SolutionCache`, creating the database if needed.
+
+        :param path: the path to the database file
+        :param max_bytes: the maximum total size of the cached solutions, in bytes
+
+        :raises ValueError: if `max_bytes` is less than 1
+        """
+        if max_bytes < 1:
+            raise ValueError("Solution cache must hold at least 1 byte")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS solutions ("
+            "key TEXT PRIMARY KEY, solution TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)"
+        )
+
+    def __enter__(self) -> "SolutionCache":
+        """Use the cache in a `with` statement, which closes it at the end.
+
+        :returns: the cache
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the cache at the end of a `with` statement.
+
+        :param exc_type: the type of the exception raised in the block, if any
+        :param exc_value: the exception raised in the block, if any
+        :param traceback: the traceback of the exception raised in the block, if any
+        """
+        self.close()
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def __len__(self) -> int:
+        """Count the solutions in the cache.
+
+        :returns: the number of solutions
+        """
+        return self._connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def get(self, lines: List[str]) -> Optional[List[str]]:
+        """Look up the solution of a game grid, counting the lookup as a hit or a miss.
+
+        :param lines: the lines of the game grid, as parsed by
+            `parser.parse_from_lines`
+
+        :returns: the lines of the solution, or None if it is not in the cache
+        """
+        form = canonical.canonicalise(lines)
+        row = self._connection.execute(
+            "SELECT solution FROM solutions WHERE key = ?", (form.key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._connection.execute(
+            "UPDATE solutions SET last_used = ? WHERE key = ?",
+            (self._next_use(), form.key),
+        )
+        return canonical.from_canonical(form, row[0].split("\n"))
+
+    def put(self, lines: List[str], solution: List[str]) -> None:
+        """Add the solution of a game grid, evicting others if the cache is full.
+
+        :param lines: the lines of the game grid, as parsed by
+            `parser.parse_from_lines`
+        :param solution: the lines of its solution
+        """
+        form = canonical.canonicalise(lines)
+        text = "\n".join(canonical.to_canonical(form, solution))
+        with self._transaction():
+            self._connection.execute(
+                "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                (form.key, text, len(text.encode()), self._next_use()),
+            )
+            self._evict()
+
+    def _transaction(self) -> sqlite3.Connection:
+        """Start a transaction, which is committed at the end of a `with` statement.
+
+        :returns: the connection, as the context manager of the transaction
+        """
+        self._connection.execute("BEGIN IMMEDIATE")
+        return self._connection
+
+    def _next_use(self) -> int:
+        """Get the next value of the counter which orders the uses of solutions.
+
+        :returns: the value
+        """
+        return self._connection.execute(
+            "SELECT COALESCE(MAX(last_used), 0) + 1 FROM solutions"
+        ).fetchone()[0]
+
+    def _evict(self) -> None:
+        """Delete the least recently used solutions until the rest fit."""
+        total = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM solutions"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM solutions ORDER BY last_used"
+        ):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._connection.executemany("DELETE FROM solutions WHERE key = ?", evicted)
@@ -0,0 +1,126 @@
+"""Find a canonical form of a game grid, which is shared by all of its symmetries."""
+
+import hashlib
+from typing import Dict, List, NamedTuple
+
+from .parser import UNSET_SYMBOL
+
+# The number of symmetries of a rectangle, from rotating and reflecting it
+NUM_TRANSFORMS = 8
+
+
+class Canonical(NamedTuple):
+    """The canonical form of a game grid, and how to get there from the game grid."""
+
+    # The lines of the canonical game grid, as parsed by `parser.parse_from_lines`
+    lines: List[str]
+    # The transform which turns the game grid into the canonical game grid
+    transform: int
+    # The label in the canonical game grid of each pipe in the game grid
+    labels: Dict[str, str]
+
+    @property
+    def key(self) -> str:
+        """Get a key which is the same for every game grid with this canonical form.
+
+        :returns: the key
+        """
+        return hashlib.sha256("\n".join(self.lines).encode()).hexdigest()
+
+
+def transform_lines(lines: List[str], transform: int) -> List[str]:
+    """Rotate or reflect the lines of a game grid.
+
+    The lowest bit of `transform` reverses the order of the rows, the next bit
+    reverses each row, and the highest bit then swaps the rows with the columns.
+
+    :param lines: the lines of the game grid
+    :param transform: the transform, from 0 to `NUM_TRANSFORMS - 1`. 0 leaves the
+        lines as they are.
+
+    :returns: the transformed lines
+    """
+    if transform & 1:
+        lines = lines[::-1]
+    if transform & 2:
+        lines = [line[::-1] for line in lines]
+    if transform & 4:
+        lines = ["".join(column) for column in zip(*lines)]
+    return lines
+
+
+def invert_transform(transform: int) -> int:
+    """Find the transform which undoes another.
+
+    Reflecting and then swapping the rows with the columns is undone by swapping them
+    back and then reflecting the other way.
+
+    :param transform: the transform
+
+    :returns: the inverse transform
+    """
+    if transform & 4:
+        return 4 | (transform & 1) << 1 | (transform & 2) >> 1
+    return transform
+
+
+def relabel_lines(lines: List[str], labels: Dict[str, str]) -> List[str]:
+    """Rename the pipes in the lines of a game grid.
+
+    :param lines: the lines of the game grid
+    :param labels: the new label of each pipe
+
+    :returns: the relabelled lines
+    """
+    return ["".join(labels.get(value, value) for value in line) for line in lines]
+
+
+def canonicalise(lines: List[str]) -> Canonical:
+    """Find the canonical form of a game grid.
+
+    Each transform of the game grid has its pipes renamed "A", "B", "C", and so on,
+    in the order that they first appear. The canonical form is the least of these,
+    so a game grid which is a rotation, reflection or relabelling of another has the
+    same canonical form.
+
+    :param lines: the lines of the game grid, as parsed by `parser.parse_from_lines`
+
+    :returns: the canonical form
+    """
+    best = None
+    for transform in range(NUM_TRANSFORMS):
+        transformed = transform_lines(lines, transform)
+        labels: Dict[str, str] = {}
+        for line in transformed:
+            for value in line:
+                if value != UNSET_SYMBOL and value not in labels:
+                    labels[value] = chr(ord("A") + len(labels))
+        candidate = Canonical(relabel_lines(transformed, labels), transform, labels)
+        if best is None or candidate.lines < best.lines:
+            best = candidate
+    return best
+
+
+def to_canonical(canonical: Canonical, lines: List[str]) -> List[str]:
+    """Map lines of the game grid, such as its solution, to the canonical form.
+
+    :param canonical: the canonical form of the game grid
+    :param lines: the lines, which are the same shape as the game grid
+
+    :returns: the lines as they are in the canonical game grid
+    """
+    return relabel_lines(transform_lines(lines, canonical.transform), canonical.labels)
+
+
+def from_canonical(canonical: Canonical, lines: List[str]) -> List[str]:
+    """Map lines of the canonical game grid, such as its solution, to the game grid.
+
+    :param canonical: the canonical form of the game grid
+    :param lines: the lines, which are the same shape as the canonical game grid
+
+    :returns: the lines as they are in the game grid
+    """
+    labels = {new: old for old, new in canonical.labels.items()}
+    return transform_lines(
+        relabel_lines(lines, labels), invert_transform(canonical.transform)
+    )
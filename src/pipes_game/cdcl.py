@@ -0,0 +1,373 @@
+"""A conflict-driven clause learning (CDCL) SAT solver."""
+
+import heapq
+import time
+from typing import Iterable, List, Optional
+
+# The number of conflicts in the first run between restarts, which is scaled by the
+# Luby sequence for each later run
+RESTART_CONFLICTS = 100
+
+# The factor by which the activity of every variable decays after each conflict
+ACTIVITY_DECAY = 0.95
+
+
+def luby(i: int) -> int:
+    """Get a term of the Luby sequence: 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+
+    :param i: the index of the term, from 0
+
+    :returns: the term
+    """
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        power -= 1
+        i %= size
+    return 1 << power
+
+
+class CdclSolver:  # pylint: disable=too-many-instance-attributes
+    """Solves boolean formulas in conjunctive normal form.
+
+    Variables are numbered from 1, and a literal is a variable or its negation, as in
+    the DIMACS format. Unit propagation watches 2 literals of each clause. Conflicts
+    are analysed back to their first unique implication point, and the clause learnt
+    from each conflict is kept. Variables are chosen by their VSIDS activity and set
+    to the value they last had, and the search restarts on the Luby sequence.
+
+    Clauses can be added between calls to `solve`, so that a formula can be refined
+    after looking at a model.
+    """
+
+    def __init__(self, num_vars: int = 0) -> None:
+        """Create a new instance of `CdclSolver`.
+
+        :param num_vars: the number of variables to start with
+        """
+        self.num_vars = 0
+        self.clauses: List[List[int]] = []
+        self.conflicts = 0
+        self.decisions = 0
+        self._ok = True
+        # Per literal, indexed by `_code`
+        self._watches: List[List[int]] = [[], []]
+        # Per variable, with index 0 unused
+        self._values: List[int] = [0]
+        self._levels: List[int] = [0]
+        self._reasons: List[Optional[int]] = [None]
+        self._activity: List[float] = [0.0]
+        self._phases: List[bool] = [False]
+        self._seen: List[bool] = [False]
+        self._heap: List[tuple] = []
+        # Per variable, the activity of its newest entry in the heap, or None
+        self._heap_activity: List[Optional[float]] = [None]
+        self._activity_inc = 1.0
+        self._trail: List[int] = []
+        self._trail_lim: List[int] = []
+        self._queue_head = 0
+        self.new_vars(num_vars)
+
+    def new_vars(self, count: int) -> int:
+        """Add variables.
+
+        :param count: the number of variables to add
+
+        :returns: the first of the new variables
+        """
+        first = self.num_vars + 1
+        for var in range(first, first + count):
+            self._watches += [[], []]
+            self._values.append(0)
+            self._levels.append(0)
+            self._reasons.append(None)
+            self._activity.append(0.0)
+            self._phases.append(False)
+            self._seen.append(False)
+            self._heap_activity.append(None)
+            self._push(var)
+        self.num_vars += count
+        return first
+
+    def add_clause(self, literals: Iterable[int]) -> None:
+        """Add a clause, which is satisfied if any of its literals is true.
+
+        The search is first restarted, so this can be called after `solve`.
+
+        :param literals: the literals of the clause
+
+        :raises ValueError: if a literal is of an unknown variable
+        """
+        self._backtrack(0)
+        clause = []
+        for literal in dict.fromkeys(literals):
+            if not 0 < abs(literal) <= self.num_vars:
+                raise ValueError(f"Unknown variable in literal {literal}")
+            if -literal in clause or self._value(literal) > 0:
+                return
+            if self._value(literal) == 0:
+                clause.append(literal)
+
+        if not clause:
+            self._ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            if self._propagate() is not None:
+                self._ok = False
+        else:
+            self._attach(clause)
+
+    def value(self, var: int) -> bool:
+        """Get the value of a variable in the model found by `solve`.
+
+        :param var: the variable
+
+        :returns: the value of the variable
+        """
+        return self._values[var] > 0
+
+    def solve(
+        self,
+        max_decisions: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[bool]:
+        """Search for values of the variables which satisfy every clause.
+
+        :param max_decisions: the number of decisions after which to give up, or None
+            for no limit. It counts all of the decisions made by this solver.
+        :param deadline: the `time.monotonic` time at which to give up, or None for no
+            limit
+
+        :returns: True if a model was found, which can be read with `value`, False if
+            there is no model, or None if a limit was reached first
+        """
+        if not self._ok:
+            return False
+        restarts = 0
+        restart_at = self.conflicts + RESTART_CONFLICTS * luby(restarts)
+        while True:
+            if (conflict := self._propagate()) is not None:
+                self.conflicts += 1
+                if not self._trail_lim:
+                    self._ok = False
+                    return False
+                learnt, level = self._analyse(conflict)
+                self._backtrack(level)
+                if len(learnt) == 1:
+                    self._assign(learnt[0], None)
+                else:
+                    self._assign(learnt[0], self._attach(learnt))
+                self._activity_inc /= ACTIVITY_DECAY
+                continue
+
+            if self.conflicts >= restart_at:
+                restarts += 1
+                restart_at = self.conflicts + RESTART_CONFLICTS * luby(restarts)
+                self._backtrack(0)
+            if max_decisions is not None and self.decisions >= max_decisions:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            if (var := self._pick_var()) is None:
+                return True
+
+            self.decisions += 1
+            self._trail_lim.append(len(self._trail))
+            self._assign(var if self._phases[var] else -var, None)
+
+    @staticmethod
+    def _code(literal: int) -> int:
+        """Get the index of a literal into the per-literal tables.
+
+        :param literal: the literal
+
+        :returns: the index
+        """
+        return 2 * literal if literal > 0 else -2 * literal + 1
+
+    def _value(self, literal: int) -> int:
+        """Get the value of a literal.
+
+        :param literal: the literal
+
+        :returns: 1 if it is true, -1 if it is false, or 0 if it is unassigned
+        """
+        value = self._values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def _attach(self, clause: List[int]) -> int:
+        """Store a clause of at least 2 literals, watching its first 2 literals.
+
+        :param clause: the literals of the clause
+
+        :returns: the index of the clause
+        """
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self._watches[self._code(clause[0])].append(index)
+        self._watches[self._code(clause[1])].append(index)
+        return index
+
+    def _assign(self, literal: int, reason: Optional[int]) -> None:
+        """Make a literal true.
+
+        :param literal: the literal
+        :param reason: the index of the clause which implied the literal, which must
+            be its first literal, or None for a decision or a fact
+        """
+        var = abs(literal)
+        self._values[var] = 1 if literal > 0 else -1
+        self._levels[var] = len(self._trail_lim)
+        self._reasons[var] = reason
+        self._trail.append(literal)
+
+    def _propagate(self) -> Optional[int]:
+        """Assign the literals implied by the clauses which have become unit.
+
+        :returns: the index of a clause whose literals are all false, or None
+        """
+        # This is the inner loop of the search, so values are looked up inline: a
+        # literal is true if its variable's value has the same sign
+        clauses, values, watches = self.clauses, self._values, self._watches
+        while self._queue_head < len(self._trail):
+            false_literal = -self._trail[self._queue_head]
+            self._queue_head += 1
+            code = self._code(false_literal)
+            watchers = watches[code]
+            kept = []
+            for i, index in enumerate(watchers):
+                clause = clauses[index]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                first_value = values[first] if first > 0 else -values[-first]
+                if first_value > 0:
+                    kept.append(index)
+                    continue
+
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if (values[other] if other > 0 else -values[-other]) >= 0:
+                        clause[1], clause[k] = other, clause[1]
+                        watches[self._code(other)].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if first_value < 0:
+                        kept.extend(watchers[i + 1 :])
+                        watches[code] = kept
+                        self._queue_head = len(self._trail)
+                        return index
+                    self._assign(first, index)
+            watches[code] = kept
+        return None
+
+    def _analyse(self, conflict: int) -> tuple:
+        """Learn a clause from a conflict, by resolving back to the first UIP.
+
+        :param conflict: the index of the clause whose literals are all false
+
+        :returns: the learnt clause, whose first literal is asserted once the search
+            backtracks, and the decision level to backtrack to
+        """
+        seen = self._seen
+        level = len(self._trail_lim)
+        learnt = [0]
+        pending = 0
+        literal = None
+        index = len(self._trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in clause if literal is None else clause[1:]:
+                var = abs(q)
+                if seen[var] or self._levels[var] == 0:
+                    continue
+                seen[var] = True
+                self._bump(var)
+                if self._levels[var] == level:
+                    pending += 1
+                else:
+                    learnt.append(q)
+            while not seen[abs(self._trail[index])]:
+                index -= 1
+            literal = self._trail[index]
+            index -= 1
+            seen[abs(literal)] = False
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self._reasons[abs(literal)]]
+
+        learnt[0] = -literal
+        for q in learnt[1:]:
+            seen[abs(q)] = False
+        if len(learnt) == 1:
+            return learnt, 0
+        # Watch the literal of the highest remaining level, so that the clause is
+        # unit straight after backtracking
+        top = max(range(1, len(learnt)), key=lambda i: self._levels[abs(learnt[i])])
+        learnt[1], learnt[top] = learnt[top], learnt[1]
+        return learnt, self._levels[abs(learnt[1])]
+
+    def _bump(self, var: int) -> None:
+        """Increase the activity of a variable which took part in a conflict.
+
+        :param var: the variable
+        """
+        self._activity[var] += self._activity_inc
+        if self._activity[var] > 1e100:
+            self._activity = [activity * 1e-100 for activity in self._activity]
+            self._activity_inc *= 1e-100
+            self._heap = []
+            self._heap_activity = [None] * (self.num_vars + 1)
+            for v in range(1, self.num_vars + 1):
+                if not self._values[v]:
+                    self._push(v)
+        elif not self._values[var]:
+            self._push(var)
+
+    def _push(self, var: int) -> None:
+        """Add a variable to the heap, unless it is already there with its activity.
+
+        :param var: the variable
+        """
+        if self._heap_activity[var] != self._activity[var]:
+            self._heap_activity[var] = self._activity[var]
+            heapq.heappush(self._heap, (-self._activity[var], var))
+
+    def _pick_var(self) -> Optional[int]:
+        """Find the unassigned variable with the highest activity.
+
+        The heap may hold stale entries, which are skipped.
+
+        :returns: the variable, or None if every variable is assigned
+        """
+        while self._heap:
+            activity, var = heapq.heappop(self._heap)
+            if -activity != self._activity[var]:
+                continue
+            self._heap_activity[var] = None
+            if not self._values[var]:
+                return var
+        return None
+
+    def _backtrack(self, level: int) -> None:
+        """Undo the assignments made above a decision level.
+
+        :param level: the decision level to go back to
+        """
+        if len(self._trail_lim) <= level:
+            return
+        start = self._trail_lim[level]
+        for literal in self._trail[start:]:
+            var = abs(literal)
+            self._phases[var] = literal > 0
+            self._values[var] = 0
+            self._reasons[var] = None
+            self._push(var)
+        del self._trail[start:]
+        del self._trail_lim[level:]
+        self._queue_head = len(self._trail)
@@ -0,0 +1,263 @@
+"""Track the connected regions of unset cells of a game grid."""
+
+from typing import List, Optional, Set
+
+from .grid import PipesGrid, Point, UNSET
+
+# The offsets of the 8 cells around a cell, in clockwise order from north. The
+# orthogonal neighbors are at the even indices.
+RING_OFFSETS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+
+class ConnectivityChecker:
+    """Checks that the unset cells of a game grid can still all be filled.
+
+    Every cell that a pipe fills from now on is in one connected region of unset
+    cells, which neighbors both of the pipe's endpoints. A partly filled grid thus has
+    no solution if an incomplete pipe has no region next to both of its endpoints, or
+    if a region has no pipe that could fill it.
+
+    The regions are kept up to date with the cells written to the game grid since the
+    previous check. Unsetting a cell joins regions together with a union-find. Setting
+    a cell can only split its region if the unset cells around it aren't connected
+    to each other locally, and only then is that region flood filled again.
+    """
+
+    def __init__(self, game_grid: PipesGrid) -> None:
+        """Create a new instance of `ConnectivityChecker`.
+
+        :param game_grid: the game grid to check
+        """
+        self.game_grid = game_grid
+        self._token = None
+        # The region ID of each cell, or -1 if the cell is set
+        self._regions: List[int] = []
+        # The union-find parent of each region ID, and the number of cells in the
+        # region of each root ID
+        self._parents: List[int] = []
+        self._sizes: List[int] = []
+        self._num_regions = 0
+
+    def is_feasible(self) -> bool:
+        """Check whether the unset cells of the game grid can still all be filled.
+
+        :returns: False if the game grid was found to be unsolvable, else True
+        """
+        self._update()
+        game_grid = self.game_grid
+        served: Set[int] = set()
+        for pipe, endpoints in game_grid.pipe_endpoints.items():
+            if game_grid.is_pipe_complete(pipe):
+                continue
+            shared = self._get_neighbor_regions(endpoints["start"])
+            shared &= self._get_neighbor_regions(endpoints["end"])
+            if not shared:
+                return False
+            served |= shared
+
+        return len(served) == self._num_regions
+
+    def count_regions(self) -> int:
+        """Count the connected regions of unset cells.
+
+        :returns: the number of regions
+        """
+        self._update()
+        return self._num_regions
+
+    def get_region(self, position: Point) -> Optional[int]:
+        """Get the region of a cell.
+
+        :param position: the position of the cell
+
+        :returns: the ID of the region, or None if the cell is set. IDs are only
+            comparable until the game grid next changes.
+        """
+        self._update()
+        region = self._regions[self.game_grid.to_index(position)]
+        return self._find(region) if region >= 0 else None
+
+    def get_neighbor_regions(self, position: Point) -> Set[int]:
+        """Get the regions of the unset neighbors of a cell.
+
+        :param position: the position of the cell
+
+        :returns: the ID of each region. IDs are only comparable until the game grid
+            next changes.
+        """
+        self._update()
+        return self._get_neighbor_regions(position)
+
+    def _get_neighbor_regions(self, position: Point) -> Set[int]:
+        """Get the regions of the unset neighbors of a cell.
+
+        :param position: the position of the cell
+
+        :returns: the root ID of each region
+        """
+        game_grid = self.game_grid
+        regions = self._regions
+        return {
+            self._find(regions[n])
+            for n in game_grid.neighbor_indices[game_grid.to_index(position)]
+            if regions[n] >= 0
+        }
+
+    def _update(self) -> None:
+        """Bring the regions up to date with the cells written to the game grid."""
+        self._token, changes = self.game_grid.get_changes_since(self._token)
+        if changes is None or len(self._parents) > 4 * len(self._regions):
+            self._rebuild()
+            return
+
+        points = self.game_grid.points
+        was_set = []
+        was_unset = []
+        for index in dict.fromkeys(changes):
+            is_unset = self.game_grid.get_cell(points[index]) == UNSET
+            if self._regions[index] >= 0 and not is_unset:
+                was_set.append(index)
+            elif self._regions[index] < 0 and is_unset:
+                was_unset.append(index)
+
+        for index in was_set:
+            self._remove_cell(index)
+        for index in was_unset:
+            self._add_cell(index)
+
+    def _rebuild(self) -> None:
+        """Find the regions from scratch."""
+        # Every unset cell starts in region 0, which is then split into its
+        # connected regions
+        self._regions = [-1 if value != UNSET else 0 for _, value in self.game_grid]
+        self._parents = [0]
+        self._sizes = [0]
+        self._num_regions = 0
+        for index, region in enumerate(self._regions):
+            if region == 0:
+                self._fill_region(index, 0)
+
+    def _fill_region(self, start: int, old_root: int) -> None:
+        """Give a new region ID to the cells connected to a cell.
+
+        :param start: the index of the cell
+        :param old_root: the root ID of the region of the cells, before this
+        """
+        regions = self._regions
+        neighbor_indices = self.game_grid.neighbor_indices
+        region = len(self._parents)
+        self._parents.append(region)
+        self._num_regions += 1
+
+        regions[start] = region
+        stack = [start]
+        size = 0
+        while stack:
+            index = stack.pop()
+            size += 1
+            for n in neighbor_indices[index]:
+                if regions[n] < 0 or regions[n] == region:
+                    continue
+                if self._find(regions[n]) == old_root:
+                    regions[n] = region
+                    stack.append(n)
+        self._sizes.append(size)
+
+    def _remove_cell(self, index: int) -> None:
+        """Take a cell which has been set out of its region.
+
+        :param index: the index of the cell
+        """
+        regions = self._regions
+        root = self._find(regions[index])
+        regions[index] = -1
+        self._sizes[root] -= 1
+        if not self._sizes[root]:
+            self._num_regions -= 1
+            return
+
+        unset_neighbors = [
+            n for n in self.game_grid.neighbor_indices[index] if regions[n] >= 0
+        ]
+        if len(unset_neighbors) < 2 or self._is_locally_connected(index):
+            return
+
+        # The region may have been split in 2 or more
+        self._num_regions -= 1
+        for n in unset_neighbors:
+            if self._find(regions[n]) == root:
+                self._fill_region(n, root)
+
+    def _is_locally_connected(self, index: int) -> bool:
+        """Check whether the unset neighbors of a cell are connected around it.
+
+        :param index: the index of the cell
+
+        :returns: True if the unset orthogonal neighbors are all in one unbroken run
+            of unset cells among the 8 cells around the cell
+        """
+        num_cols = self.game_grid.num_cols
+        num_rows = self.game_grid.num_rows
+        x, y = index % num_cols, index // num_cols
+        ring = [
+            0 <= x + dx < num_cols
+            and 0 <= y + dy < num_rows
+            and self._regions[(y + dy) * num_cols + x + dx] >= 0
+            for dx, dy in RING_OFFSETS
+        ]
+        if all(ring):
+            return True
+
+        # Walk the ring from a set cell, counting the runs with orthogonal neighbors
+        first = ring.index(False)
+        runs = 0
+        has_orthogonal = False
+        for i in range(first + 1, first + len(ring) + 1):
+            if not ring[i % len(ring)]:
+                runs += has_orthogonal
+                has_orthogonal = False
+            elif i % 2 == 0:
+                has_orthogonal = True
+        return runs <= 1
+
+    def _add_cell(self, index: int) -> None:
+        """Put a cell which has been unset into a region, joining its neighbors.
+
+        :param index: the index of the cell
+        """
+        region = len(self._parents)
+        self._parents.append(region)
+        self._sizes.append(1)
+        self._num_regions += 1
+        self._regions[index] = region
+        for n in self.game_grid.neighbor_indices[index]:
+            if self._regions[n] >= 0:
+                self._union(region, self._regions[n])
+
+    def _find(self, region: int) -> int:
+        """Find the root ID of a region.
+
+        :param region: the region ID
+
+        :returns: the root ID
+        """
+        parents = self._parents
+        while parents[region] != region:
+            parents[region] = parents[parents[region]]
+            region = parents[region]
+        return region
+
+    def _union(self, a: int, b: int) -> None:
+        """Join 2 regions together.
+
+        :param a: the ID of one region
+        :param b: the ID of the other region
+        """
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        if self._sizes[a] < self._sizes[b]:
+            a, b = b, a
+        self._parents[b] = a
+        self._sizes[a] += self._sizes[b]
+        self._num_regions -= 1
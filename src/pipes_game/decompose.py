@@ -0,0 +1,164 @@
+"""Split a game grid into independent parts which can be solved separately."""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .connectivity import ConnectivityChecker
+from .grid import PipesGrid, Point, UNSET
+
+
+class Component(NamedTuple):
+    """A part of a game grid which can be solved without the rest of it."""
+
+    # The unset cells of the part
+    cells: List[Point]
+    # The incomplete pipes whose endpoints only neighbor those cells
+    pipes: List[str]
+
+
+def find_components(
+    game_grid: PipesGrid,
+    checker: Optional[ConnectivityChecker] = None,
+) -> List[Component]:
+    """Split the unset cells and incomplete pipes of a game grid into components.
+
+    A pipe can only fill the regions of unset cells next to its endpoints, so the
+    regions next to the same pipe are joined into one component. No pipe then
+    touches more than one component, and each can be solved on its own.
+
+    :param game_grid: the game grid
+    :param checker: the connectivity checker of the game grid, or None to make one
+
+    :returns: the components, largest first. An incomplete pipe with no unset cells
+        next to it is in a component of its own with no cells.
+    """
+    if checker is None:
+        checker = ConnectivityChecker(game_grid)
+    region_cells = _get_region_cells(game_grid, checker)
+    parents = {region: region for region in region_cells}
+
+    def find(region: int) -> int:
+        """Find the root of the regions joined to a region.
+
+        :param region: the ID of the region
+
+        :returns: the ID of the root region
+        """
+        while parents[region] != region:
+            parents[region] = parents[parents[region]]
+            region = parents[region]
+        return region
+
+    stranded = []
+    pipe_regions = {}
+    for pipe, endpoints in game_grid.pipe_endpoints.items():
+        if game_grid.is_pipe_complete(pipe):
+            continue
+        regions = checker.get_neighbor_regions(endpoints["start"])
+        regions |= checker.get_neighbor_regions(endpoints["end"])
+        if not regions:
+            stranded.append(Component([], [pipe]))
+            continue
+        first, *rest = regions
+        for region in rest:
+            parents[find(region)] = find(first)
+        pipe_regions[pipe] = first
+
+    components: Dict[int, Component] = {}
+    for region, cells in region_cells.items():
+        components.setdefault(find(region), Component([], [])).cells.extend(cells)
+    for pipe, region in pipe_regions.items():
+        components[find(region)].pipes.append(pipe)
+
+    return stranded + sorted(
+        components.values(), key=lambda component: len(component.cells), reverse=True
+    )
+
+
+def _get_region_cells(
+    game_grid: PipesGrid,
+    checker: ConnectivityChecker,
+) -> Dict[int, List[Point]]:
+    """Get the cells of each region of unset cells.
+
+    :param game_grid: the game grid
+    :param checker: the connectivity checker of the game grid
+
+    :returns: the positions of the cells of each region, keyed by region ID
+    """
+    region_cells: Dict[int, List[Point]] = {}
+    for position, value in game_grid:
+        if value == UNSET:
+            region_cells.setdefault(checker.get_region(position), []).append(position)
+    return region_cells
+
+
+def extract_component(
+    game_grid: PipesGrid,
+    component: Component,
+) -> Tuple[PipesGrid, Point]:
+    """Copy a component of a game grid into a game grid of its own.
+
+    The new game grid covers the bounding box of the component's cells and pipe
+    endpoints. Every other cell in the box is filled with one of the component's
+    pipes, away from its endpoints, so that it blocks the cell without being part of
+    any pipe which can still be extended.
+
+    :param game_grid: the game grid
+    :param component: the component, which must have at least one pipe
+
+    :returns: the game grid of the component, and the position of its top-left cell
+        in `game_grid`
+    """
+    endpoints = [game_grid.pipe_endpoints[pipe] for pipe in component.pipes]
+    points = component.cells + [p for ends in endpoints for p in ends.values()]
+    min_x = min(p.x for p in points)
+    min_y = min(p.y for p in points)
+    num_cols = max(p.x for p in points) - min_x + 1
+    num_rows = max(p.y for p in points) - min_y + 1
+
+    array = [[component.pipes[0]] * num_cols for _ in range(num_rows)]
+    for p in component.cells:
+        array[p.y - min_y][p.x - min_x] = UNSET
+    pipe_endpoints = {}
+    for pipe, ends in zip(component.pipes, endpoints):
+        pipe_endpoints[pipe] = {}
+        for key, p in ends.items():
+            array[p.y - min_y][p.x - min_x] = pipe
+            pipe_endpoints[pipe][key] = Point(p.x - min_x, p.y - min_y)
+
+    sub_grid = type(game_grid)(
+        num_cols, num_rows, array, set(component.pipes), pipe_endpoints
+    )
+    return sub_grid, Point(min_x, min_y)
+
+
+def merge_components(
+    game_grid: PipesGrid,
+    solutions: List[Tuple[Component, PipesGrid, Point]],
+) -> PipesGrid:
+    """Copy the solutions of the components of a game grid back into it.
+
+    :param game_grid: the game grid. It is not modified.
+    :param solutions: each component, the solution of its game grid, and the position
+        of the top-left cell of that game grid in `game_grid`
+
+    :returns: a copy of the game grid with every component filled in
+    """
+    array = [list(row) for row in game_grid.array]
+    pipe_endpoints = {
+        pipe: dict(endpoints) for pipe, endpoints in game_grid.pipe_endpoints.items()
+    }
+    for component, solution, offset in solutions:
+        for p in component.cells:
+            array[p.y][p.x] = solution.get_cell(Point(p.x - offset.x, p.y - offset.y))
+        for pipe in component.pipes:
+            for key, p in solution.pipe_endpoints[pipe].items():
+                pipe_endpoints[pipe][key] = Point(p.x + offset.x, p.y + offset.y)
+
+    return type(game_grid)(
+        game_grid.num_cols,
+        game_grid.num_rows,
+        array,
+        set(game_grid.pipe_labels),
+        pipe_endpoints,
+    )
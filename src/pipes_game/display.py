@@ -1,14 +1,21 @@
 """Display and interaction handling."""
 
+import sys
 from typing import Callable, Mapping, Tuple, Union
 
+import cairo
 import numpy
 
-from .gobject import Gdk, GdkPixbuf, Gtk
+from .gobject import Gdk, Gtk
 
 
 class Display(Gtk.Window):
-    """Display and interaction logic."""
+    """Display and interaction logic.
+
+    The display owns a pixel buffer which is shared with the cairo surface that is
+    painted into the window. `frame` is an RGB view of that buffer, so anything drawn
+    into `frame` is shown by the next `update` without being copied.
+    """
 
     def __init__(self, size: Tuple[int, int], window_name: str) -> None:
         """Create a new instance of `Display`.
@@ -20,8 +27,26 @@ class Display(Gtk.Window):
         self.set_title(window_name)
         self.set_default_size(*size)
         self.connect("destroy", Gtk.main_quit)
-        self.image = Gtk.Image()
-        self.add(self.image)
+
+        width, height = size
+        stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_RGB24, width)
+        self._buffer = numpy.zeros((height, stride // 4, 4), dtype=numpy.uint8)
+        self._surface = cairo.ImageSurface.create_for_data(
+            memoryview(self._buffer),
+            cairo.FORMAT_RGB24,
+            width,
+            height,
+            stride,
+        )
+        # Each cairo RGB24 pixel is a native-endian 32-bit integer, 0xXXRRGGBB
+        if sys.byteorder == "little":
+            self.frame = self._buffer[:, :width, 2::-1]
+        else:
+            self.frame = self._buffer[:, :width, 1:]
+
+        self.drawing_area = Gtk.DrawingArea()
+        self.drawing_area.connect("draw", self.on_draw)
+        self.add(self.drawing_area)
 
         self.connect("key-press-event", self.on_key_press)
         self._callback_map = {
@@ -59,23 +84,31 @@ class Display(Gtk.Window):
         if callback := self._callback_map.get(Gdk.keyval_name(event.keyval)):
             callback()
 
+    def on_draw(  # pylint: disable=unused-argument
+        self,
+        widget: Gtk.DrawingArea,
+        context: cairo.Context,
+    ) -> None:
+        """Paint the pixel buffer into the window.
+
+        :param widget: the receiving widget
+        :param context: the cairo context to paint with
+        """
+        context.set_source_surface(self._surface, 0, 0)
+        context.paint()
+
     def update(self, buf: numpy.array) -> None:
         """Update the window.
 
-        :param buf: the image buffer, as a numpy array
+        Drawing straight into `frame` and passing it here avoids any copying. Any
+        other RGB array of the same size is copied into the pixel buffer first.
+
+        :param buf: the image buffer, as a (height, width, 3) RGB numpy array
         """
-        bits_per_sample = numpy.dtype(buf.dtype).itemsize * 8
-        height, width, channels = buf.shape
-        pixbuf = GdkPixbuf.Pixbuf.new_from_data(
-            buf.tobytes(),
-            colorspace=GdkPixbuf.Colorspace.RGB,
-            has_alpha=channels == 4,
-            bits_per_sample=bits_per_sample,
-            width=width,
-            height=height,
-            rowstride=width * channels,
-        )
-        self.image.set_from_pixbuf(pixbuf)
+        if buf is not self.frame:
+            self.frame[...] = buf
+        self._surface.mark_dirty()
+        self.drawing_area.queue_draw()
 
     def start(self) -> None:
         """Start the display."""
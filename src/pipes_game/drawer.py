@@ -1,27 +1,430 @@
 """Logic for converting a grid into an image array."""
 
 import colorsys
-from typing import Mapping, Set, Tuple
+import functools
+from typing import Dict, Iterator, Mapping, Optional, Set, Tuple
 
 import cv2
 import numpy
 
-from .grid import PipesGrid, Point, UNSET
+from .grid import CompactPipesGrid, PipesGrid, Point, UNSET
+
+# The inset in pixels between the edge of a grid cell and its painted rectangle
+CELL_INSET = 5
 
 
 def grid_to_frame(grid: PipesGrid, width: int, height: int) -> numpy.array:
     """Create a frame from a pipes grid.
 
+    The rasterised labels are shared with every other frame of the same cell size, so
+    they are only drawn once however many frames are created.
+
     :param grid: the pipes grid to draw
     :param width: the width of the frame to draw
     :param height: the height of the frame to draw
 
     :returns: the frame
     """
-    margin = 10
-    cell_width = (width - margin - margin) // grid.num_cols
-    cell_height = (height - margin - margin) // grid.num_rows
+    return GridRenderer(width, height).render(grid)
+
+
+class GridRenderer:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    """Draws frames of a pipes grid, repainting only the cells which have changed.
+
+    The background of margins and grid lines is drawn once, and the previous frame is
+    kept. When the same grid is rendered again, only the cells written since the
+    previous frame are repainted, so the cost of a frame scales with the number of
+    changed cells rather than with the size of the grid. Another grid of the same size
+    and pipe labels, such as a snapshot of a search, is compared with the previous
+    frame's cells, so only the cells which differ are repainted.
+
+    Every frame is drawn into the same array, using only numpy operations, so the
+    renderer can draw straight into memory owned by something else.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        margin: int = 10,
+        frame: Optional[numpy.array] = None,
+    ) -> None:
+        """Create a new instance of `GridRenderer`.
+
+        :param width: the width of the frames to draw
+        :param height: the height of the frames to draw
+        :param margin: the margin in pixels between the edge of the frame and the grid
+        :param frame: a (height, width, 3) RGB array to draw into, such as a view of a
+            display's pixel buffer. It need not be contiguous. If not given, the
+            renderer allocates its own frame.
+
+        :raises ValueError: if `frame` is not the right shape
+        """
+        self.width = width
+        self.height = height
+        self.margin = margin
+
+        if frame is None:
+            frame = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        elif frame.shape != (height, width, 3):
+            raise ValueError(f"Frame must have shape {(height, width, 3)}")
+
+        self._grid = None
+        self._changes_token = None
+        self._layout = None
+        self._codes = None
+        self._label_codes = {}
+        self._frame = frame
+        self._background = None
+        self._cell_width = 0
+        self._cell_height = 0
+        self._font_options = {}
+        self._label_colors = {}
+        self._inset_mask = None
+        self._glyphs = None
+
+    def render(self, grid: PipesGrid) -> numpy.array:
+        """Draw a frame of a pipes grid.
+
+        :param grid: the pipes grid to draw
+
+        :returns: the frame. It is owned by the renderer, and is updated in place by
+            the next call.
+        """
+        changed = None
+        if grid is self._grid:
+            self._changes_token, changed = grid.get_changes_since(self._changes_token)
+        else:
+            self._changes_token, _ = grid.get_changes_since(None)
+            codes, labels = get_label_codes(grid)
+            if (grid.num_cols, grid.num_rows, labels) == self._layout:
+                changed = numpy.flatnonzero(codes != self._codes).tolist()
+            else:
+                self._init_layout(grid, labels)
+            self._grid = grid
+
+        if changed is None:
+            self._paint_all_cells(grid)
+        else:
+            for index in set(changed):
+                position = grid.points[index]
+                self._clear_cell(position)
+                if (value := grid.get_cell(position)) != UNSET:
+                    self._paint_cell(position, value)
+                self._codes.flat[index] = self._label_codes[value]
+
+        return self._frame
+
+    def _init_layout(self, grid: PipesGrid, labels: Tuple[str, ...]) -> None:
+        """Work out the layout of a grid and draw its background.
+
+        :param grid: the pipes grid that will be drawn
+        :param labels: the label for each code of `get_label_codes`
+        """
+        self._layout = (grid.num_cols, grid.num_rows, labels)
+        self._label_codes = {label: code for code, label in enumerate(labels)}
+        self._cell_width = (self.width - self.margin - self.margin) // grid.num_cols
+        self._cell_height = (self.height - self.margin - self.margin) // grid.num_rows
+        self._glyphs = get_glyph_cache(self._cell_width, self._cell_height)
+        self._background = _draw_background(
+            self.width,
+            self.height,
+            self._cell_width,
+            self._cell_height,
+            self.margin,
+        )
+
+        font_scale = min(self._cell_width, self._cell_height) / 40
+        self._font_options = {
+            "fontFace": cv2.FONT_HERSHEY_SIMPLEX,
+            "fontScale": font_scale,
+            "thickness": int(font_scale + 1),
+        }
+        self._label_colors = {
+            label: numpy.rint(color).astype(numpy.uint8)
+            for label, color in get_color_map_for_labels(grid.pipe_labels).items()
+        }
+
+        inset = numpy.zeros((self._cell_height, self._cell_width), dtype=bool)
+        inset[
+            CELL_INSET : self._cell_height - CELL_INSET + 1,
+            CELL_INSET : self._cell_width - CELL_INSET + 1,
+        ] = True
+        self._inset_mask = numpy.tile(inset, (grid.num_rows, grid.num_cols))
+
+    def _paint_all_cells(self, grid: PipesGrid) -> None:
+        """Repaint the whole frame.
+
+        The cell rectangles are painted in one go, by looking up the color of each
+        cell's label code in a palette and scaling the result up to the cell size. The
+        labels are then blitted on to every cell with the same label at once.
+
+        :param grid: the pipes grid to draw
+        """
+        codes, labels = get_label_codes(grid)
+        self._codes = numpy.array(codes)
+        palette = numpy.zeros((len(labels), 3), dtype=numpy.uint8)
+        for code, label in enumerate(labels):
+            if label in self._label_colors:
+                palette[code] = self._label_colors[label]
+
+        colors = palette[codes].repeat(self._cell_height, axis=0)
+        colors = colors.repeat(self._cell_width, axis=1)
+        filled = (codes != 0).repeat(self._cell_height, axis=0)
+        filled = filled.repeat(self._cell_width, axis=1) & self._inset_mask
+
+        self._frame[...] = self._background
+        cells = self._frame[
+            self.margin : self.margin + filled.shape[0],
+            self.margin : self.margin + filled.shape[1],
+        ]
+        cells[filled] = colors[filled]
+        self._draw_all_labels(cells, codes, labels)
+
+    def _draw_all_labels(
+        self,
+        cells: numpy.array,
+        codes: numpy.array,
+        labels: Tuple[str, ...],
+    ) -> None:
+        """Draw the labels of every filled cell, one label at a time.
+
+        :param cells: the part of the frame covered by the grid cells
+        :param codes: the (rows, columns) array of label codes
+        :param labels: the label for each code
+        """
+        # View the cells as a (rows, columns, cell height, cell width) array of tiles
+        num_rows, num_cols = codes.shape
+        tiles = cells.reshape(
+            num_rows, self._cell_height, num_cols, self._cell_width, 3
+        ).swapaxes(1, 2)
+        for code, rows, cols in _iter_cells_by_code(codes, len(labels)):
+            glyph = self._glyphs.get(
+                labels[code], self._font_options, self._cell_width, self._cell_height
+            )
+            if glyph is None:
+                continue
+            alpha, (y, x) = glyph
+            tile_slice = (
+                rows,
+                cols,
+                slice(y, y + alpha.shape[0]),
+                slice(x, x + alpha.shape[1]),
+            )
+            tiles[tile_slice] = _blit_text(tiles[tile_slice], alpha)
+
+    def _clear_cell(self, position: Point) -> None:
+        """Restore the background of a cell.
+
+        :param position: the position of the cell in the grid
+        """
+        frame_position = to_frame_space(
+            position, self._cell_width, self._cell_height, self.margin
+        )
+        cell = (
+            slice(frame_position.y, frame_position.y + self._cell_height + 1),
+            slice(frame_position.x, frame_position.x + self._cell_width + 1),
+        )
+        self._frame[cell] = self._background[cell]
+
+    def _paint_cell(self, position: Point, value: str) -> None:
+        """Paint a filled cell on to the frame.
+
+        :param position: the position of the cell in the grid
+        :param value: the value in the cell
+        """
+        cell_width = self._cell_width
+        cell_height = self._cell_height
+        frame_position = to_frame_space(position, cell_width, cell_height, self.margin)
+
+        self._frame[
+            frame_position.y
+            + CELL_INSET : frame_position.y
+            + cell_height
+            - CELL_INSET
+            + 1,
+            frame_position.x
+            + CELL_INSET : frame_position.x
+            + cell_width
+            - CELL_INSET
+            + 1,
+        ] = self._label_colors[value]
+        self._draw_label(position, value)
+
+    def _draw_label(self, position: Point, value: str) -> None:
+        """Draw the label of a filled cell on to the frame.
+
+        :param position: the position of the cell in the grid
+        :param value: the value in the cell
+        """
+        glyph = self._glyphs.get(
+            value, self._font_options, self._cell_width, self._cell_height
+        )
+        if glyph is None:
+            return
+
+        alpha, (y, x) = glyph
+        frame_position = to_frame_space(
+            position, self._cell_width, self._cell_height, self.margin
+        )
+        y += frame_position.y
+        x += frame_position.x
+        patch = (slice(y, y + alpha.shape[0]), slice(x, x + alpha.shape[1]))
+        self._frame[patch] = _blit_text(self._frame[patch], alpha)
+
+
+class GlyphCache:
+    """Cache of rasterised cell labels.
+
+    `cv2.putText` is slow enough that drawing every label of a large grid with it
+    dominates the time to draw a frame. Instead, each label is drawn once per font and
+    cell size, and then blitted on to the frame wherever it is needed.
+    """
+
+    def __init__(self) -> None:
+        """Create a new instance of `GlyphCache`."""
+        self._glyphs: Dict[tuple, Optional[Tuple[numpy.array, Tuple[int, int]]]] = {}
+
+    def get(
+        self,
+        label: str,
+        font_options: dict,
+        cell_width: int,
+        cell_height: int,
+    ) -> Optional[Tuple[numpy.array, Tuple[int, int]]]:
+        """Get the rasterised label for a cell.
+
+        :param label: the label to draw
+        :param font_options: options to pass to `cv2.putText`
+        :param cell_width: the width in pixels of a single grid cell
+        :param cell_height: the height in pixels of a single grid cell
+
+        :returns: the alpha mask of the label, cropped to the pixels it covers, and the
+            y- and x-offset of the mask from the origin of the cell. None if the label
+            covers no pixels.
+        """
+        key = (label, tuple(sorted(font_options.items())), cell_width, cell_height)
+        if key not in self._glyphs:
+            self._glyphs[key] = _rasterise_label(
+                label, font_options, cell_width, cell_height
+            )
+        return self._glyphs[key]
+
+    def clear(self) -> None:
+        """Remove all of the rasterised labels."""
+        self._glyphs.clear()
+
+
+@functools.lru_cache(maxsize=16)
+def get_glyph_cache(  # pylint: disable=unused-argument
+    cell_width: int, cell_height: int
+) -> GlyphCache:
+    """Get the cache of rasterised labels shared by every frame of a cell size.
+
+    The most recently used cell sizes are kept, so that resizing a display doesn't
+    grow the caches without limit.
+
+    :param cell_width: the width in pixels of a single grid cell
+    :param cell_height: the height in pixels of a single grid cell
+
+    :returns: the cache
+    """
+    return GlyphCache()
+
+
+def _rasterise_label(
+    label: str,
+    font_options: dict,
+    cell_width: int,
+    cell_height: int,
+) -> Optional[Tuple[numpy.array, Tuple[int, int]]]:
+    """Draw a label centered within an empty cell.
+
+    :param label: the label to draw
+    :param font_options: options to pass to `cv2.putText`
+    :param cell_width: the width in pixels of a single grid cell
+    :param cell_height: the height in pixels of a single grid cell
+
+    :returns: the alpha mask of the label, cropped to the pixels it covers, and the y-
+        and x-offset of the mask from the origin of the cell. None if the label covers
+        no pixels.
+    """
+    canvas = numpy.zeros((cell_height, cell_width), dtype=numpy.uint8)
+    text_origin = get_text_origin_for_cell(
+        label, font_options, Point(0, 0), cell_width, cell_height
+    )
+    cv2.putText(
+        canvas,
+        label,
+        org=text_origin,
+        color=255,
+        bottomLeftOrigin=False,
+        **font_options,
+    )
+
+    ys, xs = numpy.nonzero(canvas)
+    if ys.size == 0:
+        return None
+    y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+    return canvas[y0:y1, x0:x1].copy(), (int(y0), int(x0))
+
+
+def _iter_cells_by_code(
+    codes: numpy.array, num_codes: int
+) -> Iterator[Tuple[int, numpy.array, numpy.array]]:
+    """Find the filled cells of each label code.
+
+    The cells are grouped by their code in one sort, rather than searching the whole
+    grid for the cells of each code.
+
+    :param codes: the (rows, columns) array of label codes
+    :param num_codes: the number of label codes, including code 0 for `UNSET`
+
+    :returns: an iterator of each code which is in `codes`, other than 0, with the
+        arrays of rows and of columns of its cells
+    """
+    flat_codes = codes.ravel()
+    order = flat_codes.argsort(kind="stable")
+    # The indices of the cells of each code are order[ends[code - 1]:ends[code]]
+    ends = numpy.bincount(flat_codes, minlength=num_codes).cumsum().tolist()
+    for code in range(1, num_codes):
+        if ends[code] != ends[code - 1]:
+            rows, cols = numpy.divmod(
+                order[ends[code - 1] : ends[code]], codes.shape[1]
+            )
+            yield code, rows, cols
+
+
+def _blit_text(pixels: numpy.array, alpha: numpy.array) -> numpy.array:
+    """Blend black text over some pixels.
+
+    :param pixels: the pixels to draw on, with the color channels as the last axis
+    :param alpha: the alpha mask of the text, matching the trailing dimensions of
+        `pixels` other than the color channels
+
+    :returns: the blended pixels
+    """
+    coverage = (255 - alpha.astype(numpy.uint16))[..., numpy.newaxis]
+    return (pixels * coverage // 255).astype(numpy.uint8)
+
 
+def _draw_background(
+    width: int,
+    height: int,
+    cell_width: int,
+    cell_height: int,
+    margin: int,
+) -> numpy.array:
+    """Draw the empty grid lines of a frame.
+
+    :param width: the width of the frame to draw
+    :param height: the height of the frame to draw
+    :param cell_width: the width in pixels of a single grid cell
+    :param cell_height: the height in pixels of a single grid cell
+    :param margin: the margin in pixels between the edge of the frame and the grid
+
+    :returns: the frame
+    """
     frame = numpy.zeros((height, width, 3), dtype=numpy.uint8)
 
     for x in range(margin, width, cell_width):
@@ -42,63 +445,27 @@ def grid_to_frame(grid: PipesGrid, width: int, height: int) -> numpy.array:
             thickness=3,
         )
 
-    font_scale = min(cell_width, cell_height) / 40
-
-    font_options = {
-        "fontFace": cv2.FONT_HERSHEY_SIMPLEX,
-        "fontScale": font_scale,
-        "thickness": int(font_scale + 1),
-    }
-    color_map_for_labels = get_color_map_for_labels(grid.pipe_labels)
-    _paint_cells(
-        frame,
-        grid,
-        cell_width,
-        cell_height,
-        margin,
-        font_options,
-        color_map_for_labels,
-    )
     return frame
 
 
-def _paint_cells(  # pylint: disable=too-many-arguments
-    frame: numpy.array,
-    grid: PipesGrid,
-    cell_width: int,
-    cell_height: int,
-    margin: int,
-    font_options: dict,
-    color_map_for_labels: dict,
-) -> numpy.array:
-    """Paint cells from a grid on to a frame."""
-    for position, value in grid:
-        if value == UNSET:
-            continue
-
-        frame_position = to_frame_space(position, cell_width, cell_height, margin)
-        text_origin = get_text_origin_for_cell(
-            value, font_options, frame_position, cell_width, cell_height
-        )
+def get_label_codes(grid: PipesGrid) -> Tuple[numpy.array, Tuple[str, ...]]:
+    """Get the cells of a grid as an array of integer label codes.
 
-        frame = cv2.rectangle(
-            frame,
-            (frame_position.x + 5, frame_position.y + 5),
-            (frame_position.x + cell_width - 5, frame_position.y + cell_height - 5),
-            color=color_map_for_labels[value],
-            thickness=-1,
-        )
+    :param grid: the pipes grid
 
-        frame = cv2.putText(
-            frame,
-            value,
-            org=text_origin,
-            color=(0, 0, 0),
-            bottomLeftOrigin=False,
-            **font_options,
-        )
+    :returns: a (rows, columns) array of label codes, and the label for each code. Code
+        0 is always `UNSET`.
+    """
+    if isinstance(grid, CompactPipesGrid):
+        return grid.codes.reshape(grid.num_rows, grid.num_cols), grid.labels
 
-    return frame
+    labels = (UNSET, *sorted(grid.pipe_labels))
+    label_codes = {label: code for code, label in enumerate(labels)}
+    codes = numpy.array(
+        [[label_codes[value] for value in row] for row in grid.array],
+        dtype=numpy.int32,
+    )
+    return codes, labels
 
 
 def to_frame_space(position: Point, width: int, height: int, margin: int) -> Point:
@@ -122,10 +489,11 @@ def get_color_map_for_labels(labels: Set[str]) -> Mapping[str, str]:
     :returns: the map of label to colors
     """
     num_labels = len(labels)
-    hues = iter(range(0, 101, 100 // num_labels))
+    # Too many labels for whole-number hue steps are spread evenly instead
+    hue_step = 100 // num_labels if num_labels <= 100 else 100 / num_labels
     color_map = {}
-    for label in sorted(labels):
-        hue = next(hues)
+    for index, label in enumerate(sorted(labels)):
+        hue = index * hue_step
         color = tuple(map(lambda x: x * 255, colorsys.hsv_to_rgb(hue / 100, 1, 1)))
         color_map[label] = color
     return color_map
@@ -0,0 +1,172 @@
+"""Export recordings of solves without a display."""
+
+from pathlib import Path
+from typing import Optional, Union
+
+import cv2
+import numpy
+
+from . import drawer, solver
+from .grid import PipesGrid
+
+# The codec to write each type of video file with
+VIDEO_CODECS = {
+    ".avi": "MJPG",
+    ".mp4": "mp4v",
+}
+
+
+class VideoFrameWriter:
+    """Writes frames to a video file."""
+
+    def __init__(self, path: Path, width: int, height: int, fps: float) -> None:
+        """Create a new instance of `VideoFrameWriter`.
+
+        :param path: the path of the video file. Its suffix must be a key of
+            `VIDEO_CODECS`.
+        :param width: the width of the frames
+        :param height: the height of the frames
+        :param fps: the number of frames per second of the video
+
+        :raises ValueError: if the video file can't be written
+        """
+        fourcc = cv2.VideoWriter_fourcc(*VIDEO_CODECS[path.suffix.lower()])
+        self._writer = cv2.VideoWriter(str(path), fourcc, fps, (width, height))
+        if not self._writer.isOpened():
+            raise ValueError(f"Could not open {str(path)!r} for writing")
+        self._bgr = numpy.empty((height, width, 3), dtype=numpy.uint8)
+
+    def write(self, frame: numpy.array) -> None:
+        """Write a frame.
+
+        :param frame: the RGB frame
+        """
+        cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=self._bgr)
+        self._writer.write(self._bgr)
+
+    def close(self) -> None:
+        """Finish writing the video file."""
+        self._writer.release()
+
+
+class ImageSequenceWriter:
+    """Writes frames to a directory of numbered PNG files."""
+
+    def __init__(self, path: Path, width: int, height: int) -> None:
+        """Create a new instance of `ImageSequenceWriter`.
+
+        :param path: the path of the directory, which is created if necessary
+        :param width: the width of the frames
+        :param height: the height of the frames
+        """
+        path.mkdir(parents=True, exist_ok=True)
+        self._path = path
+        self._count = 0
+        self._bgr = numpy.empty((height, width, 3), dtype=numpy.uint8)
+
+    def write(self, frame: numpy.array) -> None:
+        """Write a frame.
+
+        :param frame: the RGB frame
+
+        :raises ValueError: if the image file can't be written
+        """
+        cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=self._bgr)
+        image_path = self._path / f"frame_{self._count:06d}.png"
+        if not cv2.imwrite(str(image_path), self._bgr):
+            raise ValueError(f"Could not write {str(image_path)!r}")
+        self._count += 1
+
+    def close(self) -> None:
+        """Finish writing the image files."""
+
+
+def open_frame_writer(
+    path: Path,
+    width: int,
+    height: int,
+    fps: float,
+) -> Union[VideoFrameWriter, ImageSequenceWriter]:
+    """Open a writer for the frames of a recording.
+
+    :param path: a video file path whose suffix is a key of `VIDEO_CODECS`, or else
+        the path of a directory to write numbered images into
+    :param width: the width of the frames
+    :param height: the height of the frames
+    :param fps: the number of frames per second of a video file
+
+    :returns: the frame writer
+    """
+    if path.suffix.lower() in VIDEO_CODECS:
+        return VideoFrameWriter(path, width, height, fps)
+    return ImageSequenceWriter(path, width, height)
+
+
+def export_solve(  # pylint: disable=too-many-arguments
+    game_grid: PipesGrid,
+    path: Path,
+    width: int,
+    height: int,
+    *,
+    every: int = 1,
+    fps: float = 30,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> int:
+    """Solve a game grid, recording a frame of the search every few moves.
+
+    Frames are rendered and written one at a time, and only the cells which have
+    changed are repainted, so a recording of a large grid needs no more memory than a
+    single frame. The first frame is the unsolved grid, and the last is the solution.
+
+    :param game_grid: the game grid to solve. It is not modified.
+    :param path: a video file path whose suffix is a key of `VIDEO_CODECS`, or else
+        the path of a directory to write numbered images into
+    :param width: the width of the frames
+    :param height: the height of the frames
+    :param every: the number of moves between each frame that is recorded
+    :param fps: the number of frames per second of a video file
+    :param max_nodes: the maximum number of search nodes to visit before giving up, or
+        None for no limit
+    :param timeout: the maximum number of seconds to search for before giving up, or
+        None for no limit
+
+    :returns: the number of frames written
+
+    :raises ValueError: if `every` is less than 1
+    """
+    if every < 1:
+        raise ValueError("Must record at least every 1 move")
+
+    renderer = drawer.GridRenderer(width, height)
+    writer = open_frame_writer(path, width, height, fps)
+    moves = 0
+    frames = 0
+
+    def record(working_grid: PipesGrid) -> None:
+        """Write a frame of the working game grid every few moves.
+
+        :param working_grid: the working game grid of the search
+        """
+        nonlocal moves, frames
+        moves += 1
+        if moves % every == 0:
+            writer.write(renderer.render(working_grid))
+            frames += 1
+
+    try:
+        writer.write(renderer.render(game_grid))
+        frames += 1
+        search = solver.SearchSolver(
+            max_nodes=max_nodes,
+            timeout=timeout,
+            observer=record,
+        )
+        solution = search.solve(game_grid)
+        if moves % every != 0 or moves == 0:
+            writer.write(renderer.render(solution))
+            frames += 1
+    finally:
+        writer.close()
+
+    return frames
@@ -0,0 +1,201 @@
+"""Generate random game grids which are known to have a solution."""
+
+import functools
+import random
+import string
+import sys
+import unicodedata
+from typing import Iterator, List, Optional, Tuple
+
+from .parser import HEADER_PREFIX, UNSET_SYMBOL
+
+
+def iter_pipe_labels() -> Iterator[str]:
+    """Iterate over the characters which can be used as pipe labels.
+
+    The printable ASCII characters come first, then the letters, numbers, punctuation
+    and symbols of the rest of Unicode. The symbols which the parser gives a meaning
+    to are left out.
+
+    :returns: an iterator of the pipe labels
+    """
+    for label in string.ascii_letters + string.digits + string.punctuation:
+        if label not in (UNSET_SYMBOL, HEADER_PREFIX):
+            yield label
+    for code in range(0xA1, sys.maxunicode + 1):
+        label = chr(code)
+        if unicodedata.category(label)[0] in "LNPS":
+            yield label
+
+
+@functools.lru_cache(maxsize=None)
+def count_pipe_labels() -> int:
+    """Count the characters which can be used as pipe labels.
+
+    :returns: the number of labels given by `iter_pipe_labels`
+    """
+    return sum(1 for _ in iter_pipe_labels())
+
+
+def get_pipe_count_range(num_cols: int, num_rows: int) -> Tuple[int, int]:
+    """Get the number of pipes which a game grid of a given size can be generated with.
+
+    The minimum grows with the shorter side of the grid, as the paths are laid out as
+    one serpentine path along every other row and a straight path along each row in
+    between, none of which may pass next to itself. The maximum keeps the pipes long
+    enough to cut at random, and there can't be more pipes than pipe labels.
+
+    :param num_cols: the number of columns in the grid
+    :param num_rows: the number of rows in the grid
+
+    :returns: the minimum and maximum number of pipes. The maximum is less than the
+        minimum if the grid is too big to have enough labels for its pipes.
+    """
+    width, height = max(num_cols, num_rows), min(num_cols, num_rows)
+    min_pipes = 1 + height // 2
+    return min_pipes, min(max(min_pipes, width * height // 4), count_pipe_labels())
+
+
+def generate_paths(
+    num_cols: int,
+    num_rows: int,
+    num_pipes: int,
+    rng: random.Random,
+) -> List[List[int]]:
+    """Partition a grid into random pipe paths which together fill every cell.
+
+    No two cells of a path are neighbors unless they are next to each other in the
+    path. The endpoints of a pipe thus only meet once the whole path is filled in,
+    whichever order it is filled in from, so the paths are always a solution.
+
+    The grid is first covered by a serpentine path along its even rows, which turns
+    through the end cell of each odd row, and by straight paths along the rest of the
+    odd rows. The paths are then cut at random until there are `num_pipes` of them.
+
+    :param num_cols: the number of columns in the grid
+    :param num_rows: the number of rows in the grid
+    :param num_pipes: the number of paths to partition the grid into
+    :param rng: the random number generator to use
+
+    :returns: the index of each cell of each path, in order, as given by
+        `PipesGrid.to_index`
+
+    :raises ValueError: if the grid can't be partitioned into `num_pipes` paths
+    """
+    if num_cols * num_rows < 2:
+        raise ValueError("Grid must have at least 2 cells")
+    min_pipes, max_pipes = get_pipe_count_range(num_cols, num_rows)
+    if not min_pipes <= num_pipes <= max_pipes:
+        raise ValueError(
+            f"A {num_cols}x{num_rows} grid must have {min_pipes} to {max_pipes} pipes"
+        )
+
+    cells, starts = _lay_out_paths(num_cols, num_rows, rng)
+
+    # Every path must keep at least 2 cells, so no two starts can be neighbors
+    is_start = bytearray(len(cells) + 1)
+    for start in starts:
+        is_start[start] = 1
+    is_start[len(cells)] = 1
+    while len(starts) < num_pipes:
+        cut = rng.randrange(2, len(cells) - 1)
+        if not is_start[cut - 1] | is_start[cut] | is_start[cut + 1]:
+            is_start[cut] = 1
+            starts.append(cut)
+
+    starts.sort()
+    return [cells[a:b] for a, b in zip(starts, starts[1:] + [len(cells)])]
+
+
+def _lay_out_paths(
+    num_cols: int,
+    num_rows: int,
+    rng: random.Random,
+) -> Tuple[List[int], List[int]]:
+    """Cover a grid with as few paths as possible, none of which touch themselves.
+
+    The paths are laid out along the longer side of the grid, and then flipped at
+    random.
+
+    :param num_cols: the number of columns in the grid
+    :param num_rows: the number of rows in the grid
+    :param rng: the random number generator to use
+
+    :returns: the index of each cell of all of the paths end to end, and the index
+        into those of the start of each path
+    """
+    transpose = num_cols < num_rows or (num_cols == num_rows and rng.random() < 0.5)
+    width, height = (num_rows, num_cols) if transpose else (num_cols, num_rows)
+    flip_x = rng.random() < 0.5
+    flip_y = rng.random() < 0.5
+
+    def to_index(x: int, y: int) -> int:
+        """Convert a position in the laid out grid to an index of the actual grid.
+
+        :param x: the column of the laid out grid
+        :param y: the row of the laid out grid
+
+        :returns: the index of the cell
+        """
+        if flip_x:
+            x = width - 1 - x
+        if flip_y:
+            y = height - 1 - y
+        return x * num_cols + y if transpose else y * num_cols + x
+
+    cells: List[int] = []
+    starts = [0]
+    for y in range(0, height, 2):
+        xs = range(width) if y % 4 == 0 else range(width - 1, -1, -1)
+        cells.extend(to_index(x, y) for x in xs)
+        if y + 2 < height:
+            cells.append(to_index(xs[-1], y + 1))
+    for y in range(1, height, 2):
+        starts.append(len(cells))
+        if y + 1 < height:
+            xs = range(width - 1) if y % 4 == 1 else range(1, width)
+        else:
+            xs = range(width)
+        cells.extend(to_index(x, y) for x in xs)
+
+    return cells, starts
+
+
+def generate(
+    num_cols: int,
+    num_rows: int,
+    num_pipes: int,
+    seed: Optional[int] = None,
+    solution: bool = False,
+) -> List[str]:
+    """Generate a random game grid which is known to have a solution.
+
+    :param num_cols: the number of columns in the grid
+    :param num_rows: the number of rows in the grid
+    :param num_pipes: the number of pipes in the grid
+    :param seed: the seed of the random number generator, or None for a random seed.
+        The same seed always generates the same game grid.
+    :param solution: whether to generate the solution rather than the game grid
+
+    :returns: the lines of text of the game grid, as parsed by
+        `parser.parse_from_lines`
+
+    :raises ValueError: if the game grid can't have `num_pipes` pipes
+    """
+    labels = [label for label, _ in zip(iter_pipe_labels(), range(num_pipes))]
+    rng = random.Random(seed)
+    paths = generate_paths(num_cols, num_rows, num_pipes, rng)
+    rng.shuffle(labels)
+
+    cells = [UNSET_SYMBOL] * (num_cols * num_rows)
+    for label, path in zip(labels, paths):
+        if solution:
+            for index in path:
+                cells[index] = label
+        else:
+            cells[path[0]] = cells[path[-1]] = label
+
+    return [
+        "".join(cells[start : start + num_cols])
+        for start in range(0, len(cells), num_cols)
+    ]
@@ -1,12 +1,65 @@
-"""Define the pipe grid storage."""
+"""Define the pipe grid storage.
 
+This module only depends on the standard library, so that solving grids doesn't pay
+for importing anything else. `CompactPipesGrid` imports numpy when it is first used.
+"""
+
+import array as arrays
+import collections
+import collections.abc
+import copy
 import dataclasses
-from typing import Generator, List, Optional, Set, Tuple
+import functools
+import itertools
+from typing import Dict, Generator, Iterator, List, Optional, Set, Tuple, Union
 
 UNSET = "unset"
 
+_MASK_64 = (1 << 64) - 1
+
+
+def _mix_64(value: int) -> int:
+    """Scramble a 64-bit integer, with the finaliser of splitmix64.
+
+    :param value: the integer to scramble
+
+    :returns: the scrambled integer
+    """
+    value = (value + 0x9E3779B97F4A7C15) & _MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_label_key(label: str) -> int:
+    """Get the random-looking 64-bit key of a pipe label.
+
+    :param label: the pipe label
+
+    :returns: the key
+    """
+    return _mix_64(int.from_bytes(label.encode(), "little"))
+
 
-@dataclasses.dataclass(order=True)
+def get_zobrist_key(index: int, label: str, is_endpoint: bool = False) -> int:
+    """Get the Zobrist key of a cell having a value, or being a pipe's endpoint.
+
+    The keys are derived from their arguments rather than drawn from a table, so
+    they don't need storing for every cell and label, and are the same in every
+    process.
+
+    :param index: the index of the cell, as given by `PipesGrid.to_index`
+    :param label: the pipe label
+    :param is_endpoint: whether to get the key of the cell being one of the pipe's
+        endpoints, rather than of the cell having the pipe label as its value
+
+    :returns: the 64-bit key
+    """
+    return _mix_64(_get_label_key(label) ^ (index << 1 | is_endpoint))
+
+
+@dataclasses.dataclass(order=True, frozen=True, slots=True)
 class Point:
     """A point in 2D space.
 
@@ -33,27 +86,173 @@ class Point:
 
         :returns: a tuple of the north, east, south and west neighbors of this point
         """
-        neighbors = [
-            Point(self.x + dx, self.y + dy)
-            for dx, dy in [
-                (0, -1),
-                (1, 0),
-                (0, 1),
-                (-1, 0),
-            ]
-        ]
+        return (
+            Point(self.x, self.y - 1),
+            Point(self.x + 1, self.y),
+            Point(self.x, self.y + 1),
+            Point(self.x - 1, self.y),
+        )
+
+
+# The number of entries which each lookup table of a grid shape keeps once they have
+# been created, so that the cells the solver is working on are looked up quickly
+TABLE_CACHE_SIZE = 1 << 16
+
+
+class GridPoints(collections.abc.Sequence):
+    """The point of each cell index of a grid, in row-major order.
+
+    Each point is created when it is asked for, rather than storing a point for every
+    cell, which would take far more memory than the cells themselves. Up to
+    `TABLE_CACHE_SIZE` of them are kept, for the cells which are looked up most.
+    """
+
+    def __init__(self, num_cols: int, num_rows: int) -> None:
+        """Create a new instance of `GridPoints`.
+
+        :param num_cols: the number of columns in the grid
+        :param num_rows: the number of rows in the grid
+        """
+        self.num_cols = num_cols
+        self.num_rows = num_rows
+        self._num_cells = num_cols * num_rows
+        self._cache: Dict[int, Point] = {}
+
+    def __len__(self) -> int:
+        """Get the number of cells.
+
+        :returns: the number of cells
+        """
+        return self._num_cells
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Point, List[Point]]:
+        """Get the point of a cell index.
+
+        :param index: the index of the cell, or a slice of indices
+
+        :returns: the point, or a list of the points of a slice
+
+        :raises IndexError: if the index is out of range
+        """
+        # This is called in the hot loops of the solver, so the common case comes first
+        try:
+            return self._cache[index]
+        except (KeyError, TypeError):
+            pass
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._num_cells))]
+        if index < 0:
+            return self[index + self._num_cells]
+        y, x = divmod(index, self.num_cols)
+        if y >= self.num_rows:
+            raise IndexError("Cell index out of range")
+        if len(self._cache) >= TABLE_CACHE_SIZE:
+            self._cache.clear()
+        point = self._cache[index] = Point(x, y)
+        return point
+
+    def __iter__(self) -> Iterator[Point]:
+        """Iterate over the point of each cell index.
+
+        :returns: an iterator of the points
+        """
+        return (Point(x, y) for y in range(self.num_rows) for x in range(self.num_cols))
+
+
+class NeighborTable(collections.abc.Sequence):
+    """The indices of the in-bounds neighbors of each cell index of a grid.
+
+    The table is a flat array of 4 entries per cell, for its north, east, south and
+    west neighbors, with -1 for a neighbor which is out of bounds. It is built with
+    slice assignments rather than cell by cell, and takes 16 bytes per cell. Up to
+    `TABLE_CACHE_SIZE` tuples of the in-bounds neighbors are kept once created.
+    """
+
+    def __init__(self, num_cols: int, num_rows: int) -> None:
+        """Create a new instance of `NeighborTable`.
+
+        :param num_cols: the number of columns in the grid
+        :param num_rows: the number of rows in the grid
+        """
+        num_cells = num_cols * num_rows
+        table = arrays.array("i", [-1]) * (4 * num_cells)
+        # Every cell has the neighbor one row or column away, except at the edges
+        table[4 * num_cols :: 4] = arrays.array("i", range(num_cells - num_cols))
+        table[1::4] = arrays.array("i", range(1, num_cells + 1))
+        table[4 * num_cols - 3 :: 4 * num_cols] = arrays.array("i", [-1]) * num_rows
+        table[2 : 4 * (num_cells - num_cols) : 4] = arrays.array(
+            "i", range(num_cols, num_cells)
+        )
+        table[3::4] = arrays.array("i", range(-1, num_cells - 1))
+        table[3 :: 4 * num_cols] = arrays.array("i", [-1]) * num_rows
+        self.table = table
+        self._num_cells = num_cells
+        self._cache: Dict[int, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        """Get the number of cells.
+
+        :returns: the number of cells
+        """
+        return self._num_cells
+
+    def __getitem__(self, index: int) -> Tuple[int, ...]:
+        """Get the indices of the in-bounds neighbors of a cell.
+
+        :param index: the index of the cell
+
+        :returns: the indices of the in-bounds north, east, south and west neighbors
+
+        :raises IndexError: if the index is out of range
+        """
+        try:
+            return self._cache[index]
+        except KeyError:
+            pass
+        if not 0 <= index < self._num_cells:
+            raise IndexError("Cell index out of range")
+        if len(self._cache) >= TABLE_CACHE_SIZE:
+            self._cache.clear()
+        start = 4 * index
+        neighbors = self._cache[index] = tuple(
+            n for n in self.table[start : start + 4] if n >= 0
+        )
         return neighbors
 
 
-class PipesGrid:
+@functools.lru_cache(maxsize=16)
+def get_grid_tables(num_cols: int, num_rows: int) -> Tuple[GridPoints, NeighborTable]:
+    """Get the lookup tables shared by all grids of a given shape.
+
+    Cells are indexed in row-major order. The tables are built once per grid shape,
+    so that the hot loops over a grid don't need to check bounds. They are flat, so
+    even the tables of a very large grid are small next to its cells.
+
+    :param num_cols: the number of columns in the grid
+    :param num_rows: the number of rows in the grid
+
+    :returns: a tuple of the point for each index, and the indices of the in-bounds
+        north, east, south and west neighbors for each index
+    """
+    return GridPoints(num_cols, num_rows), NeighborTable(num_cols, num_rows)
+
+
+# A `set_cell` made on a grid: the position filled, the pipe it was filled with, which
+# of the pipe's endpoints moved and where that endpoint moved from
+Move = Tuple[Point, str, str, Point]
+
+
+class PipesGrid:  # pylint: disable=too-many-instance-attributes
     """Container class for the pipe grid array data."""
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         num_cols: int,
         num_rows: int,
         array: List[List[Optional[str]]],
         pipe_labels: Set[str],
+        pipe_endpoints: Optional[Dict[str, Dict[str, Point]]] = None,
+        moves: Optional[List[Move]] = None,
     ):
         """Create a new instance of `PipesGrid`.
 
@@ -61,24 +260,156 @@ class PipesGrid:
         :param num_rows: the number of rows in the grid
         :param array: the pipe grid array data
         :param pipe_labels: the set of pipe labels which can be found within the `array`
+        :param pipe_endpoints: the current "start" and "end" endpoints of each pipe. If
+            not given, they are found from the `array`, which must then not have any
+            pipes partially filled in.
+        :param moves: the moves which filled in the `array`, as returned by
+            `get_moves`, for `rollback` to undo. If not given, the grid starts with no
+            moves to undo.
         """
         self.num_cols = num_cols
         self.num_rows = num_rows
-        self.array = array
         self.pipe_labels = pipe_labels
+        self.points, self.neighbor_indices = get_grid_tables(num_cols, num_rows)
+        self._init_cells(array)
+
+        if pipe_endpoints is None:
+            self.pipe_endpoints = {}
+            self._init_pipe_endpoints()
+        else:
+            self.pipe_endpoints = {
+                pipe: dict(endpoints) for pipe, endpoints in pipe_endpoints.items()
+            }
 
-        self.pipe_endpoints = {}
-        self._init_pipe_endpoints()
+        # The moves made by `set_cell`, which `rollback` undoes
+        self._trail: List[Move] = list(moves or [])
+
+        self._init_free_neighbors()
+        self._zobrist_hash: Optional[int] = None
+
+        # Indices of the cells written since the start of the current epoch. The log
+        # is restarted in a new epoch rather than being allowed to grow without bound.
+        self._change_log: List[int] = []
+        self._change_epoch = 0
+
+    def _init_free_neighbors(self) -> None:
+        """Initialise the count of unset neighbors of each cell.
+
+        All of the pipe endpoints are queued as changed, so that they are all looked
+        at by the first consumer of `pop_changed_cell`.
+        """
+        self._num_unset, self._free_neighbors = self._count_free_neighbors()
+        self._changed_cells = collections.deque(
+            endpoint
+            for endpoints in self.pipe_endpoints.values()
+            for endpoint in endpoints.values()
+        )
+
+    def _count_free_neighbors(self) -> Tuple[int, List[int]]:
+        """Count the unset cells, and the unset neighbors of each cell.
+
+        The neighbors are counted a row at a time, by shifting the row of unset cells
+        and the rows above and below it, rather than looking up the neighbors of each
+        cell.
+
+        :returns: the number of unset cells, and the number of unset neighbors of each
+            cell by index
+        """
+        free = [[value == UNSET for value in row] for row in self.array]
+        edge = [False] * self.num_cols
+        free_neighbors = []
+        for above, row, below in zip([edge] + free, free, free[1:] + [edge]):
+            free_neighbors.extend(
+                map(sum, zip(above, below, [False] + row[:-1], row[1:] + [False]))
+            )
+        return sum(map(sum, free)), free_neighbors
+
+    @property
+    def zobrist_hash(self) -> int:
+        """Get the Zobrist hash of the grid state.
+
+        The hash is the XOR of the key of every set cell and its value, and of the key
+        of every pipe endpoint. Equal states thus have equal hashes, whatever order
+        their cells were set in. The hash is only worked out when it is first asked
+        for, and is then updated in constant time by each `set_cell` and each move
+        undone by `rollback`.
+
+        :returns: the 64-bit hash
+        """
+        if self._zobrist_hash is None:
+            zobrist_hash = 0
+            for index, (_, value) in enumerate(self):
+                if value != UNSET:
+                    zobrist_hash ^= get_zobrist_key(index, value)
+            for pipe, endpoints in self.pipe_endpoints.items():
+                for endpoint in endpoints.values():
+                    zobrist_hash ^= get_zobrist_key(self.to_index(endpoint), pipe, True)
+            self._zobrist_hash = zobrist_hash
+        return self._zobrist_hash
+
+    def _update_zobrist_hash(
+        self, position: Point, value: str, previous: Point
+    ) -> None:
+        """Toggle a move in the Zobrist hash of the grid state, if it is in use.
+
+        :param position: the position of the cell set by the move
+        :param value: the pipe label the cell was set to
+        :param previous: the position of the pipe endpoint before the move
+        """
+        if self._zobrist_hash is None:
+            return
+        index = self.to_index(position)
+        self._zobrist_hash ^= (
+            get_zobrist_key(index, value)
+            ^ get_zobrist_key(index, value, True)
+            ^ get_zobrist_key(self.to_index(previous), value, True)
+        )
+
+    def to_index(self, position: Point) -> int:
+        """Convert a position into an index into the flattened grid.
+
+        The index is that of `position` within `points` and `neighbor_indices`.
+
+        :param position: the position to convert
+
+        :returns: the index of the position
+        """
+        return position.y * self.num_cols + position.x
+
+    def _init_cells(self, array: List[List[Optional[str]]]) -> None:
+        """Initialise the storage of the cell values.
+
+        :param array: the pipe grid array data
+        """
+        self.array = array
+
+    def _copy_cells(self) -> None:
+        """Replace the storage of the cell values with a copy of itself."""
+        self.array = [list(row) for row in self.array]
+
+    def _read_cell(self, position: Point) -> str:
+        """Read the value in a cell, without any bounds checking.
+
+        :param position: the position in the grid to read
+
+        :returns: the value in the cell
+        """
+        return self.array[position.y][position.x]
+
+    def _write_cell(self, position: Point, value: str) -> None:
+        """Write the value of a cell, without any checking.
+
+        :param position: the position in the grid to write
+        :param value: the value to write
+        """
+        self.array[position.y][position.x] = value
 
     def _init_pipe_endpoints(self) -> None:
         """Initialise the endpoints of the pipes in the grid.
 
         :raises ValueError: if not exactly 2 endpoints are found for any given pipe
         """
-        for point, value in self:
-            if value == UNSET:
-                continue
-
+        for point, value in self._iter_set_cells():
             if value not in self.pipe_endpoints:
                 self.pipe_endpoints[value] = {
                     "start": point,
@@ -93,6 +424,39 @@ class PipesGrid:
             if "end" not in endpoints:
                 raise ValueError(f"Only found 1 endpoint for pipe {pipe!r}")
 
+    def _iter_set_cells(self) -> Generator[Tuple[Point, str], None, None]:
+        """Iterate through the cells which are set, yielding their position and value.
+
+        :returns: a generator for each set cell
+        """
+        return (
+            (Point(x, y), value)
+            for y, row in enumerate(self.array)
+            for x, value in enumerate(row)
+            if value != UNSET
+        )
+
+    def copy(self) -> "PipesGrid":
+        """Copy the grid, including its undo trail and other bookkeeping.
+
+        This is much cheaper than `copy.deepcopy`, as the points and the lookup tables
+        are immutable, and so are shared between the copies.
+
+        :returns: the copy
+        """
+        # pylint: disable=protected-access
+        other = copy.copy(self)
+        other.pipe_labels = set(self.pipe_labels)
+        other.pipe_endpoints = {
+            pipe: dict(endpoints) for pipe, endpoints in self.pipe_endpoints.items()
+        }
+        other._trail = list(self._trail)
+        other._free_neighbors = list(self._free_neighbors)
+        other._changed_cells = collections.deque(self._changed_cells)
+        other._change_log = list(self._change_log)
+        other._copy_cells()
+        return other
+
     def is_pipe_complete(self, pipe_label: str) -> bool:
         """Check whether the 2 endpoints of a pipe are joined together.
 
@@ -111,6 +475,13 @@ class PipesGrid:
         """
         return all(self.is_pipe_complete(pipe_label) for pipe_label in self.pipe_labels)
 
+    def is_filled(self) -> bool:
+        """Check whether every cell in the grid has a value.
+
+        :returns: True if no cell in the grid is unset
+        """
+        return self._num_unset == 0
+
     def get_cell(self, position: Point) -> str:
         """Get the value in a cell.
 
@@ -123,7 +494,7 @@ class PipesGrid:
         if not self.is_position_in_bounds(position):
             raise ValueError("Position is out-of-bounds of the grid")
 
-        return self.array[position.y][position.x]
+        return self._read_cell(position)
 
     def set_cell(self, position: Point, value: str):
         """Set the value for a cell.
@@ -144,18 +515,128 @@ class PipesGrid:
         if value not in self.pipe_labels:
             raise ValueError(f"{value!r} is not a known pipe label")
 
-        if (existing := self.array[position.y][position.x]) != UNSET:
+        if (existing := self._read_cell(position)) != UNSET:
             raise RuntimeError(f"Position {position} already has a value {existing}")
 
         # Check if the position is a neighbor of an endpoint
-        if position.is_neighbor(self.pipe_endpoints[value]["start"]):
-            self.pipe_endpoints[value]["start"] = position
-        elif position.is_neighbor(self.pipe_endpoints[value]["end"]):
-            self.pipe_endpoints[value]["end"] = position
+        endpoints = self.pipe_endpoints[value]
+        if position.is_neighbor(endpoints["start"]):
+            endpoint = "start"
+        elif position.is_neighbor(endpoints["end"]):
+            endpoint = "end"
         else:
             raise RuntimeError(f"{position} is not a neighbor of {value}'s endpoint")
 
-        self.array[position.y][position.x] = value
+        self._trail.append((position, value, endpoint, endpoints[endpoint]))
+        self._update_zobrist_hash(position, value, endpoints[endpoint])
+        endpoints[endpoint] = position
+        self._write_cell(position, value)
+        self._num_unset -= 1
+        self._update_free_neighbors(position, -1)
+        self._log_change(position)
+
+    def checkpoint(self) -> int:
+        """Mark the current state of the grid so that it can be returned to later.
+
+        :returns: a token to pass to `rollback` to return to this state
+        """
+        return len(self._trail)
+
+    def rollback(self, token: int) -> None:
+        """Undo every `set_cell` made since a checkpoint.
+
+        :param token: the token returned by `checkpoint`
+
+        :raises ValueError: if `token` is not from a checkpoint of the current state
+            or of one of its predecessors
+        """
+        if not 0 <= token <= len(self._trail):
+            raise ValueError(f"Invalid checkpoint token {token}")
+
+        while len(self._trail) > token:
+            position, value, endpoint, previous = self._trail.pop()
+            self.pipe_endpoints[value][endpoint] = previous
+            self._update_zobrist_hash(position, value, previous)
+            self._write_cell(position, UNSET)
+            self._num_unset += 1
+            self._update_free_neighbors(position, 1)
+            self._log_change(position)
+
+    def get_moves(self) -> List[Move]:
+        """Get the moves which `rollback` can undo, in the order they were made.
+
+        :returns: a new list of the position filled by each `set_cell`, the pipe it was
+            filled with, which of the pipe's endpoints moved ("start" or "end") and
+            where that endpoint moved from
+        """
+        return list(self._trail)
+
+    def _update_free_neighbors(self, position: Point, delta: int) -> None:
+        """Update the unset neighbor counts around a cell which has changed.
+
+        The cell and its neighbors which have values are queued as changed.
+
+        :param position: the position of the cell which has changed
+        :param delta: the change in the number of unset cells at `position`
+        """
+        points = self.points
+        for neighbor in self.neighbor_indices[self.to_index(position)]:
+            self._free_neighbors[neighbor] += delta
+            if self._read_cell(points[neighbor]) != UNSET:
+                self._changed_cells.append(points[neighbor])
+        self._changed_cells.append(position)
+
+    def _log_change(self, position: Point) -> None:
+        """Record that the value of a cell has been written.
+
+        :param position: the position of the cell
+        """
+        if len(self._change_log) >= len(self.points):
+            self._change_log = []
+            self._change_epoch += 1
+        self._change_log.append(self.to_index(position))
+
+    def get_changes_since(
+        self,
+        token: Optional[Tuple[int, int]],
+    ) -> Tuple[Tuple[int, int], Optional[List[int]]]:
+        """Get the cells whose values have been written since an earlier call.
+
+        :param token: the token returned by an earlier call, or None if there was no
+            earlier call
+
+        :returns: a token to pass to the next call, and the indices of the cells
+            written since `token` was returned, possibly with duplicates. The indices
+            are None if there is no `token`, or if too many cells have been written to
+            keep track of.
+        """
+        new_token = (self._change_epoch, len(self._change_log))
+        if token is None or token[0] != self._change_epoch:
+            return new_token, None
+        return new_token, self._change_log[token[1] :]
+
+    def count_free_neighbors(self, position: Point) -> int:
+        """Count the unset in-bounds neighbors of a cell.
+
+        :param position: the position of the cell
+
+        :returns: the number of unset neighbors
+        """
+        return self._free_neighbors[self.to_index(position)]
+
+    def pop_changed_cell(self) -> Optional[Point]:
+        """Take the next cell whose value or number of unset neighbors has changed.
+
+        Every pipe endpoint is queued when the grid is created, and then again
+        whenever its number of unset neighbors changes. Cells are queued without
+        removing duplicates, and may no longer be endpoints by the time they are
+        taken, so it is up to the caller to check the cell.
+
+        :returns: the position of the cell, or None if no cells have changed
+        """
+        if not self._changed_cells:
+            return None
+        return self._changed_cells.popleft()
 
     def is_position_in_bounds(self, position: Point) -> bool:
         """Check whether a point is in-bounds of the array.
@@ -171,6 +652,136 @@ class PipesGrid:
 
         :returns: a generator for each cell
         """
-        for y in range(self.num_rows):
-            for x in range(self.num_cols):
-                yield Point(x, y), self.array[y][x]
+        yield from zip(self.points, itertools.chain.from_iterable(self.array))
+
+
+class CompactPipesGrid(PipesGrid):
+    """Pipe grid which stores its cells as a flat array of integer label codes.
+
+    Code 0 is `UNSET` and the pipe labels are numbered from 1 in sorted order. This
+    keeps a large grid small in memory, and makes copying and bulk checks of the grid
+    cheap numeric operations.
+
+    The `array` that the grid is created from can also be a NumPy array of the codes,
+    with a row for each row of the grid, which saves making a string for each cell.
+    """
+
+    def _init_cells(self, array: List[List[Optional[str]]]) -> None:
+        """Initialise the storage of the cell values.
+
+        :param array: the pipe grid array data, or a NumPy array of its codes
+        """
+        import numpy  # pylint: disable=import-outside-toplevel
+
+        self.labels = (UNSET, *sorted(self.pipe_labels))
+        self.label_codes = {label: code for code, label in enumerate(self.labels)}
+        if len(self.labels) <= 1 << 8:
+            dtype = numpy.uint8
+        elif len(self.labels) <= 1 << 16:
+            dtype = numpy.uint16
+        else:
+            dtype = numpy.int32
+        if isinstance(array, numpy.ndarray):
+            self.codes = array.astype(dtype).reshape(-1)
+        else:
+            self.codes = numpy.fromiter(
+                (self.label_codes[value] for row in array for value in row),
+                dtype=dtype,
+                count=self.num_cols * self.num_rows,
+            )
+
+    def _copy_cells(self) -> None:
+        """Replace the storage of the cell values with a copy of itself."""
+        self.codes = self.codes.copy()
+
+    @classmethod
+    def from_grid(cls, grid: PipesGrid) -> "CompactPipesGrid":
+        """Create a compact copy of another pipe grid, including its moves to undo.
+
+        :param grid: the grid to copy
+
+        :returns: the compact grid
+        """
+        return cls(
+            num_cols=grid.num_cols,
+            num_rows=grid.num_rows,
+            array=grid.array,
+            pipe_labels=set(grid.pipe_labels),
+            pipe_endpoints=grid.pipe_endpoints,
+            moves=grid.get_moves(),
+        )
+
+    @property
+    def array(self) -> List[List[str]]:
+        """Get the cell values as a list of rows.
+
+        :returns: a new list of rows of cell values
+        """
+        labels = self.labels
+        return [
+            [labels[code] for code in row]
+            for row in self.codes.reshape(self.num_rows, self.num_cols).tolist()
+        ]
+
+    def _read_cell(self, position: Point) -> str:
+        """Read the value in a cell, without any bounds checking.
+
+        :param position: the position in the grid to read
+
+        :returns: the value in the cell
+        """
+        return self.labels[self.codes[position.y * self.num_cols + position.x]]
+
+    def _write_cell(self, position: Point, value: str) -> None:
+        """Write the value of a cell, without any checking.
+
+        :param position: the position in the grid to write
+        :param value: the value to write
+        """
+        self.codes[position.y * self.num_cols + position.x] = self.label_codes[value]
+
+    def __iter__(self) -> Generator[Tuple[Point, Optional[str]], None, None]:
+        """Iterate through each element in the grid, yielding is position and value.
+
+        :returns: a generator for each cell
+        """
+        labels = self.labels
+        for point, code in zip(self.points, self.codes.tolist()):
+            yield point, labels[code]
+
+    def _count_free_neighbors(self) -> Tuple[int, List[int]]:
+        """Count the unset cells, and the unset neighbors of each cell.
+
+        The neighbors are counted for every cell at once, by shifting the grid of
+        unset cells in each direction.
+
+        :returns: the number of unset cells, and the number of unset neighbors of each
+            cell by index
+        """
+        import numpy  # pylint: disable=import-outside-toplevel
+
+        free = (self.codes == 0).reshape(self.num_rows, self.num_cols)
+        free = free.astype(numpy.uint8)
+        counts = numpy.zeros_like(free)
+        counts[1:, :] += free[:-1, :]
+        counts[:-1, :] += free[1:, :]
+        counts[:, 1:] += free[:, :-1]
+        counts[:, :-1] += free[:, 1:]
+        return int(free.sum()), counts.reshape(-1).tolist()
+
+    def _iter_set_cells(self) -> Generator[Tuple[Point, str], None, None]:
+        """Iterate through the cells which are set, yielding their position and value.
+
+        Only the set cells are looked at, which are few in a grid which has just been
+        parsed.
+
+        :returns: a generator for each set cell
+        """
+        import numpy  # pylint: disable=import-outside-toplevel
+
+        indices = numpy.flatnonzero(self.codes)
+        labels = self.labels
+        return (
+            (self.points[index], labels[code])
+            for index, code in zip(indices.tolist(), self.codes[indices].tolist())
+        )
@@ -0,0 +1,534 @@
+"""Solve a game grid with a search spread across a pool of processes."""
+
+import concurrent.futures
+import multiprocessing
+import time
+from multiprocessing.synchronize import Event
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import decompose, solver
+from .connectivity import ConnectivityChecker
+from .grid import PipesGrid, Point
+
+# The cells and pipe endpoints of a game grid, which is all that needs to be sent to
+# another process to carry on searching from it
+Subproblem = Tuple[List[List[str]], Dict[str, Dict[str, Point]]]
+
+# Set in each worker process, to stop its search once another has found a solution
+_cancelled: Optional[Event] = None  # pylint: disable=invalid-name
+
+# The number of moves made between checks of whether the search has been cancelled
+CANCEL_CHECK_MOVES = 64
+
+# The maximum depth of the search tree to split before handing it to the workers
+MAX_SPLIT_DEPTH = 8
+
+
+class _Cancelled(Exception):
+    """The search was cancelled by another worker finding a solution."""
+
+
+def _init_worker(cancelled: Event) -> None:
+    """Initialise a worker process.
+
+    :param cancelled: the event which is set once a solution has been found
+    """
+    global _cancelled  # pylint: disable=global-statement
+    _cancelled = cancelled
+
+
+def to_subproblem(game_grid: PipesGrid) -> Subproblem:
+    """Capture the state of a game grid, to be sent to another process.
+
+    :param game_grid: the game grid
+
+    :returns: the cells and pipe endpoints of the game grid
+    """
+    return game_grid.array, game_grid.pipe_endpoints
+
+
+def from_subproblem(
+    num_cols: int,
+    num_rows: int,
+    pipe_labels: set,
+    subproblem: Subproblem,
+) -> PipesGrid:
+    """Rebuild a game grid from its captured state.
+
+    :param num_cols: the number of columns in the grid
+    :param num_rows: the number of rows in the grid
+    :param pipe_labels: the pipe labels of the grid
+    :param subproblem: the cells and pipe endpoints of the game grid
+
+    :returns: the game grid
+    """
+    array, pipe_endpoints = subproblem
+    return PipesGrid(num_cols, num_rows, array, set(pipe_labels), pipe_endpoints)
+
+
+def split(
+    game_grid: PipesGrid,
+    allow_touching: bool = False,
+) -> Tuple[Optional[PipesGrid], List[PipesGrid]]:
+    """Split the search from a game grid into the searches from each of its branches.
+
+    :param game_grid: the game grid. It is not modified.
+    :param allow_touching: whether a pipe can pass next to itself in the solutions
+        looked for
+
+    :returns: the solution if it was found by making forced moves, and the game grid
+        after each of the moves of the most constrained branch. There are no branches
+        if the game grid was found to be unsolvable.
+    """
+    candidate = game_grid.copy()
+    if not solver.propagate(candidate, allow_touching=allow_touching):
+        return None, []
+    if not ConnectivityChecker(candidate).is_feasible():
+        return None, []
+    if solver.is_solved(candidate):
+        return candidate, []
+    branch = solver.get_most_constrained_branch(candidate, allow_touching)
+    if branch is None:
+        return None, []
+
+    pipe, options = branch
+    branches = []
+    for position in options:
+        child = candidate.copy()
+        child.set_cell(position, pipe)
+        branches.append(child)
+    return None, branches
+
+
+def _make_cancel_check() -> Callable[[PipesGrid], None]:
+    """Make a search observer which stops the search once a solution has been found.
+
+    The moves are counted rather than read from the depth of the search, which may
+    never reach a multiple of `CANCEL_CHECK_MOVES`, or may keep crossing the same one.
+
+    :returns: the observer, which checks for cancellation on its first call and then
+        every `CANCEL_CHECK_MOVES` calls
+    """
+    moves = 0
+
+    def check_cancelled(_: PipesGrid) -> None:
+        """Stop the search if another worker has found a solution.
+
+        :raises _Cancelled: if the search has been cancelled
+        """
+        nonlocal moves
+        if moves % CANCEL_CHECK_MOVES == 0 and _cancelled.is_set():
+            raise _Cancelled()
+        moves += 1
+
+    return check_cancelled
+
+
+def _solve_subproblem(  # pylint: disable=too-many-arguments
+    num_cols: int,
+    num_rows: int,
+    pipe_labels: set,
+    subproblem: Subproblem,
+    max_nodes: int,
+    allow_touching: bool,
+) -> dict:
+    """Search from a subproblem in a worker process, splitting it if it takes too long.
+
+    :param num_cols: the number of columns in the grid
+    :param num_rows: the number of rows in the grid
+    :param pipe_labels: the pipe labels of the grid
+    :param subproblem: the cells and pipe endpoints of the game grid to search from
+    :param max_nodes: the number of search nodes to visit before splitting the
+        subproblem into the subproblems of its branches
+    :param allow_touching: whether a pipe can pass next to itself in the solutions
+        looked for
+
+    :returns: a record of the result. Its "status" is one of "solved", "unsolvable",
+        "split" or "cancelled", with the "solution" or the "subproblems" of a split.
+    """
+    game_grid = from_subproblem(num_cols, num_rows, pipe_labels, subproblem)
+    search = solver.SearchSolver(
+        max_nodes=max_nodes,
+        observer=_make_cancel_check(),
+        allow_touching=allow_touching,
+    )
+    result = {}
+    try:
+        solution = search.solve(game_grid)
+    except _Cancelled:
+        result["status"] = "cancelled"
+    except solver.UnsolvableError:
+        result["status"] = "unsolvable"
+    except solver.SearchLimitError:
+        solution, branches = split(game_grid, allow_touching)
+        if solution is not None:
+            result.update(status="solved", solution=to_subproblem(solution))
+        else:
+            subproblems = [to_subproblem(branch) for branch in branches]
+            result.update(status="split", subproblems=subproblems)
+    else:
+        result.update(status="solved", solution=to_subproblem(solution))
+
+    result["nodes"] = search.nodes
+    return result
+
+
+class ParallelSolver:  # pylint: disable=too-few-public-methods
+    """Search solver which spreads the search tree across a pool of processes.
+
+    The search tree is split at its shallowest branch points until there are a few
+    subproblems for each worker. Each subproblem is searched for up to `split_nodes`
+    nodes, after which it is split again into the subproblems of its branches and put
+    back in the queue. Hard parts of the tree thus keep being broken up between the
+    workers, while easy parts are searched without any overhead. The first solution
+    found cancels the search in every other worker.
+
+    As with `solver.SearchSolver`, solutions where no pipe passes next to itself are
+    looked for first, and only if there are none is the search tree split and
+    searched again for the rest.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_nodes: Optional[int] = None,
+        timeout: Optional[float] = None,
+        split_nodes: int = 2000,
+    ) -> None:
+        """Create a new instance of `ParallelSolver`.
+
+        :param workers: the number of processes to search with, or None for one per
+            CPU
+        :param max_nodes: the maximum number of search nodes to visit across all of
+            the workers before giving up, or None for no limit
+        :param timeout: the maximum number of seconds to search for before giving up,
+            or None for no limit
+        :param split_nodes: the number of search nodes to visit from a subproblem
+            before splitting it
+        """
+        self.workers = workers
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.split_nodes = split_nodes
+        self.nodes = 0
+
+    def solve(self, game_grid: PipesGrid) -> PipesGrid:
+        """Solve a game grid.
+
+        :param game_grid: the game grid to solve. It is not modified.
+
+        :returns: a solved copy of the game grid
+
+        :raises UnsolvableError: if the game grid has no solution
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        self.nodes = 0
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.monotonic() + self.timeout
+        for allow_touching in (False, True):
+            solution = self._search(game_grid, allow_touching, deadline)
+            if solution is not None:
+                return solution
+        raise solver.UnsolvableError("Game grid has no solution")
+
+    def _search(
+        self,
+        game_grid: PipesGrid,
+        allow_touching: bool,
+        deadline: Optional[float],
+    ) -> Optional[PipesGrid]:
+        """Search for a solution of a game grid across the pool of processes.
+
+        :param game_grid: the game grid to solve. It is not modified.
+        :param allow_touching: whether a pipe can pass next to itself in the
+            solutions looked for
+        :param deadline: the `time.monotonic` time at which to give up, or None for no
+            limit
+
+        :returns: a solved copy of the game grid, or None if it has no solution of
+            the kind looked for
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        shape = (game_grid.num_cols, game_grid.num_rows, game_grid.pipe_labels)
+
+        solution, subproblems = self._split_shallowest(game_grid, allow_touching)
+        if solution is not None:
+            return solution
+
+        cancelled = multiprocessing.Event()
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(cancelled,),
+        ) as pool:
+            pending = {
+                pool.submit(
+                    _solve_subproblem,
+                    *shape,
+                    subproblem,
+                    self.split_nodes,
+                    allow_touching,
+                )
+                for subproblem in subproblems
+            }
+            try:
+                while pending:
+                    remaining = None
+                    if deadline is not None:
+                        remaining = max(0.0, deadline - time.monotonic())
+                    done, pending = concurrent.futures.wait(
+                        pending,
+                        timeout=remaining,
+                        return_when=concurrent.futures.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        raise solver.SearchLimitError(
+                            f"Gave up after {self.timeout} seconds"
+                        )
+
+                    for future in done:
+                        result = future.result()
+                        self.nodes += result["nodes"]
+                        if result["status"] == "solved":
+                            return from_subproblem(*shape, result["solution"])
+                        for subproblem in result.get("subproblems", []):
+                            pending.add(
+                                pool.submit(
+                                    _solve_subproblem,
+                                    *shape,
+                                    subproblem,
+                                    self.split_nodes,
+                                    allow_touching,
+                                )
+                            )
+
+                    if self.max_nodes is not None and self.nodes > self.max_nodes:
+                        raise solver.SearchLimitError(
+                            f"Gave up after {self.max_nodes} search nodes"
+                        )
+            finally:
+                cancelled.set()
+                for future in pending:
+                    future.cancel()
+
+        return None
+
+    def _split_shallowest(
+        self,
+        game_grid: PipesGrid,
+        allow_touching: bool,
+    ) -> Tuple[Optional[PipesGrid], List[Subproblem]]:
+        """Split the search tree at its shallowest branch points.
+
+        :param game_grid: the game grid to split the search from
+        :param allow_touching: whether a pipe can pass next to itself in the
+            solutions looked for
+
+        :returns: the solution if it was found while splitting, and the subproblems
+            to search from. There are a few subproblems for each worker, unless the
+            search tree is too small.
+        """
+        target = 4 * (self.workers or multiprocessing.cpu_count())
+        frontier = [game_grid]
+        for _ in range(MAX_SPLIT_DEPTH):
+            if not 0 < len(frontier) < target:
+                break
+            next_frontier = []
+            for node in frontier:
+                self.nodes += 1
+                solution, branches = split(node, allow_touching)
+                if solution is not None:
+                    return solution, []
+                next_frontier.extend(branches)
+            frontier = next_frontier
+        return None, [to_subproblem(node) for node in frontier]
+
+
+def _solve_component(
+    game_grid: PipesGrid,
+    max_nodes: Optional[int],
+    deadline: Optional[float],
+    allow_touching: bool,
+) -> Tuple[Optional[PipesGrid], int]:
+    """Solve the game grid of a component in a worker process.
+
+    :param game_grid: the game grid of the component
+    :param max_nodes: the maximum number of search nodes to visit before giving up,
+        or None for no limit
+    :param deadline: the `time.monotonic` time at which to give up, or None for no
+        limit. A component which waited in the queue thus only has the time left.
+    :param allow_touching: whether a pipe can pass next to itself in the solutions
+        looked for
+
+    :returns: the solution, or None if the component has no solution of the kind
+        looked for, and the number of search nodes visited
+
+    :raises SearchLimitError: if the node or time limit has been exceeded
+    """
+    timeout = None
+    if deadline is not None:
+        timeout = max(0.0, deadline - time.monotonic())
+    search = solver.SearchSolver(
+        max_nodes=max_nodes,
+        timeout=timeout,
+        decompose=True,
+        allow_touching=allow_touching,
+    )
+    try:
+        solution = search.solve(game_grid)
+    except solver.UnsolvableError:
+        solution = None
+    return solution, search.nodes
+
+
+class ComponentSolver:  # pylint: disable=too-few-public-methods
+    """Solver which solves the independent components of a game grid in parallel.
+
+    The moves found by the deduction rules are made first, as they often cut a game
+    grid into components. Each component is then searched on its own in a pool of
+    processes, and the solutions are merged back together.
+
+    As with `solver.SearchSolver`, solutions where no pipe passes next to itself are
+    looked for first, and only if there are none is the game grid solved again for the
+    rest. The node and time limits are shared by every component of both searches.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_nodes: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Create a new instance of `ComponentSolver`.
+
+        :param workers: the number of processes to search with, or None for one per
+            CPU
+        :param max_nodes: the maximum number of search nodes to visit across all of
+            the components before giving up, or None for no limit
+        :param timeout: the maximum number of seconds to search for before giving up,
+            or None for no limit
+        """
+        self.workers = workers
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.nodes = 0
+        self._deadline: Optional[float] = None
+
+    def solve(self, game_grid: PipesGrid) -> PipesGrid:
+        """Solve a game grid.
+
+        :param game_grid: the game grid to solve. It is not modified.
+
+        :returns: a solved copy of the game grid
+
+        :raises UnsolvableError: if the game grid has no solution
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        self.nodes = 0
+        self._deadline = None
+        if self.timeout is not None:
+            self._deadline = time.monotonic() + self.timeout
+        for allow_touching in (False, True):
+            if (solution := self._search(game_grid, allow_touching)) is not None:
+                return solution
+        raise solver.UnsolvableError("Game grid has no solution")
+
+    def _search(
+        self,
+        game_grid: PipesGrid,
+        allow_touching: bool,
+    ) -> Optional[PipesGrid]:
+        """Solve each component of a game grid in the pool of processes.
+
+        :param game_grid: the game grid to solve. It is not modified.
+        :param allow_touching: whether a pipe can pass next to itself in the
+            solutions looked for
+
+        :returns: a solved copy of the game grid, or None if it has no solution of
+            the kind looked for
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        self.nodes += 1
+        candidate = game_grid.copy()
+        if not solver.propagate(candidate, allow_touching=allow_touching):
+            return None
+        if solver.is_solved(candidate):
+            return candidate
+
+        components = decompose.find_components(candidate)
+        if not all(component.cells and component.pipes for component in components):
+            return None
+        return self._solve_components(candidate, components, allow_touching)
+
+    def _solve_components(
+        self,
+        game_grid: PipesGrid,
+        components: List[decompose.Component],
+        allow_touching: bool,
+    ) -> Optional[PipesGrid]:
+        """Search each independent component of a game grid in the pool of processes.
+
+        :param game_grid: the game grid, with the forced moves made
+        :param components: the components of the game grid
+        :param allow_touching: whether a pipe can pass next to itself in the
+            solutions looked for
+
+        :returns: the solution, or None if a component has no solution
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        # The components run at the same time, so each may use all of the nodes left,
+        # and the total is checked as their results come in
+        max_nodes = None
+        if self.max_nodes is not None:
+            max_nodes = max(0, self.max_nodes - self.nodes)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = []
+            for component in components:
+                sub_grid, offset = decompose.extract_component(game_grid, component)
+                future = pool.submit(
+                    _solve_component,
+                    sub_grid,
+                    max_nodes,
+                    self._deadline,
+                    allow_touching,
+                )
+                futures.append((component, offset, future))
+
+            solutions = []
+            try:
+                for component, offset, future in futures:
+                    try:
+                        solution, nodes = future.result()
+                    except solver.SearchLimitError as e:
+                        # Give up with this solver's own limits in the message. If the
+                        # time is not up, the component used all of the nodes left.
+                        self._check_limits()
+                        raise solver.SearchLimitError(
+                            f"Gave up after {self.max_nodes} search nodes"
+                        ) from e
+                    self.nodes += nodes
+                    self._check_limits()
+                    if solution is None:
+                        return None
+                    solutions.append((component, solution, offset))
+            finally:
+                for _, _, future in futures:
+                    future.cancel()
+
+        return decompose.merge_components(game_grid, solutions)
+
+    def _check_limits(self) -> None:
+        """Check the search limits.
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise solver.SearchLimitError(
+                f"Gave up after {self.max_nodes} search nodes"
+            )
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            raise solver.SearchLimitError(f"Gave up after {self.timeout} seconds")
@@ -1,17 +1,26 @@
 """Parse pipes input file."""
 
+import mmap
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Tuple, Type
 
-from .grid import PipesGrid, UNSET
+from .grid import CompactPipesGrid, PipesGrid, UNSET
 
 UNSET_SYMBOL = "#"
 
+# A line of a multi-puzzle file which starts with this is a header, such as the name of
+# the puzzle after it. It is thus not a valid pipe label, so that no row of a grid can
+# be taken for a header.
+HEADER_PREFIX = ";"
 
-def parse_from_file(filepath: Path) -> PipesGrid:
+
+def parse_from_file(
+    filepath: Path, grid_type: Type[PipesGrid] = PipesGrid
+) -> PipesGrid:
     """Parse a pipes grid from the contents of a file.
 
     :param filepath: the path to the file containing the pipes grid spec
+    :param grid_type: the type of pipes grid to create
 
     :returns: the parsed pipe grid
 
@@ -19,16 +28,20 @@ def parse_from_file(filepath: Path) -> PipesGrid:
     """
     lines = filepath.read_text().splitlines()
     try:
-        grid = parse_from_lines(lines)
+        grid = parse_from_lines(lines, grid_type)
     except ValueError as e:
         raise ValueError("File does not contain a valid grid") from e
     return grid
 
 
-def parse_from_lines(lines: List[str]) -> PipesGrid:
+def parse_from_lines(
+    lines: List[str],
+    grid_type: Type[PipesGrid] = PipesGrid,
+) -> PipesGrid:
     """Parse a pipes grid from lines of text.
 
     :param lines: the lines of test containing the pipes grid spec
+    :param grid_type: the type of pipes grid to create
 
     :returns: the parsed pipe grid
 
@@ -41,11 +54,143 @@ def parse_from_lines(lines: List[str]) -> PipesGrid:
     num_cols = len(array[0])
     num_rows = len(array)
     pipe_labels = set(val for row in array for val in row if val is not UNSET)
+    if HEADER_PREFIX in pipe_labels:
+        raise ValueError(f"{HEADER_PREFIX!r} is not a valid pipe label")
 
-    grid = PipesGrid(
+    grid = grid_type(
         num_cols=num_cols,
         num_rows=num_rows,
         array=array,
         pipe_labels=pipe_labels,
     )
     return grid
+
+
+def grid_to_lines(grid: PipesGrid) -> List[str]:
+    """Format a pipes grid as lines of text, as parsed by `parse_from_lines`.
+
+    :param grid: the pipes grid to format
+
+    :returns: the lines of text
+    """
+    return [
+        "".join(UNSET_SYMBOL if value == UNSET else value for value in row)
+        for row in grid.array
+    ]
+
+
+def iter_puzzles(
+    filepath: Path,
+    grid_type: Type[PipesGrid] = CompactPipesGrid,
+) -> Iterator[PipesGrid]:
+    """Parse each pipes grid in a file of many, one at a time.
+
+    The grids are separated by blank lines, or by header lines which start with
+    `HEADER_PREFIX`, and are otherwise in the format of `parse_from_lines`, which
+    doesn't allow `HEADER_PREFIX` as a pipe label. A file of one grid is thus a file of
+    many grids too.
+
+    The file is memory-mapped rather than read, and each grid is only parsed when it
+    is reached, so memory use doesn't grow with the size of the file. A
+    `CompactPipesGrid` is made straight from the bytes of the file, without making a
+    string for each cell.
+
+    :param filepath: the path to the file of grids
+    :param grid_type: the type of pipes grid to create
+
+    :returns: a generator of the parsed pipe grids, in the order of the file
+
+    :raises ValueError: if any grid in the file is not valid. The grids before it are
+        generated first.
+    """
+    with open(filepath, "rb") as file:
+        if file.seek(0, 2) == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for number, spans in enumerate(_iter_puzzle_spans(data), start=1):
+                try:
+                    if issubclass(grid_type, CompactPipesGrid):
+                        yield _parse_compact(data, spans, grid_type)
+                    else:
+                        lines = [data[start:end].decode() for start, end in spans]
+                        yield parse_from_lines(lines, grid_type)
+                except ValueError as e:
+                    raise ValueError(f"Grid {number} is not a valid grid") from e
+
+
+def _iter_puzzle_spans(data: mmap.mmap) -> Iterator[List[Tuple[int, int]]]:
+    """Find the lines of each grid in a file of many.
+
+    :param data: the contents of the file
+
+    :returns: a generator of the start and end offsets of the lines of each grid
+    """
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    while start < len(data):
+        end = data.find(b"\n", start)
+        if end == -1:
+            end = len(data)
+        following = end + 1
+        if end > start and data[end - 1] == ord("\r"):
+            end -= 1
+
+        if end == start or data[start] == ord(HEADER_PREFIX):
+            if spans:
+                yield spans
+                spans = []
+        else:
+            spans.append((start, end))
+        start = following
+
+    if spans:
+        yield spans
+
+
+def _parse_compact(
+    data: mmap.mmap,
+    spans: List[Tuple[int, int]],
+    grid_type: Type[CompactPipesGrid],
+) -> CompactPipesGrid:
+    """Parse a compact pipes grid straight from the bytes of its lines.
+
+    :param data: the contents of the file
+    :param spans: the start and end offsets of the lines of the grid
+    :param grid_type: the type of pipes grid to create
+
+    :returns: the parsed pipe grid
+
+    :raises ValueError: if the lines do not define a valid grid
+    """
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    # The bytes of the grid are copied out of the file in one slice, so that no view
+    # of the file is held, which would stop it from being closed
+    first, last = spans[0][0], spans[-1][1]
+    block = data[first:last]
+    if not block.isascii():
+        # A label which isn't ASCII takes more than 1 byte, so decode it instead
+        lines = [data[start:end].decode() for start, end in spans]
+        return parse_from_lines(lines, grid_type)
+
+    num_cols = spans[0][1] - spans[0][0]
+    if any(end - start != num_cols for start, end in spans):
+        raise ValueError("Not all rows in grid are of equal length")
+    starts = numpy.array([start - first for start, _ in spans])
+    cells = numpy.frombuffer(block, dtype=numpy.uint8)[
+        starts[:, numpy.newaxis] + numpy.arange(num_cols)
+    ]
+
+    # Each byte is looked up in a table of the code of each label
+    values = numpy.unique(cells)
+    if ord(HEADER_PREFIX) in values:
+        raise ValueError(f"{HEADER_PREFIX!r} is not a valid pipe label")
+    values = values[values != ord(UNSET_SYMBOL)]
+    table = numpy.zeros(256, dtype=numpy.uint8)
+    table[values] = numpy.arange(1, len(values) + 1)
+    return grid_type(
+        num_cols=num_cols,
+        num_rows=len(spans),
+        array=table[cells],
+        pipe_labels={chr(value) for value in values.tolist()},
+    )
@@ -0,0 +1,426 @@
+"""Deduction rules which find the moves that any solution of a game grid must make."""
+
+import abc
+import collections
+from typing import Callable, Counter, Dict, Iterable, List, Optional, Tuple, Type
+
+from .connectivity import ConnectivityChecker
+from .grid import PipesGrid, Point, UNSET
+
+# Each rule is a class with a single method to apply it
+# pylint: disable=too-few-public-methods
+
+# A position to fill and the pipe to fill it with
+Move = Tuple[Point, str]
+
+RULES: Dict[str, Type["Rule"]] = {}
+
+# The rules used when none are asked for. The no-2x2 rule is left out, as the game
+# allows a pipe to fill a 2x2 block of cells.
+DEFAULT_RULES = ("forced-extension", "dead-end", "reachability")
+
+
+class Contradiction(Exception):
+    """A rule has found that the game grid has no solution."""
+
+
+def register_rule(name: str) -> Callable[[Type["Rule"]], Type["Rule"]]:
+    """Register a rule, so that it can be asked for by name.
+
+    :param name: the name of the rule
+
+    :returns: a decorator which registers the rule
+    """
+
+    def register(cls: Type["Rule"]) -> Type["Rule"]:
+        """Register the rule.
+
+        :param cls: the rule
+
+        :returns: the rule, unchanged
+        """
+        cls.name = name
+        RULES[name] = cls
+        return cls
+
+    return register
+
+
+def check_rules(rules: Optional[Iterable[str]]) -> List[str]:
+    """Check that rules are registered.
+
+    :param rules: the names of the rules, or None for `DEFAULT_RULES`
+
+    :returns: the names of the rules
+
+    :raises ValueError: if a rule is not registered
+    """
+    names = list(DEFAULT_RULES if rules is None else rules)
+    for name in names:
+        if name not in RULES:
+            raise ValueError(f"Unknown rule {name!r}")
+    return names
+
+
+def get_pipe_head(game_grid: PipesGrid, index: int) -> Optional[str]:
+    """Get the pipe which a cell is an endpoint of, if the pipe is not yet complete.
+
+    :param game_grid: the game grid
+    :param index: the index of the cell
+
+    :returns: the pipe label, or None if the cell is not an endpoint of an incomplete
+        pipe
+    """
+    position = game_grid.points[index]
+    if (pipe := game_grid.get_cell(position)) == UNSET:
+        return None
+    endpoints = game_grid.pipe_endpoints[pipe]
+    if position not in (endpoints["start"], endpoints["end"]):
+        return None
+    if game_grid.is_pipe_complete(pipe):
+        return None
+    return pipe
+
+
+class Rule(abc.ABC):
+    """A deduction which finds forced moves and contradictions in a game grid.
+
+    Rules are either a `CellRule` or a `GridRule`, and must implement `apply`. A rule
+    returns a move which every solution makes, or raises `Contradiction` if there is no
+    solution.
+    """
+
+    name = ""
+
+    def __init__(self, engine: "RuleEngine") -> None:
+        """Create a new instance of `Rule`.
+
+        :param engine: the rule engine which runs the rule
+        """
+        self.engine = engine
+        self.game_grid = engine.game_grid
+
+
+class CellRule(Rule):
+    """A rule which looks at the cells around each cell which has changed."""
+
+    @abc.abstractmethod
+    def apply(self, position: Point) -> Optional[Move]:
+        """Look for a deduction around a cell which has changed.
+
+        :param position: the position of the cell
+
+        :returns: the move, or None if there is no deduction
+
+        :raises Contradiction: if the game grid has no solution
+        """
+
+
+class GridRule(Rule):
+    """A rule which looks at the whole game grid, once no changed cells are left."""
+
+    @abc.abstractmethod
+    def apply(self) -> Optional[Move]:
+        """Look for a deduction across the whole game grid.
+
+        :returns: the move, or None if there is no deduction
+
+        :raises Contradiction: if the game grid has no solution
+        """
+
+
+@register_rule("forced-extension")
+class ForcedExtension(CellRule):
+    """A pipe endpoint with only one unset neighbor must extend into it."""
+
+    def apply(self, position: Point) -> Optional[Move]:
+        """Look for a deduction around a cell which has changed.
+
+        :param position: the position of the cell
+
+        :returns: the move, or None if there is no deduction
+
+        :raises Contradiction: if the game grid has no solution
+        """
+        game_grid = self.game_grid
+        index = game_grid.to_index(position)
+        if (pipe := get_pipe_head(game_grid, index)) is None:
+            return None
+        count = game_grid.count_free_neighbors(position)
+        if count == 0:
+            raise Contradiction(f"Pipe {pipe} is cut off at {position}")
+        if count > 1:
+            return None
+
+        for n in game_grid.neighbor_indices[index]:
+            if game_grid.get_cell(game_grid.points[n]) == UNSET:
+                if self.engine.can_move_now(game_grid.points[n], pipe):
+                    return game_grid.points[n], pipe
+        return None
+
+
+@register_rule("dead-end")
+class DeadEnd(CellRule):
+    """An unset cell is filled by the middle of a pipe, so it needs 2 ways in.
+
+    Only its unset neighbors and the endpoints of incomplete pipes can lead into a
+    cell. With fewer than 2 of those, the cell would be a dead end. With exactly 2, a
+    pipe endpoint among them must extend into the cell. The cell then only has one way
+    onward, so the move can always be made straight away.
+    """
+
+    def apply(self, position: Point) -> Optional[Move]:
+        """Look for a deduction around a cell which has changed.
+
+        :param position: the position of the cell
+
+        :returns: the move, or None if there is no deduction
+
+        :raises Contradiction: if the game grid has no solution
+        """
+        game_grid = self.game_grid
+        index = game_grid.to_index(position)
+        for n in (index, *game_grid.neighbor_indices[index]):
+            if game_grid.get_cell(game_grid.points[n]) != UNSET:
+                continue
+            if (move := self._check_cell(n)) is not None:
+                return move
+        return None
+
+    def _check_cell(self, index: int) -> Optional[Move]:
+        """Check the ways into an unset cell.
+
+        :param index: the index of the cell
+
+        :returns: the move which fills the cell, or None if there is no deduction
+
+        :raises Contradiction: if the cell can't be filled
+        """
+        game_grid = self.game_grid
+        free = game_grid.count_free_neighbors(game_grid.points[index])
+        if free >= 2:
+            return None
+
+        heads: List[str] = []
+        for n in game_grid.neighbor_indices[index]:
+            if (pipe := get_pipe_head(game_grid, n)) is not None:
+                heads.append(pipe)
+        if free + len(heads) < 2:
+            raise Contradiction(f"{game_grid.points[index]} is a dead end")
+        if free + len(heads) > 2:
+            return None
+        if len(heads) == 2 and heads[0] != heads[1]:
+            raise Contradiction(f"{game_grid.points[index]} is a dead end")
+        return game_grid.points[index], heads[0]
+
+
+@register_rule("reachability")
+class Reachability(GridRule):
+    """A pipe endpoint can only extend into a region which leads to its other end.
+
+    Each incomplete pipe is filled through one region of unset cells which neighbors
+    both of its endpoints. An endpoint's neighbors in other regions are thus no use to
+    it, and if only one neighbor is left, the endpoint must extend into it.
+    """
+
+    def apply(self) -> Optional[Move]:
+        """Look for a deduction across the whole game grid.
+
+        :returns: the move, or None if there is no deduction
+
+        :raises Contradiction: if the game grid has no solution
+        """
+        game_grid = self.game_grid
+        checker = self.engine.checker
+        for pipe, endpoints in game_grid.pipe_endpoints.items():
+            if game_grid.is_pipe_complete(pipe):
+                continue
+            start, end = endpoints["start"], endpoints["end"]
+            for head, other in ((start, end), (end, start)):
+                if game_grid.count_free_neighbors(head) < 2:
+                    continue
+                regions = checker.get_neighbor_regions(other)
+                usable = [
+                    game_grid.points[n]
+                    for n in game_grid.neighbor_indices[game_grid.to_index(head)]
+                    if checker.get_region(game_grid.points[n]) in regions
+                ]
+                if not usable:
+                    raise Contradiction(f"Pipe {pipe} is cut off at {head}")
+                if len(usable) == 1 and self.engine.can_move_now(usable[0], pipe):
+                    return usable[0], pipe
+        return None
+
+
+@register_rule("no-2x2")
+class No2x2(CellRule):
+    """No pipe fills a 2x2 block of cells.
+
+    The game allows such blocks, so this rule is only sound for game grids which are
+    known to have a solution without them, such as those made by `generator`.
+    """
+
+    def apply(self, position: Point) -> Optional[Move]:
+        """Check the 2x2 blocks of cells around a cell which has changed.
+
+        :param position: the position of the cell
+
+        :raises Contradiction: if a pipe fills one of the blocks
+        """
+        game_grid = self.game_grid
+        if (pipe := game_grid.get_cell(position)) == UNSET:
+            return None
+        for dx in (-1, 0):
+            for dy in (-1, 0):
+                block = [
+                    Point(position.x + dx + i, position.y + dy + j)
+                    for i in (0, 1)
+                    for j in (0, 1)
+                ]
+                if all(
+                    game_grid.is_position_in_bounds(p) and game_grid.get_cell(p) == pipe
+                    for p in block
+                ):
+                    raise Contradiction(f"Pipe {pipe} fills a 2x2 block at {block[0]}")
+        return None
+
+
+class RuleEngine:
+    """Runs deduction rules on a game grid until none of them make any more moves.
+
+    The cells queued as changed by the game grid are the worklist. Each rule is
+    applied to each changed cell in turn, and each move made queues more changed
+    cells. Once the worklist is empty, each `GridRule` is applied in turn, and if
+    any move is made the worklist is worked through again. The number of moves and
+    contradictions found by each rule are counted in `hits`.
+
+    A pipe is complete as soon as its endpoints are next to each other, so if a pipe
+    can pass next to itself, the order of its moves matters. A move which every
+    solution makes at some point could then end the pipe too soon if made straight
+    away, and the rules only make such a move if `can_move_now`.
+    """
+
+    def __init__(
+        self,
+        game_grid: PipesGrid,
+        rules: Optional[Iterable[str]] = None,
+        allow_touching: bool = False,
+    ):
+        """Create a new instance of `RuleEngine`.
+
+        :param game_grid: the game grid to make moves on
+        :param rules: the names of the rules to run, in order, or None for
+            `DEFAULT_RULES`
+        :param allow_touching: whether a pipe can pass next to itself in the
+            solutions looked for. If not, any move which every such solution makes can
+            be made straight away.
+
+        :raises ValueError: if a rule is not registered
+        """
+        names = check_rules(rules)
+        self.game_grid = game_grid
+        self.allow_touching = allow_touching
+        self.hits: Counter[str] = collections.Counter({name: 0 for name in names})
+        self._checker: Optional[ConnectivityChecker] = None
+        rules_ = [RULES[name](self) for name in names]
+        self._cell_rules = [r for r in rules_ if isinstance(r, CellRule)]
+        self._grid_rules = [r for r in rules_ if isinstance(r, GridRule)]
+        # A changed cell which had a move found around it, to be looked at again
+        # after the move
+        self._revisit: Optional[Point] = None
+
+    @property
+    def checker(self) -> ConnectivityChecker:
+        """Get the tracker of the regions of unset cells, for rules which need it.
+
+        :returns: the connectivity checker of the game grid
+        """
+        if self._checker is None:
+            self._checker = ConnectivityChecker(self.game_grid)
+        return self._checker
+
+    def can_move_now(self, position: Point, pipe: str) -> bool:
+        """Check whether a move which every solution makes can be made straight away.
+
+        If a pipe can pass next to itself, a pipe endpoint which extends too early
+        could end up next to the pipe's other endpoint before the pipe is finished.
+        That can't happen if the cell moved into has only one way onward, which is
+        then the next cell of the pipe whenever the move is made.
+
+        :param position: the position to fill
+        :param pipe: the pipe to fill it with
+
+        :returns: True if the move can be made straight away
+        """
+        if not self.allow_touching:
+            return True
+        game_grid = self.game_grid
+        endpoints = game_grid.pipe_endpoints[pipe].values()
+        ways = 0
+        for n in game_grid.neighbor_indices[game_grid.to_index(position)]:
+            point = game_grid.points[n]
+            if point in endpoints or game_grid.get_cell(point) == UNSET:
+                ways += 1
+        # One of the ways is the endpoint which extends into the cell
+        return ways <= 2
+
+    def propagate(self, observer: Optional[Callable[[PipesGrid], None]] = None) -> bool:
+        """Make the moves found by the rules until there are none left.
+
+        :param observer: a function to call with the game grid after each move
+
+        :returns: False if the game grid was found to be unsolvable, else True
+        """
+        self._revisit = None
+        try:
+            while (move := self.find_move()) is not None:
+                position, pipe = move
+                self.game_grid.set_cell(position, pipe)
+                if observer is not None:
+                    observer(self.game_grid)
+        except Contradiction:
+            return False
+        return True
+
+    def find_move(self) -> Optional[Move]:
+        """Find the next move made by one of the rules.
+
+        :returns: the move, or None if no rule makes a move
+
+        :raises Contradiction: if a rule finds that the game grid has no solution
+        """
+        game_grid = self.game_grid
+        while True:
+            position = self._revisit
+            self._revisit = None
+            if position is None and (position := game_grid.pop_changed_cell()) is None:
+                break
+            for rule in self._cell_rules:
+                if (move := self._run(rule, rule.apply, position)) is not None:
+                    self._revisit = position
+                    return move
+
+        for rule in self._grid_rules:
+            if (move := self._run(rule, rule.apply)) is not None:
+                return move
+        return None
+
+    def _run(self, rule: Rule, method: Callable, *args) -> Optional[Move]:
+        """Apply a rule, counting its hits.
+
+        :param rule: the rule
+        :param method: the method of the rule to call
+        :param args: the arguments to call the method with
+
+        :returns: the move found by the rule, if any
+
+        :raises Contradiction: if the rule finds that the game grid has no solution
+        """
+        try:
+            move = method(*args)
+        except Contradiction:
+            self.hits[rule.name] += 1
+            raise
+        if move is not None:
+            self.hits[rule.name] += 1
+        return move
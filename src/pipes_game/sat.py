@@ -0,0 +1,382 @@
+"""Solve a game grid by encoding it as a SAT problem."""
+
+import itertools
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .cdcl import CdclSolver
+from .connectivity import ConnectivityChecker
+from .grid import PipesGrid, UNSET
+from .solver import SearchLimitError, UnsolvableError
+
+
+def follow_edges(used: Dict[int, List[int]], start: int) -> List[int]:
+    """Follow the edges used in a model from a cell.
+
+    :param used: the neighbors each cell is joined to, by index
+    :param start: the index of the cell, which is an endpoint or in a cycle
+
+    :returns: the indices of the cells in order, until an endpoint or back to `start`
+    """
+    path = [start]
+    previous, current = None, start
+    while True:
+        following = [n for n in used[current] if n != previous]
+        if not following or following[0] == start:
+            return path
+        previous, current = current, following[0]
+        path.append(current)
+
+
+def can_be_drawn(game_grid: PipesGrid, path: List[int]) -> bool:
+    """Check whether a path between the endpoints of a pipe can be drawn in the game.
+
+    A pipe is drawn by extending either of its endpoints, and is complete as soon as
+    they are next to each other. A path which passes next to the far endpoint before
+    it reaches it can thus only be drawn if the other endpoint is extended first, so
+    that it has moved away by then.
+
+    :param game_grid: the game grid
+    :param path: the indices of the cells of the path, from one endpoint to the other
+
+    :returns: True if the path can be drawn in full
+    """
+    points = game_grid.points
+    # Each state is the position along the path of the 2 endpoints as drawn so far
+    pending = [(0, len(path) - 1)]
+    visited = set(pending)
+    while pending:
+        start, end = pending.pop()
+        if end == start + 1:
+            return True
+        if points[path[start]].is_neighbor(points[path[end]]):
+            continue
+        for state in ((start + 1, end), (start, end - 1)):
+            if state not in visited:
+                visited.add(state)
+                pending.append(state)
+    return False
+
+
+class PipesEncoding:  # pylint: disable=too-few-public-methods
+    """The encoding of a game grid as a formula in conjunctive normal form.
+
+    Only the part of the game grid which is left to solve is encoded: the unset cells,
+    and the endpoints of the incomplete pipes. There is a variable for each label that
+    each cell could have, and one for each edge between neighboring cells which a pipe
+    could run along. The clauses say that:
+
+    - each cell has exactly one label, and an endpoint has the label of its pipe. An
+      unset cell can only have the label of a pipe which could reach it.
+    - the 2 cells of an edge which is used have the same label
+    - each endpoint has exactly 1 edge used, and each unset cell exactly 2
+
+    The edges used thus make a path between the endpoints of each pipe, but may also
+    make cycles. Cycles around a 2x2 block are ruled out up front, and any longer
+    cycle in a model is ruled out by `exclude_invalid_paths`, as is a path which
+    cannot be drawn in the game.
+    """
+
+    def __init__(
+        self,
+        game_grid: PipesGrid,
+        solver: CdclSolver,
+        allow_touching: bool = True,
+    ) -> None:
+        """Create a new instance of `PipesEncoding`, adding its clauses to a solver.
+
+        :param game_grid: the game grid to encode
+        :param solver: the SAT solver to add the variables and clauses to
+        :param allow_touching: whether a pipe can pass next to itself. If not, 2
+            neighboring cells of the same pipe must be joined by an edge, which rules
+            out far more models up front, but also the solutions which need it.
+        """
+        self.game_grid = game_grid
+        self.solver = solver
+        self.allow_touching = allow_touching
+        # The endpoint cells of each incomplete pipe, by index
+        self.heads: Dict[int, str] = {}
+        for pipe, endpoints in game_grid.pipe_endpoints.items():
+            if not game_grid.is_pipe_complete(pipe):
+                for endpoint in endpoints.values():
+                    self.heads[game_grid.to_index(endpoint)] = pipe
+
+        # The variable of each label of each cell, and of each edge
+        self.label_vars: Dict[int, Dict[str, int]] = {}
+        self.edge_vars: Dict[Tuple[int, int], int] = {}
+        self._add_labels()
+        self._add_edges()
+        self._add_degrees()
+        self._exclude_squares()
+
+    def _add_labels(self) -> None:
+        """Add the label variables of each cell, with exactly one label per cell.
+
+        An unset cell can only have the label of a pipe whose endpoints both neighbor
+        the region of unset cells that it is in.
+        """
+        game_grid = self.game_grid
+        checker = ConnectivityChecker(game_grid)
+        region_pipes: Dict[int, List[str]] = {}
+        for pipe, endpoints in game_grid.pipe_endpoints.items():
+            if game_grid.is_pipe_complete(pipe):
+                continue
+            regions = checker.get_neighbor_regions(endpoints["start"])
+            regions &= checker.get_neighbor_regions(endpoints["end"])
+            for region in regions:
+                region_pipes.setdefault(region, []).append(pipe)
+
+        for index, pipe in self.heads.items():
+            self.label_vars[index] = {pipe: self.solver.new_vars(1)}
+            self.solver.add_clause([self.label_vars[index][pipe]])
+        for index, (position, value) in enumerate(game_grid):
+            if value != UNSET:
+                continue
+            pipes = region_pipes.get(checker.get_region(position), [])
+            first = self.solver.new_vars(len(pipes))
+            self.label_vars[index] = dict(zip(pipes, range(first, first + len(pipes))))
+            self.solver.add_clause(self.label_vars[index].values())
+            self._add_at_most_one(list(self.label_vars[index].values()))
+
+    def _add_edges(self) -> None:
+        """Add the edge variables, with the same label at both ends of a used edge."""
+        for a, labels_a in self.label_vars.items():
+            for b in self.game_grid.neighbor_indices[a]:
+                if b <= a or b not in self.label_vars:
+                    continue
+                if a in self.heads and b in self.heads:
+                    continue
+                labels_b = self.label_vars[b]
+                edge = self.solver.new_vars(1)
+                self.edge_vars[a, b] = edge
+                for pipe in labels_a.keys() | labels_b.keys():
+                    var_a, var_b = labels_a.get(pipe), labels_b.get(pipe)
+                    if var_a is None or var_b is None:
+                        self.solver.add_clause([-edge, -(var_a or var_b)])
+                    else:
+                        self.solver.add_clause([-edge, -var_a, var_b])
+                        self.solver.add_clause([-edge, var_a, -var_b])
+                        if not self.allow_touching:
+                            self.solver.add_clause([edge, -var_a, -var_b])
+
+    def _add_degrees(self) -> None:
+        """Add the number of edges used at each cell."""
+        cell_edges: Dict[int, List[int]] = {index: [] for index in self.label_vars}
+        for (a, b), edge in self.edge_vars.items():
+            cell_edges[a].append(edge)
+            cell_edges[b].append(edge)
+        for index, edges in cell_edges.items():
+            self._add_exactly(edges, 1 if index in self.heads else 2)
+
+    def _exclude_squares(self) -> None:
+        """Rule out the cycles around each 2x2 block of cells."""
+        num_cols = self.game_grid.num_cols
+        for (a, b), top in self.edge_vars.items():
+            if b != a + 1:
+                continue
+            left = self.edge_vars.get((a, a + num_cols))
+            right = self.edge_vars.get((b, b + num_cols))
+            bottom = self.edge_vars.get((a + num_cols, b + num_cols))
+            if left and right and bottom:
+                self.solver.add_clause([-top, -left, -right, -bottom])
+
+    def _add_at_most_one(self, variables: List[int]) -> None:
+        """Add clauses which say that at most one of some variables is true.
+
+        Beyond a few variables, a sequential counter is used rather than a clause for
+        each pair, so that the number of clauses grows linearly.
+
+        :param variables: the variables
+        """
+        if len(variables) <= 6:
+            self._add_at_most(variables, 1)
+            return
+
+        # Each counter variable is true if any variable up to its own is true
+        first = self.solver.new_vars(len(variables) - 1)
+        counters = range(first, first + len(variables) - 1)
+        self.solver.add_clause([-variables[0], counters[0]])
+        for i in range(1, len(variables) - 1):
+            self.solver.add_clause([-variables[i], counters[i]])
+            self.solver.add_clause([-counters[i - 1], counters[i]])
+            self.solver.add_clause([-variables[i], -counters[i - 1]])
+        self.solver.add_clause([-variables[-1], -counters[-1]])
+
+    def _add_exactly(self, variables: List[int], count: int) -> None:
+        """Add clauses which say that exactly some number of variables are true.
+
+        :param variables: the variables
+        :param count: the number of them which must be true
+        """
+        self._add_at_least(variables, count)
+        self._add_at_most(variables, count)
+
+    def _add_at_least(self, variables: List[int], count: int) -> None:
+        """Add clauses which say that at least some number of variables are true.
+
+        Every subset of all but `count - 1` of the variables must have a true
+        variable. There is a clause for each subset, which is fine for the few
+        variables around a cell.
+
+        :param variables: the variables
+        :param count: the number of them which must be true
+        """
+        if len(variables) < count:
+            self.solver.add_clause([])
+            return
+        for subset in itertools.combinations(variables, len(variables) - count + 1):
+            self.solver.add_clause(subset)
+
+    def _add_at_most(self, variables: List[int], count: int) -> None:
+        """Add clauses which say that at most some number of variables are true.
+
+        No subset of `count + 1` of the variables can all be true. There is a clause
+        for each subset, which is fine for the few variables around a cell.
+
+        :param variables: the variables
+        :param count: the number of them which can be true
+        """
+        for subset in itertools.combinations(variables, count + 1):
+            self.solver.add_clause([-var for var in subset])
+
+    def get_used_edges(self) -> Dict[int, List[int]]:
+        """Get the edges used in the model found by the solver.
+
+        :returns: the neighbors each cell is joined to, by index
+        """
+        used: Dict[int, List[int]] = {index: [] for index in self.label_vars}
+        for (a, b), edge in self.edge_vars.items():
+            if self.solver.value(edge):
+                used[a].append(b)
+                used[b].append(a)
+        return used
+
+    def exclude_invalid_paths(self) -> bool:
+        """Rule out the cycles, and the paths which cannot be drawn, in the model found.
+
+        The model is only read before any clause is added, as adding a clause undoes
+        the values of the variables.
+
+        :returns: True if there were any invalid paths
+        """
+        used = self.get_used_edges()
+        invalid = []
+        visited: Set[int] = set()
+        for endpoints in self.game_grid.pipe_endpoints.values():
+            start = self.game_grid.to_index(endpoints["start"])
+            if start not in self.heads:
+                continue
+            path = follow_edges(used, start)
+            visited.update(path)
+            if not can_be_drawn(self.game_grid, path):
+                invalid.append(list(zip(path, path[1:])))
+        for index in used:
+            if index not in visited:
+                cycle = follow_edges(used, index)
+                visited.update(cycle)
+                invalid.append(list(zip(cycle, cycle[1:] + cycle[:1])))
+
+        for pairs in invalid:
+            self.solver.add_clause(
+                [-self.edge_vars[min(a, b), max(a, b)] for a, b in pairs]
+            )
+        return bool(invalid)
+
+
+class SatSolver:  # pylint: disable=too-few-public-methods
+    """Solver which encodes a game grid as a SAT problem, and solves it with CDCL.
+
+    Whereas `SearchSolver` can only learn from a dead end that the state it reached
+    has no solution, clause learning finds which few moves together caused the dead
+    end, and never tries them together again.
+
+    Pipes which don't pass next to themselves are looked for first, as that is much
+    quicker to solve. Only if there are none is the game grid encoded again without
+    that restriction.
+    """
+
+    def __init__(
+        self,
+        max_nodes: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Create a new instance of `SatSolver`.
+
+        :param max_nodes: the maximum number of decisions to make before giving up,
+            or None for no limit
+        :param timeout: the maximum number of seconds to search for before giving up,
+            or None for no limit
+        """
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.nodes = 0
+        self.conflicts = 0
+
+    def solve(self, game_grid: PipesGrid) -> PipesGrid:
+        """Solve a game grid.
+
+        :param game_grid: the game grid to solve. It is not modified.
+
+        :returns: a solved copy of the game grid
+
+        :raises UnsolvableError: if the game grid has no solution
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.monotonic() + self.timeout
+        self.nodes = self.conflicts = 0
+        for allow_touching in (False, True):
+            encoding = PipesEncoding(game_grid, CdclSolver(), allow_touching)
+            if self._search(encoding, deadline):
+                return self._decode(game_grid, encoding)
+        raise UnsolvableError("Game grid has no solution")
+
+    def _search(self, encoding: PipesEncoding, deadline: Optional[float]) -> bool:
+        """Search for a model of an encoding with no invalid paths.
+
+        :param encoding: the encoding of the game grid
+        :param deadline: the `time.monotonic` time at which to give up, or None for no
+            limit
+
+        :returns: True if a model was found, which the encoding's solver holds
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        cdcl = encoding.solver
+        nodes, conflicts = self.nodes, self.conflicts
+        max_decisions = None if self.max_nodes is None else self.max_nodes - nodes
+        try:
+            while True:
+                result = cdcl.solve(max_decisions, deadline)
+                if result is None:
+                    limit = (
+                        f"{self.max_nodes} search nodes"
+                        if max_decisions is not None and cdcl.decisions >= max_decisions
+                        else f"{self.timeout} seconds"
+                    )
+                    raise SearchLimitError(f"Gave up after {limit}")
+                if not result or not encoding.exclude_invalid_paths():
+                    return result
+        finally:
+            self.nodes = nodes + cdcl.decisions
+            self.conflicts = conflicts + cdcl.conflicts
+
+    @staticmethod
+    def _decode(game_grid: PipesGrid, encoding: PipesEncoding) -> PipesGrid:
+        """Fill in a copy of the game grid from the model found by the solver.
+
+        :param game_grid: the game grid
+        :param encoding: the encoding of the game grid
+
+        :returns: the solved copy
+        """
+        solution = game_grid.copy()
+        used = encoding.get_used_edges()
+        for pipe, endpoints in game_grid.pipe_endpoints.items():
+            if game_grid.is_pipe_complete(pipe):
+                continue
+            path = follow_edges(used, game_grid.to_index(endpoints["start"]))
+            for index in path[1:-1]:
+                solution.set_cell(game_grid.points[index], pipe)
+        return solution
@@ -0,0 +1,305 @@
+"""Save pipes grids in a compact binary format, including partly solved grids.
+
+A serialised grid is a header, followed by sections which each start at a multiple of
+`ALIGNMENT` bytes, so that the numeric sections can be read straight into NumPy arrays.
+All numbers are little-endian.
+
+The header is `HEADER`: the bytes `MAGIC`, the `FORMAT_VERSION`, the size in bytes of
+each cell code, the number of columns, rows, pipe labels and moves. The sections are:
+
+* the pipe labels, in sorted order, each as a byte of its length and then its UTF-8
+  bytes. The code of each label is its place in this order, counting from 1, and code
+  0 is `grid.UNSET`.
+* the code of each cell, row by row
+* the indices of the current "start" and "end" endpoints of each pipe, in the order of
+  the labels, as 32-bit integers. The index of a cell is `grid.PipesGrid.to_index`.
+* the moves which can be undone by `grid.PipesGrid.rollback`, in the order they were
+  made, each as four 32-bit integers: the index of the cell filled, the code of the
+  pipe it was filled with, which of the pipe's endpoints moved (`ENDPOINTS`) and the
+  index of the cell that the endpoint moved from
+"""
+
+import mmap
+import struct
+from pathlib import Path
+from typing import List, Tuple, Type
+
+from .grid import UNSET, CompactPipesGrid, Move, PipesGrid, get_grid_tables
+
+# The bytes which every serialised grid starts with
+MAGIC = b"PIPG"
+
+# The version of the format, which is raised whenever the format changes
+FORMAT_VERSION = 1
+
+# The magic bytes, the format version, the size of each cell code, and the number of
+# columns, rows, pipe labels and moves
+HEADER = struct.Struct("<4sHHIIII")
+
+# The number of bytes which each section is padded to a multiple of
+ALIGNMENT = 8
+
+# The NumPy type of the cell codes, by their size in bytes
+CODE_DTYPES = {1: "u1", 2: "<u2", 4: "<i4"}
+
+# The endpoints of a pipe, by the number which a move records them as
+ENDPOINTS = ("start", "end")
+
+
+def dumps(grid: PipesGrid, include_moves: bool = True) -> bytes:
+    """Serialise a pipes grid.
+
+    :param grid: the grid to serialise
+    :param include_moves: whether to include the moves which `rollback` can undo. If
+        not, the grid is loaded with no moves to undo.
+
+    :returns: the serialised grid
+
+    :raises ValueError: if a pipe label is longer than 255 bytes
+    """
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    if not isinstance(grid, CompactPipesGrid):
+        grid = CompactPipesGrid.from_grid(grid)
+    labels = [label.encode() for label in grid.labels[1:]]
+    if any(len(label) > 255 for label in labels):
+        raise ValueError("Pipe labels must be at most 255 bytes long")
+    moves = grid.get_moves() if include_moves else []
+
+    code_size = grid.codes.itemsize
+    endpoints = [
+        (grid.to_index(endpoints["start"]), grid.to_index(endpoints["end"]))
+        for endpoints in (grid.pipe_endpoints[label] for label in grid.labels[1:])
+    ]
+    move_records = [
+        (
+            grid.to_index(position),
+            grid.label_codes[value],
+            ENDPOINTS.index(endpoint),
+            grid.to_index(previous),
+        )
+        for position, value, endpoint, previous in moves
+    ]
+    sections = [
+        HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            code_size,
+            grid.num_cols,
+            grid.num_rows,
+            len(labels),
+            len(moves),
+        ),
+        b"".join(bytes([len(label)]) + label for label in labels),
+        grid.codes.astype(CODE_DTYPES[code_size]).tobytes(),
+        numpy.array(endpoints, dtype="<i4").tobytes(),
+        numpy.array(move_records, dtype="<i4").tobytes(),
+    ]
+    return b"".join(
+        section + bytes(_align(len(section)) - len(section)) for section in sections
+    )
+
+
+def dump(grid: PipesGrid, filepath: Path, include_moves: bool = True) -> None:
+    """Serialise a pipes grid to a file.
+
+    :param grid: the grid to serialise
+    :param filepath: the path to the file to write
+    :param include_moves: whether to include the moves which `rollback` can undo
+    """
+    filepath.write_bytes(dumps(grid, include_moves))
+
+
+def loads(data: bytes, grid_type: Type[PipesGrid] = CompactPipesGrid) -> PipesGrid:
+    """Load a serialised pipes grid.
+
+    The cells are read as a whole into a NumPy array, rather than one at a time.
+
+    :param data: the serialised grid, as bytes or any object which can be sliced into
+        bytes, such as an `mmap.mmap`
+    :param grid_type: the type of pipes grid to create
+
+    :returns: the grid, in the state it was serialised in
+
+    :raises ValueError: if `data` is not a serialised grid, is of another version of
+        the format, or is not valid
+    """
+    code_size, num_cols, num_rows, num_labels, num_moves = _read_header(data)
+    labels, offset = _read_labels(data, HEADER.size, num_labels)
+    codes, endpoints, moves = _read_arrays(
+        data, offset, code_size, num_cols * num_rows, num_labels, num_moves
+    )
+
+    points, _ = get_grid_tables(num_cols, num_rows)
+    values = (UNSET, *labels)
+    codes = codes.reshape(num_rows, num_cols)
+    return grid_type(
+        num_cols=num_cols,
+        num_rows=num_rows,
+        array=(
+            codes
+            if issubclass(grid_type, CompactPipesGrid)
+            else [[values[code] for code in row] for row in codes.tolist()]
+        ),
+        pipe_labels=set(labels),
+        pipe_endpoints={
+            label: {"start": points[start], "end": points[end]}
+            for label, (start, end) in zip(labels, endpoints.tolist())
+        },
+        moves=_to_moves(moves.tolist(), points, values),
+    )
+
+
+def load(filepath: Path, grid_type: Type[PipesGrid] = CompactPipesGrid) -> PipesGrid:
+    """Load a serialised pipes grid from a file, which is memory-mapped to read it.
+
+    :param filepath: the path to the file to read
+    :param grid_type: the type of pipes grid to create
+
+    :returns: the grid, in the state it was serialised in
+
+    :raises ValueError: if the file is not a serialised grid, is of another version of
+        the format, or is not valid
+    """
+    with open(filepath, "rb") as file:
+        if file.seek(0, 2) == 0:
+            raise ValueError("File is empty")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return loads(data, grid_type)
+
+
+def _align(offset: int) -> int:
+    """Find the start of the section which follows an offset in a serialised grid.
+
+    :param offset: the offset of the end of a section
+
+    :returns: the offset rounded up to a multiple of `ALIGNMENT`
+    """
+    return offset + -offset % ALIGNMENT
+
+
+def _read(data: bytes, offset: int, size: int) -> Tuple[bytes, int]:
+    """Read bytes from a serialised grid.
+
+    :param data: the serialised grid
+    :param offset: the offset to read from
+    :param size: the number of bytes to read
+
+    :returns: the bytes, and the offset of the end of them
+
+    :raises ValueError: if `data` ends before the end of the bytes
+    """
+    end = offset + size
+    if end > len(data):
+        raise ValueError("Serialised grid is truncated")
+    return data[offset:end], end
+
+
+def _read_header(data: bytes) -> Tuple[int, int, int, int, int]:
+    """Read the header of a serialised grid.
+
+    :param data: the serialised grid
+
+    :returns: the size of each cell code, and the number of columns, rows, pipe labels
+        and moves
+
+    :raises ValueError: if `data` is not a serialised grid, or is of another version
+        of the format
+    """
+    if len(data) < HEADER.size or data[: len(MAGIC)] != MAGIC:
+        raise ValueError("Data is not a serialised grid")
+    _, version, code_size, *sizes = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported serialised grid version {version}")
+    if code_size not in CODE_DTYPES:
+        raise ValueError(f"Unsupported cell code size {code_size}")
+    return (code_size, *sizes)
+
+
+def _read_labels(data: bytes, offset: int, num_labels: int) -> Tuple[List[str], int]:
+    """Read the section of pipe labels of a serialised grid.
+
+    :param data: the serialised grid
+    :param offset: the offset of the start of the section
+    :param num_labels: the number of labels
+
+    :returns: the labels, and the offset of the end of the section
+
+    :raises ValueError: if the labels are not valid, or are not unique and sorted
+    """
+    labels = []
+    for _ in range(num_labels):
+        (length,), offset = _read(data, offset, 1)
+        label, offset = _read(data, offset, length)
+        labels.append(label.decode())
+    if labels != sorted(set(labels)) or UNSET in labels:
+        raise ValueError("Pipe labels are not unique and sorted")
+    return labels, offset
+
+
+def _read_arrays(  # pylint: disable=too-many-arguments
+    data: bytes,
+    offset: int,
+    code_size: int,
+    num_cells: int,
+    num_labels: int,
+    num_moves: int,
+) -> tuple:
+    """Read the numeric sections of a serialised grid into NumPy arrays, and check them.
+
+    :param data: the serialised grid
+    :param offset: the offset of the end of the section of pipe labels
+    :param code_size: the size of each cell code in bytes
+    :param num_cells: the number of cells in the grid
+    :param num_labels: the number of pipe labels
+    :param num_moves: the number of moves
+
+    :returns: the arrays of cell codes, of the endpoints of each pipe, and of moves
+
+    :raises ValueError: if `data` is truncated, or any code or index is out of range
+    """
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    cells, offset = _read(data, _align(offset), num_cells * code_size)
+    endpoints, offset = _read(data, _align(offset), num_labels * 2 * 4)
+    moves, _ = _read(data, _align(offset), num_moves * 4 * 4)
+
+    codes = numpy.frombuffer(cells, CODE_DTYPES[code_size])
+    endpoints = numpy.frombuffer(endpoints, "<i4").reshape(-1, 2)
+    moves = numpy.frombuffer(moves, "<i4").reshape(-1, 4)
+    _check_range(codes, 0, num_labels, "cell code")
+    _check_range(endpoints, 0, num_cells - 1, "endpoint index")
+    _check_range(moves[:, [0, 3]], 0, num_cells - 1, "move index")
+    _check_range(moves[:, 1], 1, num_labels, "move pipe code")
+    _check_range(moves[:, 2], 0, len(ENDPOINTS) - 1, "move endpoint")
+    return codes, endpoints, moves
+
+
+def _check_range(array, low: int, high: int, name: str) -> None:
+    """Check that every number in a NumPy array is within a range.
+
+    :param array: the array
+    :param low: the lowest valid number
+    :param high: the highest valid number
+    :param name: what each number is, for the error
+
+    :raises ValueError: if any number is out of the range
+    """
+    if array.size and (array.min() < low or array.max() > high):
+        raise ValueError(f"Serialised grid has an invalid {name}")
+
+
+def _to_moves(records: List[List[int]], points: list, values: tuple) -> List[Move]:
+    """Convert the moves of a serialised grid to moves of a pipes grid.
+
+    :param records: the index of the cell filled, the code of its pipe, the number of
+        the endpoint which moved and the index it moved from, of each move
+    :param points: the point of each cell index
+    :param values: the value of each cell code
+
+    :returns: the moves
+    """
+    return [
+        (points[index], values[code], ENDPOINTS[endpoint], points[previous])
+        for index, code, endpoint, previous in records
+    ]
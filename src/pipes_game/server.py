@@ -0,0 +1,305 @@
+"""Solve grids sent over a Unix socket, by a long-running server."""
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from . import batch, solver
+
+# The default number of distinct grids which can wait to be solved at once
+DEFAULT_QUEUE_SIZE = 64
+
+# The number of most recent requests which the latency stats are taken over
+LATENCY_WINDOW = 1000
+
+# The default maximum size of a request in bytes, which fits a grid of thousands of
+# cells along each side
+DEFAULT_MAX_REQUEST_BYTES = 32 * 1024 * 1024
+
+
+def _warm_up() -> None:
+    """Do nothing in a worker process, so that starting it is done ahead of time."""
+
+
+class SolveServer:  # pylint: disable=too-many-instance-attributes
+    """A server which solves grids in a pool of processes, which is kept running.
+
+    Each line sent to the server is a JSON object. A request to solve a grid has the
+    lines of the grid as a "grid" string, as parsed by `parser.parse_from_lines`, and
+    may have an "id" to identify the response by. The response is the record made by
+    `batch.solve_lines`, with the "id" and the number of "seconds" the request took.
+    Responses are sent as each grid is solved, so not always in the order of the
+    requests. A request whose "command" is "stats" is answered with the stats of the
+    server straight away.
+
+    A grid which is sent while the same grid is still being solved is not solved
+    again, and both requests get the same result. Grids wait in a queue of bounded
+    size for a worker process, and once it is full, no more requests are read until
+    there is space, so a client which sends too many grids is held back. A request
+    longer than the maximum size is answered as invalid without being read into
+    memory.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        socket_path: Path,
+        *,
+        workers: Optional[int] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        max_nodes: Optional[int] = None,
+        timeout: Optional[float] = None,
+        backend: str = "search",
+        cache_path: Optional[Path] = None,
+        max_request_bytes: int = DEFAULT_MAX_REQUEST_BYTES,
+    ) -> None:
+        """Create a new instance of `SolveServer`.
+
+        :param socket_path: the path of the Unix socket to listen on
+        :param workers: the number of processes to solve with, or None for one per CPU
+        :param queue_size: the number of distinct grids which can wait to be solved
+        :param max_nodes: the maximum number of search nodes to visit before giving up
+            on a grid, or None for no limit
+        :param timeout: the maximum number of seconds to search for before giving up
+            on a grid, or None for no limit
+        :param backend: the solver to use, one of `batch.BACKENDS`
+        :param cache_path: the path to a `cache.SolutionCache` to look each grid up
+            in before solving it, or None to not use a cache
+        :param max_request_bytes: the maximum size of a request line in bytes
+
+        :raises ValueError: if `queue_size` is less than 1
+        """
+        if queue_size < 1:
+            raise ValueError("Queue must hold at least 1 grid")
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.backend = backend
+        self.cache_path = cache_path
+        self.max_request_bytes = max_request_bytes
+        self.requests = 0
+        self.coalesced = 0
+        self._latencies: Deque[float] = collections.deque(maxlen=LATENCY_WINDOW)
+        # The result of each grid being solved, keyed by the lines of the grid
+        self._in_flight: Dict[Tuple[str, ...], asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._dispatchers: List[asyncio.Task] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Start the worker processes, and start listening on the socket."""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        await asyncio.gather(
+            *(loop.run_in_executor(self._pool, _warm_up) for _ in range(self.workers))
+        )
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch()) for _ in range(self.workers)
+        ]
+        self._server = await asyncio.start_unix_server(
+            self._handle_client,
+            path=str(self.socket_path),
+            limit=self.max_request_bytes,
+        )
+
+    async def serve_forever(self) -> None:
+        """Start the server, and serve requests until cancelled."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Stop listening on the socket, and stop the worker processes."""
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._pool.shutdown(cancel_futures=True)
+        Path(self.socket_path).unlink(missing_ok=True)
+
+    def get_stats(self) -> dict:
+        """Get the stats of the server.
+
+        :returns: a JSON-serialisable record of the number of requests, how many were
+            coalesced with another, how many grids are waiting in the queue and being
+            solved, and the latency of the most recent requests in seconds
+        """
+        latencies = sorted(self._latencies)
+        latency = {"count": len(latencies)}
+        if latencies:
+            quantiles = (
+                statistics.quantiles(latencies, n=100, method="inclusive")
+                if len(latencies) > 1
+                else latencies * 99
+            )
+            latency.update(
+                mean=statistics.fmean(latencies),
+                p50=quantiles[49],
+                p90=quantiles[89],
+                p99=quantiles[98],
+                max=latencies[-1],
+            )
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "queue_depth": self._queue.qsize(),
+            "in_flight": len(self._in_flight),
+            "latency": latency,
+        }
+
+    async def _submit(self, lines: List[str]) -> asyncio.Future:
+        """Queue a grid to be solved, unless the same grid is already being solved.
+
+        :param lines: the lines of the grid
+
+        :returns: the future result of the grid
+        """
+        self.requests += 1
+        key = tuple(lines)
+        if (future := self._in_flight.get(key)) is not None:
+            self.coalesced += 1
+            return future
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        await self._queue.put((key, future))
+        return future
+
+    async def _dispatch(self) -> None:
+        """Take grids from the queue and solve them in a worker process, forever."""
+        loop = asyncio.get_running_loop()
+        while True:
+            key, future = await self._queue.get()
+            try:
+                result = await loop.run_in_executor(
+                    self._pool,
+                    batch.solve_lines,
+                    list(key),
+                    self.max_nodes,
+                    self.timeout,
+                    solver.DEFAULT_TABLE_SIZE,
+                    self.backend,
+                    self.cache_path,
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                # Answer every request for the grid rather than leave them waiting
+                result = {"status": "error", "error": str(e) or type(e).__name__}
+            finally:
+                del self._in_flight[key]
+            future.set_result(result)
+
+    async def _handle_client(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Serve the requests sent on a connection, until it is closed.
+
+        :param reader: the stream to read requests from
+        :param writer: the stream to write responses to
+        """
+        responses: Set[asyncio.Task] = set()
+        try:
+            while (line := await self._read_line(reader)) != b"":
+                start = time.perf_counter()
+                if line is None:
+                    error = f"Request is longer than {self.max_request_bytes} bytes"
+                    await self._respond(writer, {"status": "invalid", "error": error})
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request is not a JSON object")
+                except ValueError as e:
+                    await self._respond(writer, {"status": "invalid", "error": str(e)})
+                    continue
+
+                if request.get("command") == "stats":
+                    await self._respond(writer, self.get_stats())
+                    continue
+                if not isinstance(grid := request.get("grid"), str):
+                    response = {"status": "invalid", "error": "Request has no grid"}
+                    await self._respond(writer, {"id": request.get("id"), **response})
+                    continue
+
+                # Queue the grid before reading the next request, which thus waits
+                # while the queue is full
+                future = await self._submit(grid.splitlines())
+                task = asyncio.create_task(
+                    self._respond_when_solved(writer, request.get("id"), future, start)
+                )
+                responses.add(task)
+                task.add_done_callback(responses.discard)
+
+            await asyncio.gather(*responses)
+        except ConnectionError:
+            # The client went away without waiting for its responses
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_line(reader: asyncio.StreamReader) -> Optional[bytes]:
+        """Read a request line, discarding it if it is too long.
+
+        :param reader: the stream to read from
+
+        :returns: the line, None if it was too long, or an empty line at the end of
+            the stream
+        """
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+
+        # Discard the rest of the line, which may not all have arrived yet
+        while True:
+            try:
+                await reader.readuntil(b"\n")
+                return None
+            except asyncio.IncompleteReadError:
+                return None
+            except asyncio.LimitOverrunError as e:
+                await reader.readexactly(e.consumed)
+
+    async def _respond_when_solved(
+        self,
+        writer: asyncio.StreamWriter,
+        request_id: object,
+        future: asyncio.Future,
+        start: float,
+    ) -> None:
+        """Send the result of a grid once it has been solved.
+
+        :param writer: the stream to write the response to
+        :param request_id: the "id" of the request
+        :param future: the future result of the grid
+        :param start: the `time.perf_counter` time at which the request was read
+        """
+        result = await asyncio.shield(future)
+        latency = time.perf_counter() - start
+        self._latencies.append(latency)
+        await self._respond(writer, {"id": request_id, **result, "seconds": latency})
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, response: dict) -> None:
+        """Send a response.
+
+        :param writer: the stream to write the response to
+        :param response: the response
+        """
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
@@ -1,28 +1,453 @@
 """Code for solving a game grid."""
 
-from .grid import PipesGrid, UNSET
+import collections
+import time
+from typing import Callable, Counter, Iterable, Iterator, List, Optional, Tuple
+
+from .decompose import Component, extract_component, find_components, merge_components
+from .grid import PipesGrid, Point, UNSET
+from .rules import RuleEngine, check_rules
+from .transposition import TranspositionTable
+
+# The default maximum number of refuted search states to remember
+DEFAULT_TABLE_SIZE = 1 << 20
+
+
+class UnsolvableError(RuntimeError):
+    """The game grid has no solution."""
+
+
+class SearchLimitError(RuntimeError):
+    """The search ran out of nodes or time before reaching an answer."""
 
 
 def iter_solve(game_grid: PipesGrid) -> None:
     """Modify the game grid state with one additional solve modification.
 
     :param game_grid: the game grid
+
+    :raises RuntimeError: if there is no forced move to make
     """
-    for pipe, endpoints in game_grid.pipe_endpoints.items():
-        if game_grid.is_pipe_complete(pipe):
+    if (move := find_forced_move(game_grid)) is None:
+        raise RuntimeError("Could find a solve!")
+
+    position, pipe = move
+    game_grid.set_cell(position, pipe)
+
+
+def find_forced_move(game_grid: PipesGrid) -> Optional[Tuple[Point, str]]:
+    """Find a pipe endpoint which only has one way to extend.
+
+    Only the cells queued as changed by the game grid are looked at, so each call
+    takes time proportional to the number of changes since the previous call rather
+    than to the size of the game grid.
+
+    :param game_grid: the game grid
+
+    :returns: the position to fill and the pipe to fill it with, or None if there is
+        no forced move
+    """
+    while (position := game_grid.pop_changed_cell()) is not None:
+        if game_grid.count_free_neighbors(position) != 1:
+            continue
+        if not _is_incomplete_pipe_endpoint(game_grid, position):
             continue
 
-        for ep in (endpoints["start"], endpoints["end"]):
-            unset_neighbors = [
-                n
-                for n in ep.get_neighbors()
+        return get_unset_neighbors(game_grid, position)[0], game_grid.get_cell(position)
+
+    return None
+
+
+def _is_incomplete_pipe_endpoint(game_grid: PipesGrid, position: Point) -> bool:
+    """Check whether a cell is an endpoint of a pipe which is not yet complete.
+
+    :param game_grid: the game grid
+    :param position: the position of the cell
+
+    :returns: True if the cell is an endpoint of an incomplete pipe
+    """
+    if (pipe := game_grid.get_cell(position)) == UNSET:
+        return False
+    endpoints = game_grid.pipe_endpoints[pipe]
+    if position not in (endpoints["start"], endpoints["end"]):
+        return False
+    return not game_grid.is_pipe_complete(pipe)
+
+
+def get_unset_neighbors(game_grid: PipesGrid, position: Point) -> List[Point]:
+    """Get the in-bounds neighbors of a position which have no value.
+
+    :param game_grid: the game grid
+    :param position: the position whose neighbors to get
+
+    :returns: the unset neighbors of the position
+    """
+    points = game_grid.points
+    return [
+        points[n]
+        for n in game_grid.neighbor_indices[game_grid.to_index(position)]
+        if game_grid.get_cell(points[n]) == UNSET
+    ]
+
+
+def propagate(
+    game_grid: PipesGrid,
+    observer: Optional[Callable[[PipesGrid], None]] = None,
+    rules: Optional[Iterable[str]] = None,
+    allow_touching: bool = False,
+) -> bool:
+    """Apply the moves found by deduction rules until there are none left.
+
+    :param game_grid: the game grid
+    :param observer: a function to call with the game grid after each move
+    :param rules: the names of the rules to apply, or None for `rules.DEFAULT_RULES`
+    :param allow_touching: whether a pipe can pass next to itself in the solutions
+        looked for
+
+    :returns: False if the game grid was found to be unsolvable, else True
+    """
+    return RuleEngine(game_grid, rules, allow_touching).propagate(observer)
+
+
+def is_solved(game_grid: PipesGrid) -> bool:
+    """Check whether every pipe is complete and every cell is filled.
+
+    :param game_grid: the game grid
+
+    :returns: True if the game grid is solved
+    """
+    return game_grid.is_complete() and game_grid.is_filled()
+
+
+class SearchSolver:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    """Depth-first search solver, using deduction rules to prune the search tree.
+
+    At each node of the search, the moves found by a `RuleEngine` are made until none
+    remain. Unless turned off, the regions of unset cells are then checked, so that a
+    branch which has cut off a pipe or a region is abandoned straight away. The
+    endpoint with the fewest ways to extend is then chosen, and each of those ways is
+    tried in turn.
+
+    The states below which the search has failed are remembered in a
+    `TranspositionTable`, so that a state reached again by another order of moves is
+    skipped.
+
+    If asked to, the search splits a node whose unset cells have come apart into
+    independent components, as found by `decompose.find_components`. Each component
+    is then searched on its own, so that the branches of one component are never
+    tried in combination with those of the others.
+
+    A pipe is complete as soon as its endpoints are next to each other, so a pipe
+    which passes next to itself can only be drawn in some orders. Solutions where no
+    pipe does are looked for first, as any order of moves draws them, which lets the
+    search extend one endpoint at a time and make every move the rules find. Only if
+    there are none is the game grid searched again for the rest, extending either
+    endpoint of a pipe and making only the moves which can't end a pipe too soon.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        max_nodes: Optional[int] = None,
+        timeout: Optional[float] = None,
+        observer: Optional[Callable[[PipesGrid], None]] = None,
+        check_connectivity: bool = True,
+        table_size: Optional[int] = DEFAULT_TABLE_SIZE,
+        rules: Optional[Iterable[str]] = None,
+        decompose: bool = False,
+        allow_touching: Optional[bool] = None,
+    ) -> None:
+        """Create a new instance of `SearchSolver`.
+
+        :param max_nodes: the maximum number of search nodes to visit before giving
+            up, or None for no limit
+        :param timeout: the maximum number of seconds to search for before giving up,
+            or None for no limit
+        :param observer: a function to call with the working game grid after each
+            move made by the search. It must not modify the game grid.
+        :param check_connectivity: whether to check the regions of unset cells at
+            each search node, with a `ConnectivityChecker`
+        :param table_size: the maximum number of refuted search states to remember,
+            or None to not remember any
+        :param rules: the names of the deduction rules to apply, or None for
+            `rules.DEFAULT_RULES`
+        :param decompose: whether to search the independent components of each
+            search node separately
+        :param allow_touching: whether a pipe can pass next to itself in the
+            solutions looked for, or None to look for solutions where no pipe does
+            first, and then for the rest
+
+        :raises ValueError: if a rule is not registered
+        """
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.observer = observer
+        self.check_connectivity = check_connectivity
+        self.table_size = table_size
+        self.rules = check_rules(rules)
+        self.decompose = decompose
+        self.allow_touching = allow_touching
+        self.table: Optional[TranspositionTable] = None
+        self.rule_hits: Counter[str] = collections.Counter()
+        self.nodes = 0
+        self._deadline = None
+
+    def solve(self, game_grid: PipesGrid) -> PipesGrid:
+        """Solve a game grid.
+
+        :param game_grid: the game grid to solve. It is not modified.
+
+        :returns: a solved copy of the game grid
+
+        :raises UnsolvableError: if the game grid has no solution
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        self.nodes = 0
+        self._deadline = None
+        if self.timeout is not None:
+            self._deadline = time.monotonic() + self.timeout
+        passes = (
+            (False, True) if self.allow_touching is None else (self.allow_touching,)
+        )
+        for allow_touching in passes:
+            # A state refuted by one pass may still have a solution in the next
+            self.table = None
+            if self.table_size is not None:
+                self.table = TranspositionTable(self.table_size)
+            if (solution := self._search(game_grid, allow_touching)) is not None:
+                return solution
+        raise UnsolvableError("Game grid has no solution")
+
+    def _search(
+        self,
+        game_grid: PipesGrid,
+        allow_touching: bool,
+    ) -> Optional[PipesGrid]:
+        """Search for a solution of a game grid.
+
+        :param game_grid: the game grid to solve. It is not modified.
+        :param allow_touching: whether a pipe can pass next to itself in the
+            solutions looked for
+
+        :returns: a solved copy of the game grid, or None if it has no solution of
+            the kind looked for
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        # Each stack frame is a checkpoint of the game grid at a branch point, the
+        # pipe being extended, the positions left to try extending it into, and the
+        # hashes of the states of the search node before and after its forced moves
+        stack: List[Tuple[int, str, Iterator[Point], Tuple[int, int]]] = []
+        candidate = game_grid.copy()
+        engine = RuleEngine(candidate, self.rules, allow_touching)
+        # Count the hits of every pass together
+        engine.hits.update(self.rule_hits)
+        self.rule_hits = engine.hits
+        expand = True
+        while True:
+            if expand:
+                self._visit_node()
+                entry_hash = candidate.zobrist_hash
+                branch = None
                 if (
-                    game_grid.is_position_in_bounds(n)
-                    and game_grid.get_cell(n) == UNSET
+                    not self._is_refuted(entry_hash)
+                    and engine.propagate(self.observer)
+                    and (not self.check_connectivity or engine.checker.is_feasible())
+                ):
+                    solution, branch = self._expand(candidate, engine)
+                    if solution is not None:
+                        return solution
+
+                hashes = (entry_hash, candidate.zobrist_hash)
+                if branch is None:
+                    self._refute(hashes)
+                else:
+                    pipe, options = branch
+                    token = candidate.checkpoint()
+                    stack.append((token, pipe, iter(options), hashes))
+
+            if not stack:
+                return None
+
+            token, pipe, options, hashes = stack[-1]
+            candidate.rollback(token)
+            if (position := next(options, None)) is None:
+                stack.pop()
+                self._refute(hashes)
+                expand = False
+                continue
+
+            candidate.set_cell(position, pipe)
+            if self.observer is not None:
+                self.observer(candidate)
+            expand = True
+
+    def _expand(
+        self,
+        game_grid: PipesGrid,
+        engine: RuleEngine,
+    ) -> Tuple[Optional[PipesGrid], Optional[Tuple[str, List[Point]]]]:
+        """Find how to carry on the search from a node, once its forced moves are made.
+
+        :param game_grid: the game grid at the search node
+        :param engine: the rule engine of the game grid
+
+        :returns: the solution if the node is solved, else the branch to search next,
+            or None if the search below the node has failed
+        """
+        if is_solved(game_grid):
+            return game_grid, None
+        if self.decompose and engine.checker.count_regions() > 1:
+            components = find_components(game_grid, engine.checker)
+            if len(components) > 1:
+                return (
+                    self._solve_components(
+                        game_grid, components, engine.allow_touching
+                    ),
+                    None,
                 )
-            ]
-            if len(unset_neighbors) == 1:
-                game_grid.set_cell(unset_neighbors[0], pipe)
-                return
+        if self._is_refuted(game_grid.zobrist_hash):
+            return None, None
+        return None, get_most_constrained_branch(game_grid, engine.allow_touching)
+
+    def _solve_components(
+        self,
+        game_grid: PipesGrid,
+        components: List[Component],
+        allow_touching: bool,
+    ) -> Optional[PipesGrid]:
+        """Search each independent component of a game grid on its own.
+
+        :param game_grid: the game grid
+        :param components: the components of the game grid
+        :param allow_touching: whether a pipe can pass next to itself in the
+            solutions looked for
+
+        :returns: the solution, or None if a component has no solution
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        solutions = []
+        for component in components:
+            if not component.cells or not component.pipes:
+                return None
+            sub_grid, offset = extract_component(game_grid, component)
+            max_nodes = timeout = None
+            if self.max_nodes is not None:
+                max_nodes = self.max_nodes - self.nodes
+            if self._deadline is not None:
+                timeout = max(0.0, self._deadline - time.monotonic())
+            search = SearchSolver(
+                max_nodes=max_nodes,
+                timeout=timeout,
+                check_connectivity=self.check_connectivity,
+                table_size=self.table_size,
+                rules=self.rules,
+                decompose=True,
+                allow_touching=allow_touching,
+            )
+            try:
+                solution = search.solve(sub_grid)
+            except UnsolvableError:
+                solution = None
+            except SearchLimitError:
+                # Give up with this search's own limits in the message
+                self.nodes += search.nodes
+                self._check_limits()
+                raise
+            self.nodes += search.nodes
+            if solution is None:
+                return None
+            solutions.append((component, solution, offset))
+        return merge_components(game_grid, solutions)
 
-    raise RuntimeError("Could find a solve!")
+    def _is_refuted(self, zobrist_hash: int) -> bool:
+        """Check whether the search has already failed below a state.
+
+        :param zobrist_hash: the hash of the state
+
+        :returns: True if the state is known to have no solution
+        """
+        return self.table is not None and zobrist_hash in self.table
+
+    def _refute(self, hashes: Tuple[int, ...]) -> None:
+        """Remember that the search has failed below some states.
+
+        :param hashes: the hashes of the states
+        """
+        if self.table is not None:
+            for zobrist_hash in hashes:
+                self.table.add(zobrist_hash)
+
+    def _visit_node(self) -> None:
+        """Count a search node, checking the search limits.
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        self.nodes += 1
+        self._check_limits()
+
+    def _check_limits(self) -> None:
+        """Check the search limits.
+
+        :raises SearchLimitError: if the node or time limit has been exceeded
+        """
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchLimitError(f"Gave up after {self.max_nodes} search nodes")
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            raise SearchLimitError(f"Gave up after {self.timeout} seconds")
+
+
+def get_most_constrained_branch(
+    game_grid: PipesGrid,
+    both_ends: bool = False,
+) -> Optional[Tuple[str, List[Point]]]:
+    """Find the incomplete pipe endpoint with the fewest ways to extend.
+
+    :param game_grid: the game grid
+    :param both_ends: whether to find the incomplete pipe with the fewest ways to
+        extend either of its endpoints instead. This is needed to find every solution
+        where a pipe passes next to itself, as that pipe may only be drawn by
+        extending its endpoints in a certain order.
+
+    :returns: the pipe and the positions its endpoint can extend into, or None if all
+        pipes are complete
+    """
+    best = None
+    best_count = 0
+    for pipe, endpoints in game_grid.pipe_endpoints.items():
+        if game_grid.is_pipe_complete(pipe):
+            continue
+
+        ends = (endpoints["start"], endpoints["end"])
+        for ep in (ends,) if both_ends else ((ep,) for ep in ends):
+            count = sum(game_grid.count_free_neighbors(e) for e in ep)
+            if best is None or count < best_count:
+                best, best_count = (pipe, ep), count
+
+    if best is None:
+        return None
+    pipe, ends = best
+    options: List[Point] = []
+    for ep in ends:
+        options.extend(
+            p for p in get_unset_neighbors(game_grid, ep) if p not in options
+        )
+    return pipe, options
+
+
+def solve(
+    game_grid: PipesGrid,
+    max_nodes: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> PipesGrid:
+    """Solve a game grid with a depth-first search.
+
+    :param game_grid: the game grid to solve. It is not modified.
+    :param max_nodes: the maximum number of search nodes to visit before giving up, or
+        None for no limit
+    :param timeout: the maximum number of seconds to search for before giving up, or
+        None for no limit
+
+    :returns: a solved copy of the game grid
+    """
+    return SearchSolver(max_nodes=max_nodes, timeout=timeout).solve(game_grid)
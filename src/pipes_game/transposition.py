@@ -0,0 +1,68 @@
+"""Remember the search states which are known to have no solution."""
+
+import collections
+from typing import OrderedDict
+
+
+class TranspositionTable:
+    """A bounded set of the Zobrist hashes of refuted search states.
+
+    A search reaches the same state by many different orders of moves. Once the
+    search below a state has failed, its hash is added to the table, so that the
+    search can skip that state the next time it is reached. When the table is full,
+    the least recently used hash is evicted.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Create a new instance of `TranspositionTable`.
+
+        :param max_size: the maximum number of hashes to hold
+
+        :raises ValueError: if `max_size` is less than 1
+        """
+        if max_size < 1:
+            raise ValueError("Transposition table must hold at least 1 hash")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._hashes: OrderedDict[int, None] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        """Count the hashes in the table.
+
+        :returns: the number of hashes
+        """
+        return len(self._hashes)
+
+    def __contains__(self, zobrist_hash: int) -> bool:
+        """Look up a hash, counting the lookup as a hit or a miss.
+
+        :param zobrist_hash: the hash of the search state
+
+        :returns: True if the search state is known to have no solution
+        """
+        if zobrist_hash in self._hashes:
+            self._hashes.move_to_end(zobrist_hash)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, zobrist_hash: int) -> None:
+        """Add the hash of a search state which is known to have no solution.
+
+        :param zobrist_hash: the hash of the search state
+        """
+        self._hashes[zobrist_hash] = None
+        self._hashes.move_to_end(zobrist_hash)
+        if len(self._hashes) > self.max_size:
+            self._hashes.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        """Get the fraction of lookups which were hits.
+
+        :returns: the hit rate, or 0 if there have been no lookups
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,58 @@
+"""Tests for background.py."""
+
+from pipes_game import background, parser, solver
+from pipes_game.grid import UNSET
+
+# pylint: disable=missing-function-docstring
+
+
+def test_solver_thread_publishes_the_solution_as_the_final_snapshot():
+    game_grid = parser.parse_from_lines(["####C", "#A###", "#C#B#", "B##A#"])
+    solver_thread = background.SolverThread(game_grid)
+    solver_thread.start()
+    solver_thread.join()
+
+    assert solver_thread.error is None
+    assert solver_thread.solution.is_complete()
+    assert solver_thread.take_snapshot() is solver_thread.solution
+    assert solver_thread.take_snapshot() is None
+    assert game_grid.get_cell(game_grid.points[0]) == UNSET
+
+
+def test_solver_thread_takes_a_snapshot_when_asked():
+    game_grid = parser.parse_from_lines(["A#A"])
+    solver_thread = background.SolverThread(game_grid)
+    # The first snapshot is wanted from the start, so the first move is copied
+    solver_thread.run()
+
+    snapshot = solver_thread.take_snapshot()
+    assert snapshot is solver_thread.solution
+
+
+def test_solver_thread_only_copies_the_search_when_asked(mocker):
+    game_grid = parser.parse_from_lines(["####C", "#A###", "#C#B#", "B##A#"])
+    copy = mocker.spy(type(game_grid), "copy")
+    background.SolverThread(game_grid).run()
+
+    # Once for the search's working grid, and once for the first snapshot
+    assert copy.call_count == 2
+
+
+def test_solver_thread_records_why_there_is_no_solution():
+    game_grid = parser.parse_from_lines(["A#B", "###", "B#A"])
+    solver_thread = background.SolverThread(game_grid)
+    solver_thread.run()
+
+    assert isinstance(solver_thread.error, solver.UnsolvableError)
+    assert solver_thread.solution is None
+    assert solver_thread.take_snapshot() is not None
+
+
+def test_solver_thread_records_an_unexpected_error(mocker):
+    game_grid = parser.parse_from_lines(["A#A"])
+    mocker.patch.object(solver.SearchSolver, "solve", side_effect=KeyError("oops"))
+    solver_thread = background.SolverThread(game_grid)
+    solver_thread.run()
+
+    assert isinstance(solver_thread.error, KeyError)
+    assert solver_thread.solution is None
@@ -0,0 +1,117 @@
+"""Tests for batch.py."""
+
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+from pipes_game import batch, rules
+
+# pylint: disable=missing-function-docstring
+
+
+@pytest.fixture(name="grid_dir")
+def _grid_dir(tmp_path):
+    """Return a directory of grid files.
+
+    :returns: the path to the directory
+    """
+    (tmp_path / "solvable.txt").write_text("A#A\nB#B\n")
+    (tmp_path / "unsolvable.txt").write_text("A#B\n###\nB#A\n")
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "invalid.txt").write_text("A#A\nB#\n")
+    (tmp_path / "nested" / "ignored.json").write_text("{}")
+    return tmp_path
+
+
+def test_find_grid_files__searches_directories_and_keeps_files(grid_dir):
+    extra_file = grid_dir / "nested" / "ignored.json"
+    grid_files = batch.find_grid_files([extra_file, grid_dir])
+    assert grid_files == [
+        extra_file,
+        grid_dir / "nested" / "invalid.txt",
+        grid_dir / "solvable.txt",
+        grid_dir / "unsolvable.txt",
+    ]
+
+
+@pytest.mark.parametrize(
+    ["name", "expected_status"],
+    [
+        ("solvable.txt", "solved"),
+        ("unsolvable.txt", "unsolvable"),
+        ("nested/invalid.txt", "invalid"),
+        ("missing.txt", "invalid"),
+    ],
+)
+def test_solve_file__records_the_status(grid_dir, name, expected_status):
+    result = batch.solve_file(grid_dir / name)
+    assert result["file"] == str(grid_dir / name)
+    assert result["status"] == expected_status
+
+
+def test_solve_file__records_the_solution_and_timings(grid_dir):
+    result = batch.solve_file(grid_dir / "solvable.txt")
+    assert result["solution"] == ["AAA", "BBB"]
+    assert result["parse_seconds"] >= 0
+    assert result["solve_seconds"] >= 0
+    assert result["nodes"] == 1
+    assert result["table_hit_rate"] == 0
+    assert set(result["rule_hits"]) == set(rules.DEFAULT_RULES)
+
+
+def test_solve_file__solves_with_the_sat_backend(grid_dir):
+    result = batch.solve_file(grid_dir / "solvable.txt", backend="sat")
+    assert result["backend"] == "sat"
+    assert result["status"] == "solved"
+    assert result["solution"] == ["AAA", "BBB"]
+    assert result["conflicts"] == 0
+    assert "rule_hits" not in result
+
+
+def test_solve_file__looks_up_the_solution_in_the_cache(tmp_path):
+    (tmp_path / "grid.txt").write_text("a#ab#\nd##d#\nb####\nc###c\n")
+    (tmp_path / "flipped.txt").write_text("#ba#a\n#d##d\n####b\nc###c\n")
+    cache_path = tmp_path / "cache.db"
+
+    first = batch.solve_file(tmp_path / "grid.txt", cache_path=cache_path)
+    second = batch.solve_file(tmp_path / "flipped.txt", cache_path=cache_path)
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["status"] == "solved"
+    assert second["solution"] == [line[::-1] for line in first["solution"]]
+
+
+def test_solve_file__gives_up_at_the_search_limit(tmp_path):
+    grid_file = tmp_path / "grid.txt"
+    grid_file.write_text("B###\n#AB#\n###A\n")
+    result = batch.solve_file(grid_file, max_nodes=1)
+    assert result["status"] == "gave-up"
+
+
+def test_run_batch__writes_a_json_line_per_grid(grid_dir):
+    output = io.StringIO()
+    statuses = batch.run_batch([grid_dir], output, workers=2)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(result["status"] for result in results) == [
+        "invalid",
+        "solved",
+        "unsolvable",
+    ]
+    assert statuses == {"invalid": 1, "solved": 1, "unsolvable": 1}
+
+
+def test_batch_command_does_not_import_gui_modules(grid_dir):
+    code = (
+        "import sys\n"
+        "from pipes_game import __main__\n"
+        f"sys.argv = ['pipes_game', 'batch', {str(grid_dir / 'solvable.txt')!r}]\n"
+        "try:\n"
+        "    __main__.main()\n"
+        "except SystemExit as e:\n"
+        "    assert e.code == 0, e.code\n"
+        "assert not {'gi', 'cv2'} & set(sys.modules), 'GUI modules imported'\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
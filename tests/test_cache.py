@@ -0,0 +1,64 @@
+"""Tests for cache.py."""
+
+import pytest
+
+from pipes_game import cache, canonical
+
+# pylint: disable=missing-function-docstring
+
+LINES = ["a#ab#", "d##d#", "b####", "c###c"]
+SOLUTION = ["aaabb", "ddddb", "bbbbb", "ccccc"]
+
+
+@pytest.fixture(name="solution_cache")
+def _solution_cache(tmp_path):
+    """Return an empty solution cache.
+
+    :returns: the solution cache
+    """
+    with cache.SolutionCache(tmp_path / "cache.db") as solution_cache:
+        yield solution_cache
+
+
+def test_get__counts_hits_and_misses(solution_cache):
+    assert solution_cache.get(LINES) is None
+    solution_cache.put(LINES, SOLUTION)
+    assert solution_cache.get(LINES) == SOLUTION
+    assert (solution_cache.hits, solution_cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("transform", range(canonical.NUM_TRANSFORMS))
+def test_get__maps_the_solution_onto_a_symmetry_of_the_grid(solution_cache, transform):
+    solution_cache.put(LINES, SOLUTION)
+    labels = {"a": "Q", "b": "R", "c": "S", "d": "T"}
+    lines = canonical.relabel_lines(canonical.transform_lines(LINES, transform), labels)
+    solution = canonical.relabel_lines(
+        canonical.transform_lines(SOLUTION, transform), labels
+    )
+    assert solution_cache.get(lines) == solution
+
+
+def test_get__finds_solutions_added_by_another_instance(tmp_path):
+    with cache.SolutionCache(tmp_path / "cache.db") as solution_cache:
+        solution_cache.put(LINES, SOLUTION)
+    with cache.SolutionCache(tmp_path / "cache.db") as solution_cache:
+        assert solution_cache.get(LINES) == SOLUTION
+
+
+def test_put__evicts_the_least_recently_used_solutions(tmp_path):
+    # The solutions take 3, 5 and 7 bytes, so only 2 of them fit
+    grids = [(["A" + "#" * i + "A"], ["A" * (i + 2)]) for i in range(3)]
+    with cache.SolutionCache(tmp_path / "cache.db", max_bytes=12) as solution_cache:
+        solution_cache.put(*grids[0])
+        solution_cache.put(*grids[1])
+        assert solution_cache.get(grids[0][0]) is not None
+        solution_cache.put(*grids[2])
+
+        assert len(solution_cache) == 2
+        assert solution_cache.get(grids[1][0]) is None
+        assert solution_cache.get(grids[0][0]) is not None
+
+
+def test_init__rejects_an_empty_cache(tmp_path):
+    with pytest.raises(ValueError):
+        cache.SolutionCache(tmp_path / "cache.db", max_bytes=0)
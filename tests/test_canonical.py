@@ -0,0 +1,52 @@
+"""Tests for canonical.py."""
+
+import pytest
+
+from pipes_game import canonical, parser, solver
+
+# pylint: disable=missing-function-docstring
+
+LINES = ["a#ab#", "d##d#", "b####", "c###c"]
+SOLUTION = ["aaabb", "ddddb", "bbbbb", "ccccc"]
+
+
+def test_transform_lines__swaps_the_rows_with_the_columns():
+    assert canonical.transform_lines(["AB", "CD", "EF"], 4) == ["ACE", "BDF"]
+
+
+@pytest.mark.parametrize("transform", range(canonical.NUM_TRANSFORMS))
+def test_invert_transform__undoes_the_transform(transform):
+    transformed = canonical.transform_lines(LINES, transform)
+    inverse = canonical.invert_transform(transform)
+    assert canonical.transform_lines(transformed, inverse) == LINES
+
+
+@pytest.mark.parametrize("transform", range(canonical.NUM_TRANSFORMS))
+def test_canonicalise__is_the_same_for_every_symmetry(transform):
+    relabelled = canonical.relabel_lines(LINES, {"a": "X", "b": "a", "c": "7"})
+    form = canonical.canonicalise(canonical.transform_lines(relabelled, transform))
+    assert form.lines == canonical.canonicalise(LINES).lines
+    assert form.key == canonical.canonicalise(LINES).key
+
+
+def test_canonicalise__renames_the_pipes_in_the_order_they_appear():
+    form = canonical.canonicalise(["Z#Z", "#Y#", "#Y#"])
+    assert form.lines == ["##A", "BB#", "##A"]
+    assert form.labels == {"Z": "A", "Y": "B"}
+
+
+def test_canonicalise__tells_different_grids_apart():
+    assert canonical.canonicalise(["A#A"]).key != canonical.canonicalise(["AA#"]).key
+
+
+@pytest.mark.parametrize("transform", range(canonical.NUM_TRANSFORMS))
+def test_from_canonical__maps_the_solution_back(transform):
+    lines = canonical.transform_lines(LINES, transform)
+    solution = canonical.transform_lines(SOLUTION, transform)
+    form = canonical.canonicalise(lines)
+
+    canonical_solution = canonical.to_canonical(form, solution)
+    assert canonical_solution == parser.grid_to_lines(
+        solver.solve(parser.parse_from_lines(form.lines))
+    )
+    assert canonical.from_canonical(form, canonical_solution) == solution
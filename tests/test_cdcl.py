@@ -0,0 +1,106 @@
+"""Tests for cdcl.py."""
+
+import itertools
+import random
+
+import pytest
+
+from pipes_game import cdcl
+
+# pylint: disable=missing-function-docstring
+
+
+def _pigeonhole(pigeons, holes):
+    """Make a solver which puts each pigeon in a hole, with one pigeon per hole.
+
+    :param pigeons: the number of pigeons
+    :param holes: the number of holes
+
+    :returns: the solver, and the variable of each pigeon being in each hole
+    """
+    solver = cdcl.CdclSolver(pigeons * holes)
+    in_hole = [[p * holes + h + 1 for h in range(holes)] for p in range(pigeons)]
+    for p in range(pigeons):
+        solver.add_clause(in_hole[p])
+    for h in range(holes):
+        for p, q in itertools.combinations(range(pigeons), 2):
+            solver.add_clause([-in_hole[p][h], -in_hole[q][h]])
+    return solver, in_hole
+
+
+def _satisfies(clauses, value):
+    """Check whether values of the variables satisfy every clause.
+
+    :param clauses: the clauses
+    :param value: gets the value of a variable
+
+    :returns: True if every clause has a true literal
+    """
+    return all(any(value(abs(q)) == (q > 0) for q in clause) for clause in clauses)
+
+
+def test_luby():
+    assert [cdcl.luby(i) for i in range(8)] == [1, 1, 2, 1, 1, 2, 4, 1]
+    assert cdcl.luby(14) == 8
+
+
+def test_solve__finds_a_model():
+    solver, in_hole = _pigeonhole(5, 5)
+    assert solver.solve()
+    holes = [[h for h, var in enumerate(row) if solver.value(var)] for row in in_hole]
+    assert sorted(hole for (hole,) in holes) == list(range(5))
+
+
+def test_solve__proves_that_there_is_no_model():
+    solver, _ = _pigeonhole(6, 5)
+    assert solver.solve() is False
+    assert solver.conflicts > 0
+
+
+def test_solve__gives_up_at_the_decision_limit():
+    solver, _ = _pigeonhole(6, 5)
+    assert solver.solve(max_decisions=1) is None
+    assert solver.decisions == 1
+
+
+def test_solve__has_no_model_with_an_empty_clause():
+    solver = cdcl.CdclSolver(1)
+    solver.add_clause([])
+    assert solver.solve() is False
+
+
+def test_add_clause__refines_the_formula_after_solving():
+    solver = cdcl.CdclSolver(2)
+    solver.add_clause([1, 2])
+    seen = set()
+    while solver.solve():
+        model = (solver.value(1), solver.value(2))
+        seen.add(model)
+        solver.add_clause([-1 if model[0] else 1, -2 if model[1] else 2])
+    assert seen == {(True, False), (False, True), (True, True)}
+
+
+def test_add_clause__rejects_an_unknown_variable():
+    with pytest.raises(ValueError, match="Unknown variable"):
+        cdcl.CdclSolver(2).add_clause([1, -3])
+
+
+def test_solve__agrees_with_brute_force_on_random_formulas():
+    rng = random.Random(0)
+    for _ in range(200):
+        num_vars = rng.randint(3, 8)
+        clauses = [
+            [rng.choice([-1, 1]) * rng.randint(1, num_vars) for _ in range(3)]
+            for _ in range(rng.randint(1, 40))
+        ]
+        solver = cdcl.CdclSolver(num_vars)
+        for clause in clauses:
+            solver.add_clause(clause)
+
+        expected = any(
+            _satisfies(clauses, lambda var, bits=bits: bits[var - 1])
+            for bits in itertools.product([False, True], repeat=num_vars)
+        )
+        assert solver.solve() == expected
+        if expected:
+            assert _satisfies(clauses, solver.value)
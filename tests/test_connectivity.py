@@ -0,0 +1,89 @@
+"""Tests for connectivity.py."""
+
+import random
+
+import pytest
+
+from pipes_game import connectivity, generator, parser, solver
+from pipes_game.grid import PipesGrid, Point, UNSET
+
+# pylint: disable=missing-class-docstring, missing-function-docstring
+
+
+def count_regions(game_grid: PipesGrid) -> int:
+    """Count the regions of unset cells by flood filling from scratch.
+
+    :param game_grid: the game grid
+
+    :returns: the number of regions
+    """
+    unset = {i for i, (_, value) in enumerate(game_grid) if value == UNSET}
+    seen = set()
+    count = 0
+    for index in unset:
+        if index in seen:
+            continue
+        count += 1
+        stack = [index]
+        seen.add(index)
+        while stack:
+            for n in game_grid.neighbor_indices[stack.pop()]:
+                if n in unset and n not in seen:
+                    seen.add(n)
+                    stack.append(n)
+    return count
+
+
+class TestConnectivityChecker:
+    @pytest.mark.parametrize(
+        ["lines", "expected"],
+        [
+            (["A#A", "B#B"], True),
+            (["B###", "#AB#", "###A"], True),
+            # A's endpoints don't neighbor the same region
+            (["A#B#A", "##B##"], False),
+            # No pipe can fill the corner cells
+            (["#AA", "BB#"], False),
+        ],
+    )
+    def test_is_feasible(self, lines, expected):
+        game_grid = parser.parse_from_lines(lines)
+        assert connectivity.ConnectivityChecker(game_grid).is_feasible() is expected
+
+    def test_is_feasible__sees_a_region_cut_off_by_a_move(self):
+        game_grid = parser.parse_from_lines(["A###", "#B#B", "A###"])
+        checker = connectivity.ConnectivityChecker(game_grid)
+        assert checker.is_feasible()
+
+        # Only A's start could fill the cell between A's endpoints, until it moves
+        game_grid.set_cell(Point(1, 0), "A")
+        assert checker.count_regions() == 2
+        assert not checker.is_feasible()
+
+        game_grid.set_cell(Point(2, 0), "A")
+        assert checker.count_regions() == 3
+
+        game_grid.rollback(0)
+        assert checker.count_regions() == 2
+        assert checker.is_feasible()
+
+    @pytest.mark.parametrize(["seed"], [(0,), (1,), (2,), (3,)])
+    def test_count_regions__stays_up_to_date_with_moves_and_rollbacks(self, seed):
+        rng = random.Random(seed)
+        game_grid = parser.parse_from_lines(generator.generate(9, 8, 12, seed=seed))
+        checker = connectivity.ConnectivityChecker(game_grid)
+        tokens = []
+        for _ in range(100):
+            moves = [
+                (position, pipe)
+                for pipe, endpoints in game_grid.pipe_endpoints.items()
+                if not game_grid.is_pipe_complete(pipe)
+                for endpoint in endpoints.values()
+                for position in solver.get_unset_neighbors(game_grid, endpoint)
+            ]
+            if tokens and (not moves or rng.random() < 0.3):
+                game_grid.rollback(tokens.pop())
+            elif moves:
+                tokens.append(game_grid.checkpoint())
+                game_grid.set_cell(*rng.choice(moves))
+            assert checker.count_regions() == count_regions(game_grid)
@@ -0,0 +1,58 @@
+"""Tests for decompose.py."""
+
+from pipes_game import decompose, parser, solver
+from pipes_game.grid import Point, UNSET
+
+# pylint: disable=missing-function-docstring
+
+# Two grids side by side, split by a wall of complete pipes
+LEFT = ["BA#C", "####", "##A#", "B##C"]
+RIGHT = ["ED#F", "####", "##D#", "E##F"]
+LINES = [left + wall + right for left, wall, right in zip(LEFT, "WWXX", RIGHT)]
+
+
+def test_find_components__splits_the_grid_between_the_pipes():
+    components = decompose.find_components(parser.parse_from_lines(LINES))
+
+    assert sorted(sorted(component.pipes) for component in components) == [
+        ["A", "B", "C"],
+        ["D", "E", "F"],
+    ]
+    assert all(len(component.cells) == 10 for component in components)
+
+
+def test_find_components__joins_the_regions_next_to_a_pipe():
+    game_grid = parser.parse_from_lines(["A#BB#A"])
+    (component,) = decompose.find_components(game_grid)
+    assert component.pipes == ["A"]
+    assert sorted(component.cells) == [Point(1, 0), Point(4, 0)]
+
+
+def test_find_components__gives_a_pipe_with_nowhere_to_go_no_cells():
+    game_grid = parser.parse_from_lines(["ABA", "CBC", "###"])
+    components = decompose.find_components(game_grid)
+    assert decompose.Component([], ["A"]) in components
+
+
+def test_extract_component__copies_the_component_into_its_bounding_box():
+    game_grid = parser.parse_from_lines(LINES)
+    component = next(c for c in decompose.find_components(game_grid) if "D" in c.pipes)
+    sub_grid, offset = decompose.extract_component(game_grid, component)
+
+    assert offset == Point(5, 0)
+    assert (sub_grid.num_cols, sub_grid.num_rows) == (4, 4)
+    assert sub_grid.pipe_labels == {"D", "E", "F"}
+    assert sum(value == UNSET for _, value in sub_grid) == 10
+    assert sub_grid.pipe_endpoints["D"] == {"start": Point(1, 0), "end": Point(2, 2)}
+
+
+def test_merge_components__copies_the_solutions_back():
+    game_grid = parser.parse_from_lines(LINES)
+    solutions = []
+    for component in decompose.find_components(game_grid):
+        sub_grid, offset = decompose.extract_component(game_grid, component)
+        solutions.append((component, solver.solve(sub_grid), offset))
+    merged = decompose.merge_components(game_grid, solutions)
+
+    assert solver.is_solved(merged)
+    assert parser.grid_to_lines(merged) == parser.grid_to_lines(solver.solve(game_grid))
@@ -1,11 +1,13 @@
 """Tests for drawer.py."""
 
+import cv2
+import numpy
 import pytest
 
-from pipes_game import drawer
-from pipes_game.grid import Point
+from pipes_game import drawer, parser
+from pipes_game.grid import CompactPipesGrid, PipesGrid, Point
 
-# pylint: disable=missing-function-docstring, too-many-arguments
+# pylint: disable=missing-class-docstring, missing-function-docstring, too-many-arguments
 
 
 @pytest.mark.parametrize(
@@ -29,3 +31,161 @@ def test_get_text_origin_for_cell(
         cell_height,
     )
     assert actual == expected_origin
+
+
+class TestGridRenderer:
+    @pytest.fixture(name="game_grid")
+    def _game_grid(self):
+        return parser.parse_from_lines(["A#C#", "B###", "#BAC"])
+
+    def test_first_frame_matches_grid_to_frame(self, game_grid):
+        renderer = drawer.GridRenderer(200, 150)
+        frame = renderer.render(game_grid)
+        assert (frame == drawer.grid_to_frame(game_grid, 200, 150)).all()
+
+    def test_only_changed_cells_are_repainted(self, mocker, game_grid):
+        renderer = drawer.GridRenderer(200, 150)
+        renderer.render(game_grid)
+
+        paint_cell = mocker.spy(renderer, "_paint_cell")
+        game_grid.set_cell(Point(1, 1), "B")
+        frame = renderer.render(game_grid)
+
+        assert paint_cell.call_count == 1
+        assert (frame == drawer.grid_to_frame(game_grid, 200, 150)).all()
+
+    def test_rolled_back_cells_are_cleared(self, game_grid):
+        renderer = drawer.GridRenderer(200, 150)
+        expected = renderer.render(game_grid).copy()
+
+        token = game_grid.checkpoint()
+        game_grid.set_cell(Point(1, 1), "B")
+        renderer.render(game_grid)
+        game_grid.rollback(token)
+
+        assert (renderer.render(game_grid) == expected).all()
+
+    def test_a_new_grid_is_fully_drawn(self, game_grid):
+        renderer = drawer.GridRenderer(200, 150)
+        renderer.render(game_grid)
+
+        other_grid = parser.parse_from_lines(["A##A", "####", "B##B"])
+        frame = renderer.render(other_grid)
+        assert (frame == drawer.grid_to_frame(other_grid, 200, 150)).all()
+
+    @pytest.mark.parametrize("grid_type", [PipesGrid, CompactPipesGrid])
+    def test_only_changed_cells_of_a_copy_are_repainted(self, mocker, grid_type):
+        game_grid = parser.parse_from_lines(["A#C#", "B###", "#BAC"], grid_type)
+        renderer = drawer.GridRenderer(200, 150)
+        renderer.render(game_grid)
+        game_grid.set_cell(Point(1, 1), "B")
+        renderer.render(game_grid)
+
+        snapshot = game_grid.copy()
+        snapshot.rollback(0)
+        snapshot.set_cell(Point(1, 0), "A")
+        init_layout = mocker.spy(renderer, "_init_layout")
+        paint_cell = mocker.spy(renderer, "_paint_cell")
+        frame = renderer.render(snapshot)
+
+        assert init_layout.call_count == 0
+        assert paint_cell.call_count == 1
+        assert (frame == drawer.grid_to_frame(snapshot, 200, 150)).all()
+
+    def test_compact_grid_is_drawn_the_same_as_a_pipes_grid(self, game_grid):
+        compact_grid = CompactPipesGrid.from_grid(game_grid)
+        expected = drawer.grid_to_frame(game_grid, 200, 150)
+        assert (drawer.grid_to_frame(compact_grid, 200, 150) == expected).all()
+
+    def test_every_repainted_cell_matches_a_full_redraw(self):
+        game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+        renderer = drawer.GridRenderer(300, 200)
+        renderer.render(game_grid)
+        for position in (Point(1, 0), Point(2, 0), Point(3, 0), Point(3, 1)):
+            game_grid.set_cell(position, "B")
+        frame = renderer.render(game_grid)
+
+        assert (frame == drawer.grid_to_frame(game_grid, 300, 200)).all()
+
+    def test_frame_can_be_drawn_into_a_non_contiguous_view(self, game_grid):
+        # An RGB view of a BGRX buffer, as used by a display's pixel buffer
+        buffer = numpy.zeros((150, 200, 4), dtype=numpy.uint8)
+        frame = buffer[:, :, 2::-1]
+        renderer = drawer.GridRenderer(200, 150, frame=frame)
+
+        assert renderer.render(game_grid) is frame
+        game_grid.set_cell(Point(1, 1), "B")
+        renderer.render(game_grid)
+        assert (frame == drawer.grid_to_frame(game_grid, 200, 150)).all()
+
+    def test_grid_to_frame_only_rasterises_each_label_once(self, game_grid, mocker):
+        drawer.get_glyph_cache.cache_clear()
+        put_text = mocker.spy(cv2, "putText")
+        first = drawer.grid_to_frame(game_grid, 200, 150).copy()
+        call_count = put_text.call_count
+
+        assert (drawer.grid_to_frame(game_grid, 200, 150) == first).all()
+        assert put_text.call_count == call_count
+
+    def test_value_error_is_raised_if_frame_is_the_wrong_shape(self):
+        with pytest.raises(ValueError, match=r"Frame must have shape \(150, 200, 3\)"):
+            drawer.GridRenderer(200, 150, frame=numpy.zeros((200, 150, 3)))
+
+
+def test_get_color_map_for_labels_gives_every_label_a_unique_color():
+    labels = {chr(0x100 + i) for i in range(150)}
+    color_map = drawer.get_color_map_for_labels(labels)
+    assert len(set(color_map.values())) == 150
+
+
+class TestGlyphCache:
+    def test_label_is_only_rasterised_once(self, mocker):
+        put_text = mocker.spy(cv2, "putText")
+        cache = drawer.GlyphCache()
+        font_options = {
+            "fontFace": cv2.FONT_HERSHEY_SIMPLEX,
+            "fontScale": 1,
+            "thickness": 2,
+        }
+        first = cache.get("A", font_options, 40, 40)
+        second = cache.get("A", font_options, 40, 40)
+
+        assert first is second
+        assert put_text.call_count == 1
+
+        cache.clear()
+        cache.get("A", font_options, 40, 40)
+        assert put_text.call_count == 2
+
+    def test_blitted_label_matches_put_text(self):
+        font_options = {
+            "fontFace": cv2.FONT_HERSHEY_SIMPLEX,
+            "fontScale": 1,
+            "thickness": 2,
+        }
+        alpha, (y, x) = drawer.GlyphCache().get("A", font_options, 40, 40)
+
+        expected = numpy.full((40, 40, 3), 200, dtype=numpy.uint8)
+        origin = drawer.get_text_origin_for_cell("A", font_options, Point(0, 0), 40, 40)
+        cv2.putText(
+            expected,
+            "A",
+            org=origin,
+            color=(0, 0, 0),
+            bottomLeftOrigin=False,
+            **font_options,
+        )
+
+        actual = numpy.full((40, 40, 3), 200, dtype=numpy.uint8)
+        patch = actual[y : y + alpha.shape[0], x : x + alpha.shape[1]]
+        patch[:] = patch * (255 - alpha[..., None].astype(numpy.uint16)) // 255
+        # Anti-aliased edges may be rounded differently by OpenCV
+        assert numpy.abs(actual.astype(int) - expected).max() <= 2
+
+    def test_empty_label_gives_none(self):
+        font_options = {
+            "fontFace": cv2.FONT_HERSHEY_SIMPLEX,
+            "fontScale": 1,
+            "thickness": 2,
+        }
+        assert drawer.GlyphCache().get(" ", font_options, 40, 40) is None
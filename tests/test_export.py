@@ -0,0 +1,50 @@
+"""Tests for export.py."""
+
+import cv2
+import pytest
+
+from pipes_game import export, parser, solver
+
+# pylint: disable=missing-function-docstring
+
+
+def test_export_solve__writes_the_grid_and_each_move_as_images(tmp_path):
+    game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+    frames = export.export_solve(game_grid, tmp_path / "frames", 40, 30)
+
+    images = sorted((tmp_path / "frames").iterdir())
+    assert frames == len(images) == 14
+    assert images[0].name == "frame_000000.png"
+    assert cv2.imread(str(images[-1])).shape == (30, 40, 3)
+
+
+def test_export_solve__records_every_kth_move_and_the_solution(tmp_path):
+    game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+    frames = export.export_solve(game_grid, tmp_path, 200, 150, every=3)
+
+    last_image = cv2.imread(str(sorted(tmp_path.iterdir())[-1]))
+    solution_frame = export.drawer.grid_to_frame(solver.solve(game_grid), 200, 150)
+    assert frames == 6
+    assert (last_image == solution_frame[:, :, ::-1]).all()
+
+
+def test_export_solve__writes_a_video_file(tmp_path):
+    game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+    frames = export.export_solve(game_grid, tmp_path / "solve.avi", 40, 32)
+
+    capture = cv2.VideoCapture(str(tmp_path / "solve.avi"))
+    assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == frames == 14
+    capture.release()
+
+
+def test_export_solve__writes_frames_before_the_search_fails(tmp_path):
+    game_grid = parser.parse_from_lines(["A#B", "###", "B#A"])
+    with pytest.raises(solver.UnsolvableError):
+        export.export_solve(game_grid, tmp_path, 40, 30)
+    assert list(tmp_path.iterdir())
+
+
+def test_export_solve__value_error_is_raised_if_every_is_less_than_1(tmp_path):
+    game_grid = parser.parse_from_lines(["A#A"])
+    with pytest.raises(ValueError, match=r"at least every 1 move"):
+        export.export_solve(game_grid, tmp_path, 40, 30, every=0)
@@ -0,0 +1,71 @@
+"""Tests for generator.py."""
+
+import random
+
+import pytest
+
+from pipes_game import generator, parser, solver
+from pipes_game.grid import UNSET
+
+# pylint: disable=missing-function-docstring
+
+
+@pytest.mark.parametrize(
+    ["num_cols", "num_rows", "num_pipes"],
+    [(2, 1, 1), (2, 2, 2), (3, 2, 2), (9, 5, 3), (5, 9, 11), (8, 8, 16)],
+)
+def test_generate_paths__partitions_the_grid_into_paths_which_never_touch_themselves(
+    num_cols, num_rows, num_pipes
+):
+    paths = generator.generate_paths(num_cols, num_rows, num_pipes, random.Random(0))
+
+    assert len(paths) == num_pipes
+    assert sorted(i for path in paths for i in path) == list(range(num_cols * num_rows))
+    for path in paths:
+        assert len(path) >= 2
+        positions = [divmod(i, num_cols) for i in path]
+        for a, (ay, ax) in enumerate(positions):
+            for b, (by, bx) in enumerate(positions):
+                is_neighbor = abs(ax - bx) + abs(ay - by) == 1
+                assert is_neighbor == (abs(a - b) == 1)
+
+
+@pytest.mark.parametrize(["num_pipes"], [(1,), (12,)])
+def test_generate_paths__value_error_is_raised_for_too_few_or_many_pipes(num_pipes):
+    with pytest.raises(ValueError, match=r"A 7x6 grid must have 4 to 10 pipes"):
+        generator.generate_paths(7, 6, num_pipes, random.Random(0))
+
+
+def test_get_pipe_count_range__is_limited_by_the_number_of_pipe_labels():
+    num_labels = generator.count_pipe_labels()
+    assert num_labels == len(set(generator.iter_pipe_labels()))
+    assert generator.get_pipe_count_range(1000, 1000) == (501, num_labels)
+    with pytest.raises(ValueError, match=f"must have 501 to {num_labels} pipes"):
+        generator.generate(1000, 1000, num_labels + 1)
+
+
+def test_generate__generates_the_same_grid_from_the_same_seed():
+    assert generator.generate(30, 20, 40, seed=5) == generator.generate(
+        30, 20, 40, seed=5
+    )
+    assert generator.generate(30, 20, 40, seed=5) != generator.generate(
+        30, 20, 40, seed=6
+    )
+
+
+@pytest.mark.parametrize(["seed"], [(0,), (1,), (2,)])
+def test_generate__generates_a_grid_with_a_solution(seed):
+    game_grid = parser.parse_from_lines(generator.generate(7, 6, 10, seed=seed))
+    solution = generator.generate(7, 6, 10, seed=seed, solution=True)
+
+    assert len(game_grid.pipe_labels) == 10
+    for (position, value), solved_value in zip(game_grid, "".join(solution)):
+        assert value in (UNSET, solved_value), position
+    assert parser.grid_to_lines(solver.solve(game_grid)) == solution
+
+
+def test_generate__uses_non_ascii_labels_once_the_ascii_ones_run_out():
+    lines = generator.generate(20, 20, 100, seed=0)
+    labels = set("".join(lines)) - {parser.UNSET_SYMBOL}
+    assert len(labels) == 100
+    assert any(not label.isascii() for label in labels)
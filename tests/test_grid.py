@@ -2,6 +2,7 @@
 
 import re
 
+import numpy
 import pytest
 
 from pipes_game import grid
@@ -227,3 +228,376 @@ class TestSetCell:
             match=re.escape(f"{position} is not a neighbor of A's endpoint"),
         ):
             test_grid.set_cell(position, "A")
+
+
+def test_is_filled_is_true_only_if_no_cell_is_unset():
+    array = [["A", UNSET, "A"]]
+    test_grid = grid.PipesGrid(
+        num_cols=3,
+        num_rows=1,
+        array=array,
+        pipe_labels={"A"},
+    )
+    assert not test_grid.is_filled()
+
+    test_grid.set_cell(grid.Point(1, 0), "A")
+    assert test_grid.is_filled()
+
+
+class TestCompactPipesGrid:
+    @pytest.fixture(name="compact_grid")
+    def _compact_grid(self) -> grid.CompactPipesGrid:
+        """Return a simple compact test pipes grid.
+
+        :returns the test grid
+        """
+        array = [
+            ["B", UNSET, "B"],
+            ["A", UNSET, "A"],
+        ]
+        return grid.CompactPipesGrid(
+            num_cols=3,
+            num_rows=2,
+            array=array,
+            pipe_labels={"A", "B"},
+        )
+
+    def test_cells_are_stored_as_label_codes(self, compact_grid):
+        assert compact_grid.labels == (UNSET, "A", "B")
+        assert compact_grid.codes.dtype == numpy.uint8
+        assert compact_grid.codes.tolist() == [2, 0, 2, 1, 0, 1]
+
+    @pytest.mark.parametrize(
+        "num_labels,dtype",
+        [(300, numpy.uint16), (40000, numpy.uint16), (70000, numpy.int32)],
+    )
+    def test_codes_are_wider_if_there_are_too_many_labels_for_uint8(
+        self, num_labels, dtype
+    ):
+        labels = [chr(0x10000 + i) for i in range(num_labels)]
+        compact_grid = grid.CompactPipesGrid(
+            num_cols=2,
+            num_rows=num_labels,
+            array=[[label, label] for label in labels],
+            pipe_labels=set(labels),
+        )
+        assert compact_grid.codes.dtype == dtype
+        assert compact_grid.get_cell(grid.Point(1, num_labels - 1)) == labels[-1]
+
+    def test_cells_can_be_given_as_an_array_of_codes(self):
+        compact_grid = grid.CompactPipesGrid(
+            num_cols=3,
+            num_rows=2,
+            array=numpy.array([[2, 0, 2], [1, 0, 1]]),
+            pipe_labels={"A", "B"},
+        )
+        assert compact_grid.codes.dtype == numpy.uint8
+        assert compact_grid.array == [["B", UNSET, "B"], ["A", UNSET, "A"]]
+        assert compact_grid.pipe_endpoints["B"]["end"] == grid.Point(2, 0)
+
+    def test_free_neighbors_are_counted_the_same_as_a_pipes_grid(self):
+        array = [["A", UNSET, UNSET], [UNSET, "B", UNSET], ["A", UNSET, "B"]]
+        pipes_grid = grid.PipesGrid(3, 3, array, {"A", "B"})
+        compact_grid = grid.CompactPipesGrid(3, 3, array, {"A", "B"})
+        for point in pipes_grid.points:
+            assert compact_grid.count_free_neighbors(
+                point
+            ) == pipes_grid.count_free_neighbors(point)
+
+    def test_get_and_set_cell(self, compact_grid):
+        assert compact_grid.get_cell(grid.Point(1, 1)) == UNSET
+
+        compact_grid.set_cell(grid.Point(1, 1), "A")
+        assert compact_grid.get_cell(grid.Point(1, 1)) == "A"
+        assert compact_grid.array == [["B", UNSET, "B"], ["A", "A", "A"]]
+        assert compact_grid.pipe_endpoints["A"]["start"] == grid.Point(1, 1)
+
+    def test_is_filled(self, compact_grid):
+        assert not compact_grid.is_filled()
+        compact_grid.set_cell(grid.Point(1, 0), "B")
+        compact_grid.set_cell(grid.Point(1, 1), "A")
+        assert compact_grid.is_filled()
+
+    def test_iterate_yields_the_same_as_a_pipes_grid(self, compact_grid):
+        pipes_grid = grid.PipesGrid(
+            num_cols=3,
+            num_rows=2,
+            array=compact_grid.array,
+            pipe_labels={"A", "B"},
+        )
+        assert list(compact_grid) == list(pipes_grid)
+
+    def test_from_grid_copies_a_partially_filled_grid(self):
+        pipes_grid = grid.PipesGrid(
+            num_cols=4,
+            num_rows=1,
+            array=[["A", UNSET, UNSET, "A"]],
+            pipe_labels={"A"},
+        )
+        pipes_grid.set_cell(grid.Point(1, 0), "A")
+
+        compact_grid = grid.CompactPipesGrid.from_grid(pipes_grid)
+        assert compact_grid.array == pipes_grid.array
+        assert compact_grid.pipe_endpoints == pipes_grid.pipe_endpoints
+
+
+class TestCheckpointAndRollback:
+    def test_rollback_undoes_set_cells_since_checkpoint(self):
+        array = [["A", UNSET, UNSET, UNSET, "A"]]
+        test_grid = grid.PipesGrid(
+            num_cols=5,
+            num_rows=1,
+            array=array,
+            pipe_labels={"A"},
+        )
+        test_grid.set_cell(grid.Point(1, 0), "A")
+        token = test_grid.checkpoint()
+        test_grid.set_cell(grid.Point(2, 0), "A")
+        test_grid.set_cell(grid.Point(3, 0), "A")
+
+        test_grid.rollback(token)
+        assert test_grid.array == [["A", "A", UNSET, UNSET, "A"]]
+        assert test_grid.pipe_endpoints == {
+            "A": {
+                "start": grid.Point(1, 0),
+                "end": grid.Point(4, 0),
+            },
+        }
+
+    def test_rollback_to_the_same_checkpoint_more_than_once(self, test_grid):
+        token = test_grid.checkpoint()
+        test_grid.set_cell(grid.Point(1, 0), "A")
+        test_grid.rollback(token)
+        test_grid.set_cell(grid.Point(1, 1), "B")
+        test_grid.rollback(token)
+
+        assert test_grid.get_cell(grid.Point(1, 0)) == UNSET
+        assert test_grid.get_cell(grid.Point(1, 1)) == UNSET
+        assert test_grid.pipe_endpoints["B"]["start"] == grid.Point(0, 1)
+
+    def test_moves_given_on_creation_can_be_rolled_back(self, test_grid):
+        test_grid.set_cell(grid.Point(1, 0), "A")
+        restored = grid.PipesGrid(
+            num_cols=test_grid.num_cols,
+            num_rows=test_grid.num_rows,
+            array=test_grid.array,
+            pipe_labels=set(test_grid.pipe_labels),
+            pipe_endpoints=test_grid.pipe_endpoints,
+            moves=test_grid.get_moves(),
+        )
+        assert restored.checkpoint() == 1
+
+        restored.rollback(0)
+        assert restored.get_cell(grid.Point(1, 0)) == UNSET
+        assert (
+            restored.pipe_endpoints
+            == grid.PipesGrid(3, 3, restored.array, {"A", "B"}).pipe_endpoints
+        )
+
+    def test_value_error_is_raised_if_token_is_invalid(self, test_grid):
+        token = test_grid.checkpoint()
+        with pytest.raises(ValueError, match=r"Invalid checkpoint token 1"):
+            test_grid.rollback(token + 1)
+
+
+class TestFreeNeighbors:
+    def test_free_neighbors_are_counted_on_creation(self, test_grid):
+        assert test_grid.count_free_neighbors(grid.Point(0, 0)) == 1
+        assert test_grid.count_free_neighbors(grid.Point(1, 1)) == 2
+        assert test_grid.count_free_neighbors(grid.Point(2, 2)) == 1
+
+    def test_free_neighbors_are_updated_by_set_cell_and_rollback(self, test_grid):
+        token = test_grid.checkpoint()
+        test_grid.set_cell(grid.Point(1, 1), "B")
+        assert test_grid.count_free_neighbors(grid.Point(1, 0)) == 0
+        assert test_grid.count_free_neighbors(grid.Point(0, 0)) == 1
+
+        test_grid.rollback(token)
+        assert test_grid.count_free_neighbors(grid.Point(1, 0)) == 1
+
+    def test_changed_cells_start_with_all_endpoints(self, test_grid):
+        changed = []
+        while (position := test_grid.pop_changed_cell()) is not None:
+            changed.append(position)
+        assert sorted(changed) == [grid.Point(x, y) for x in (0, 2) for y in (0, 1, 2)]
+
+    def test_set_cell_queues_the_cell_and_its_filled_neighbors(self, test_grid):
+        while test_grid.pop_changed_cell() is not None:
+            pass
+
+        test_grid.set_cell(grid.Point(1, 1), "B")
+        changed = []
+        while (position := test_grid.pop_changed_cell()) is not None:
+            changed.append(position)
+        assert sorted(changed) == [
+            grid.Point(0, 1),
+            grid.Point(1, 1),
+            grid.Point(2, 1),
+        ]
+
+
+class TestPoint:
+    def test_points_are_hashable_and_immutable(self):
+        point = grid.Point(1, 2)
+        assert {point: "A"}[grid.Point(1, 2)] == "A"
+        with pytest.raises(AttributeError):
+            point.x = 3
+
+    def test_get_neighbors_returns_the_cardinal_neighbors(self):
+        assert grid.Point(1, 1).get_neighbors() == (
+            grid.Point(1, 0),
+            grid.Point(2, 1),
+            grid.Point(1, 2),
+            grid.Point(0, 1),
+        )
+
+
+class TestGridTables:
+    def test_neighbor_indices_only_contain_in_bounds_neighbors(self, test_grid):
+        assert tuple(test_grid.neighbor_indices) == (
+            (1, 3),
+            (2, 4, 0),
+            (5, 1),
+            (0, 4, 6),
+            (1, 5, 7, 3),
+            (2, 8, 4),
+            (3, 7),
+            (4, 8, 6),
+            (5, 7),
+        )
+
+    def test_points_and_indices_correspond(self, test_grid):
+        for index, point in enumerate(test_grid.points):
+            assert test_grid.to_index(point) == index
+        assert test_grid.points[-1] == grid.Point(2, 2)
+        with pytest.raises(IndexError):
+            test_grid.points[9]  # pylint: disable=pointless-statement
+
+    @pytest.mark.parametrize("num_cols,num_rows", [(1, 1), (1, 4), (4, 1), (5, 2)])
+    def test_neighbor_indices_match_the_neighbors_of_each_point(
+        self, num_cols, num_rows
+    ):
+        points, neighbor_indices = grid.get_grid_tables(num_cols, num_rows)
+        for index, point in enumerate(points):
+            assert neighbor_indices[index] == tuple(
+                n.y * num_cols + n.x
+                for n in point.get_neighbors()
+                if 0 <= n.x < num_cols and 0 <= n.y < num_rows
+            )
+
+    def test_tables_of_a_large_grid_are_flat(self):
+        points, neighbor_indices = grid.get_grid_tables(2000, 1000)
+        assert len(points) == len(neighbor_indices) == 2_000_000
+        assert neighbor_indices.table.itemsize * len(neighbor_indices.table) <= 32e6
+        assert points[2001] == grid.Point(1, 1)
+
+    def test_tables_are_shared_between_grids_of_the_same_shape(self, test_grid):
+        other = grid.PipesGrid(
+            num_cols=3,
+            num_rows=3,
+            array=[["A", UNSET, "A"]] + [[UNSET] * 3] * 2,
+            pipe_labels={"A"},
+        )
+        assert other.points is test_grid.points
+        assert other.neighbor_indices is test_grid.neighbor_indices
+
+
+class TestGetChangesSince:
+    def test_no_changes_are_given_without_a_token(self, test_grid):
+        _, changes = test_grid.get_changes_since(None)
+        assert changes is None
+
+    def test_set_and_rolled_back_cells_are_given(self, test_grid):
+        token, _ = test_grid.get_changes_since(None)
+        checkpoint = test_grid.checkpoint()
+        test_grid.set_cell(grid.Point(1, 0), "A")
+        test_grid.rollback(checkpoint)
+        test_grid.set_cell(grid.Point(1, 2), "C")
+
+        token, changes = test_grid.get_changes_since(token)
+        assert changes == [1, 1, 7]
+        _, changes = test_grid.get_changes_since(token)
+        assert changes == []
+
+    def test_no_changes_are_given_once_too_many_to_track(self, test_grid):
+        token, _ = test_grid.get_changes_since(None)
+        checkpoint = test_grid.checkpoint()
+        for _ in range(5):
+            test_grid.set_cell(grid.Point(1, 0), "A")
+            test_grid.rollback(checkpoint)
+
+        _, changes = test_grid.get_changes_since(token)
+        assert changes is None
+
+
+class TestZobristHash:
+    def test_same_state_has_the_same_hash_whatever_the_order_of_moves(self):
+        array = [["A", UNSET, UNSET, UNSET, "A"], ["B", UNSET, UNSET, UNSET, "B"]]
+        grids = [
+            grid.PipesGrid(5, 2, [list(row) for row in array], {"A", "B"})
+            for _ in range(2)
+        ]
+        grids[0].set_cell(grid.Point(1, 0), "A")
+        grids[0].set_cell(grid.Point(3, 1), "B")
+        grids[1].set_cell(grid.Point(3, 1), "B")
+        grids[1].set_cell(grid.Point(1, 0), "A")
+
+        assert grids[0].zobrist_hash == grids[1].zobrist_hash
+        assert (
+            grids[0].zobrist_hash
+            == grid.PipesGrid(
+                5, 2, grids[0].array, {"A", "B"}, grids[0].pipe_endpoints
+            ).zobrist_hash
+        )
+
+    def test_hash_depends_on_the_endpoints(self):
+        from_start = grid.PipesGrid(5, 1, [["A", UNSET, UNSET, UNSET, "A"]], {"A"})
+        from_start.set_cell(grid.Point(1, 0), "A")
+        from_start.set_cell(grid.Point(2, 0), "A")
+        from_both = grid.PipesGrid(5, 1, [["A", UNSET, UNSET, UNSET, "A"]], {"A"})
+        from_both.set_cell(grid.Point(1, 0), "A")
+        from_both.set_cell(grid.Point(3, 0), "A")
+        from_both.rollback(1)
+        from_both.set_cell(grid.Point(2, 0), "A")
+
+        assert from_start.array == from_both.array
+        assert from_start.zobrist_hash == from_both.zobrist_hash
+        from_start.set_cell(grid.Point(3, 0), "A")
+        assert from_start.zobrist_hash != from_both.zobrist_hash
+
+    def test_rollback_restores_the_hash(self, test_grid):
+        initial_hash = test_grid.zobrist_hash
+        test_grid.set_cell(grid.Point(1, 0), "A")
+        assert test_grid.zobrist_hash != initial_hash
+
+        test_grid.rollback(0)
+        assert test_grid.zobrist_hash == initial_hash
+
+    def test_keys_differ_by_cell_label_and_endpoint(self):
+        keys = {
+            grid.get_zobrist_key(index, label, is_endpoint)
+            for index in range(1000)
+            for label in "AB"
+            for is_endpoint in (False, True)
+        }
+        assert len(keys) == 4000
+        assert grid.get_zobrist_key(3, "A") == grid.get_zobrist_key(3, "A")
+
+
+def test_copy_is_independent_of_the_original(test_grid):
+    token = test_grid.checkpoint()
+    test_grid.set_cell(grid.Point(1, 0), "A")
+    other = test_grid.copy()
+
+    other.rollback(token)
+    other.set_cell(grid.Point(1, 1), "B")
+    assert test_grid.array[:2] == [["A", "A", "A"], ["B", UNSET, "B"]]
+    assert test_grid.pipe_endpoints["A"]["start"] == grid.Point(1, 0)
+    assert test_grid.count_free_neighbors(grid.Point(1, 0)) == 1
+    assert other.array[:2] == [["A", UNSET, "A"], ["B", "B", "B"]]
+    assert other.count_free_neighbors(grid.Point(0, 0)) == 1
+    assert other.count_free_neighbors(grid.Point(1, 2)) == 0
+
+    test_grid.rollback(token)
+    assert test_grid.array[1] == ["B", UNSET, "B"]
+    assert other.checkpoint() == 1
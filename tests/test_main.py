@@ -0,0 +1,137 @@
+"""Tests for __main__.py."""
+
+import pathlib
+
+import pytest
+
+from pipes_game import __main__
+
+# pylint: disable=missing-function-docstring
+
+
+def test_parse_args__shows_a_grid_file_without_a_command():
+    args = __main__.parse_args(["grid.txt", "--width", "100"])
+    assert args.command == "show"
+    assert args.grid_file == pathlib.Path("grid.txt")
+    assert args.width == 100
+
+
+def test_parse_args__parses_the_batch_command():
+    args = __main__.parse_args(["batch", "a.txt", "grids", "-j", "4", "--timeout", "2"])
+    assert args.command == "batch"
+    assert args.paths == [pathlib.Path("a.txt"), pathlib.Path("grids")]
+    assert args.workers == 4
+    assert args.timeout == 2.0
+
+
+def test_parse_args__requires_a_command():
+    with pytest.raises(SystemExit):
+        __main__.parse_args([])
+
+
+def test_parse_args__parses_the_export_command():
+    args = __main__.parse_args(["export", "grid.txt", "solve.mp4", "--every", "5"])
+    assert args.command == "export"
+    assert args.output == pathlib.Path("solve.mp4")
+    assert args.every == 5
+
+
+def test_parse_args__parses_the_generate_command():
+    args = __main__.parse_args(["generate", "100", "50", "30", "--seed", "7"])
+    assert args.command == "generate"
+    assert (args.num_cols, args.num_rows, args.num_pipes) == (100, 50, 30)
+    assert args.seed == 7
+
+
+def test_parse_args__parses_the_table_size_of_the_batch_command():
+    assert __main__.parse_args(["batch", "a.txt"]).table_size > 0
+    assert __main__.parse_args(["batch", "a.txt", "--table-size", "0"]).table_size == 0
+
+
+@pytest.mark.parametrize("table_size", ["-1", "many"])
+def test_parse_args__rejects_an_invalid_table_size(table_size, capsys):
+    with pytest.raises(SystemExit):
+        __main__.parse_args(["batch", "a.txt", "--table-size", table_size])
+    assert "--table-size" in capsys.readouterr().err
+
+
+def test_parse_args__parses_the_solve_command():
+    args = __main__.parse_args(["solve", "grid.txt", "-j", "3", "--decompose"])
+    assert args.command == "solve"
+    assert args.grid_file == pathlib.Path("grid.txt")
+    assert args.workers == 3
+    assert args.decompose
+
+
+def test_parse_args__parses_the_backend():
+    assert __main__.parse_args(["solve", "grid.txt"]).backend == "search"
+    assert __main__.parse_args(["batch", "a.txt", "--backend", "sat"]).backend == "sat"
+    with pytest.raises(SystemExit):
+        __main__.parse_args(["solve", "grid.txt", "--backend", "other"])
+
+
+def test_parse_args__parses_the_cache():
+    assert __main__.parse_args(["solve", "grid.txt"]).cache is None
+    args = __main__.parse_args(["batch", "a.txt", "--cache", "solutions.db"])
+    assert args.cache == pathlib.Path("solutions.db")
+
+
+def test_parse_args__parses_the_serve_command():
+    args = __main__.parse_args(["serve", "pipes.sock", "-j", "2", "--queue-size", "8"])
+    assert args.command == "serve"
+    assert args.socket == pathlib.Path("pipes.sock")
+    assert (args.workers, args.queue_size) == (2, 8)
+
+
+@pytest.mark.parametrize("contents", [None, "A#A\nB#\n"])
+def test_solve_grid__reports_a_grid_file_which_cannot_be_read(
+    tmp_path, capsys, contents
+):
+    grid_file = tmp_path / "grid.txt"
+    if contents is not None:
+        grid_file.write_text(contents)
+    args = __main__.parse_args(["solve", str(grid_file)])
+
+    assert __main__.solve_grid(args) == 1
+    captured = capsys.readouterr()
+    assert "Grid could not be read" in captured.err
+    assert not captured.out
+
+
+@pytest.mark.parametrize("contents", [None, "A#A\nB#\n"])
+def test_export_solve__reports_a_grid_file_which_cannot_be_read(
+    tmp_path, capsys, contents
+):
+    grid_file = tmp_path / "grid.txt"
+    if contents is not None:
+        grid_file.write_text(contents)
+    args = __main__.parse_args(["export", str(grid_file), str(tmp_path / "solve.mp4")])
+
+    assert __main__.export_solve(args) == 1
+    assert "Grid could not be read" in capsys.readouterr().err
+
+
+def test_parse_args__rejects_recording_less_than_every_move(capsys):
+    with pytest.raises(SystemExit):
+        __main__.parse_args(["export", "grid.txt", "solve.mp4", "--every", "0"])
+    assert "--every" in capsys.readouterr().err
+
+
+def test_export_solve__reports_an_output_which_cannot_be_written(tmp_path, capsys):
+    grid_file = tmp_path / "grid.txt"
+    grid_file.write_text("A#A\nB#B\n")
+    output = tmp_path / "missing" / "solve.mp4"
+    args = __main__.parse_args(["export", str(grid_file), str(output)])
+
+    assert __main__.export_solve(args) == 1
+    assert "could not be recorded" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "command", [["batch", "a.txt"], ["solve", "a.txt"], ["serve", "a.sock"]]
+)
+@pytest.mark.parametrize("workers", ["0", "-2"])
+def test_parse_args__rejects_fewer_than_1_worker(command, workers, capsys):
+    with pytest.raises(SystemExit):
+        __main__.parse_args([*command, "--workers", workers])
+    assert "--workers" in capsys.readouterr().err
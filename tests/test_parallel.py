@@ -0,0 +1,157 @@
+"""Tests for parallel.py."""
+
+import multiprocessing
+import time
+
+import pytest
+
+from pipes_game import parallel, parser, solver
+
+# pylint: disable=missing-class-docstring, missing-function-docstring
+
+
+def test_split__gives_the_grid_after_each_move_of_a_branch():
+    game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+    solution, branches = parallel.split(game_grid)
+
+    assert solution is None
+    assert len(branches) == 2
+    assert all(branch.checkpoint() == game_grid.checkpoint() + 1 for branch in branches)
+    assert game_grid.checkpoint() == 0
+
+
+def test_split__gives_the_solution_if_found_by_forced_moves():
+    solution, branches = parallel.split(parser.parse_from_lines(["A#A", "B#B"]))
+    assert parser.grid_to_lines(solution) == ["AAA", "BBB"]
+    assert not branches
+
+
+def test_subproblem_round_trip_keeps_the_cells_and_endpoints():
+    game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+    _, (branch, _) = parallel.split(game_grid)
+    copy = parallel.from_subproblem(
+        branch.num_cols,
+        branch.num_rows,
+        branch.pipe_labels,
+        parallel.to_subproblem(branch),
+    )
+
+    assert copy.array == branch.array
+    assert copy.pipe_endpoints == branch.pipe_endpoints
+
+
+class TestSolveSubproblem:
+    LINES = ["A###C", "B##C#", "#A#B#", "#####", "#####"]
+
+    @pytest.fixture(name="cancelled")
+    def _cancelled(self, monkeypatch):
+        cancelled = multiprocessing.Event()
+        monkeypatch.setattr(parallel, "_cancelled", cancelled)
+        return cancelled
+
+    def _solve(self):
+        game_grid = parser.parse_from_lines(self.LINES)
+        shape = (game_grid.num_cols, game_grid.num_rows, game_grid.pipe_labels)
+        subproblem = parallel.to_subproblem(game_grid)
+        return parallel._solve_subproblem(  # pylint: disable=protected-access
+            *shape, subproblem, 10000, False
+        )
+
+    def test_search_is_not_cancelled_until_a_solution_is_found(self, cancelled):
+        assert not cancelled.is_set()
+        assert self._solve()["status"] == "unsolvable"
+
+    def test_search_stops_once_a_solution_is_found(self, cancelled):
+        cancelled.set()
+        result = self._solve()
+        assert result["status"] == "cancelled"
+        assert result["nodes"] <= 1
+
+    def test_cancellation_is_checked_every_few_moves(self, cancelled):
+        check = parallel._make_cancel_check()  # pylint: disable=protected-access
+        game_grid = parser.parse_from_lines(self.LINES)
+        for _ in range(parallel.CANCEL_CHECK_MOVES):
+            check(game_grid)
+
+        cancelled.set()
+        with pytest.raises(parallel._Cancelled):  # pylint: disable=protected-access
+            check(game_grid)
+
+
+class TestComponentSolver:
+    def test_returns_a_solved_grid(self):
+        left = ["BA#C", "####", "##A#", "B##C"]
+        lines = [a + wall + a.lower() for a, wall in zip(left, "WWXX")]
+        search = parallel.ComponentSolver(workers=2)
+        assert solver.is_solved(search.solve(parser.parse_from_lines(lines)))
+        assert search.nodes > 1
+
+    def test_unsolvable_error_is_raised_if_a_component_has_no_solution(self):
+        left = ["BA#C", "####", "##A#", "B##C"]
+        right = ["D##E", "####", "####", "E##D"]
+        lines = [a + wall + b for a, wall, b in zip(left, "WWXX", right)]
+        with pytest.raises(solver.UnsolvableError, match=r"has no solution"):
+            parallel.ComponentSolver(workers=2).solve(parser.parse_from_lines(lines))
+
+    def test_node_limit_is_shared_by_the_components(self):
+        left = ["BA#C", "####", "##A#", "B##C"]
+        game_grid = parser.parse_from_lines(
+            [a + wall + a.lower() for a, wall in zip(left, "WWXX")]
+        )
+        search = parallel.ComponentSolver(workers=2)
+        search.solve(game_grid)
+        nodes = search.nodes
+
+        search = parallel.ComponentSolver(workers=2, max_nodes=nodes)
+        assert solver.is_solved(search.solve(game_grid))
+        # Enough for either component on its own, but not for both
+        with pytest.raises(solver.SearchLimitError, match=f"after {nodes - 5} search"):
+            parallel.ComponentSolver(workers=2, max_nodes=nodes - 5).solve(game_grid)
+
+    def test_component_only_has_the_time_left_before_the_deadline(self):
+        game_grid = parser.parse_from_lines(["BA#C", "####", "##A#", "B##C"])
+        with pytest.raises(solver.SearchLimitError, match="seconds"):
+            parallel._solve_component(  # pylint: disable=protected-access
+                game_grid, None, time.monotonic() - 1, False
+            )
+
+
+class TestParallelSolver:
+    @pytest.mark.parametrize(["split_nodes"], [(1,), (2000,)])
+    @pytest.mark.parametrize(
+        ["lines"],
+        [
+            (["A#A", "B#B"],),
+            (["B###", "#AB#", "###A"],),
+            (["####C", "#A###", "#C#B#", "B##A#"],),
+        ],
+    )
+    def test_returns_a_solved_grid(self, lines, split_nodes):
+        game_grid = parser.parse_from_lines(lines)
+        search = parallel.ParallelSolver(workers=2, split_nodes=split_nodes)
+        assert solver.is_solved(search.solve(game_grid))
+
+    def test_finds_a_pipe_which_passes_next_to_itself(self):
+        game_grid = parser.parse_from_lines(
+            ["####A", "#####", "#####", "####B", "A###B"]
+        )
+        search = parallel.ParallelSolver(workers=2)
+        assert solver.is_solved(search.solve(game_grid))
+
+    @pytest.mark.parametrize(["split_nodes"], [(1,), (2000,)])
+    def test_unsolvable_error_is_raised_if_there_is_no_solution(self, split_nodes):
+        game_grid = parser.parse_from_lines(
+            ["A###C", "B##C#", "#A#B#", "#####", "#####"]
+        )
+        search = parallel.ParallelSolver(workers=2, split_nodes=split_nodes)
+        with pytest.raises(solver.UnsolvableError, match=r"has no solution"):
+            search.solve(game_grid)
+        assert search.nodes > 1
+
+    def test_search_limit_error_is_raised_if_out_of_nodes(self):
+        game_grid = parser.parse_from_lines(
+            ["####A", "#####", "#####", "####B", "A###B"]
+        )
+        search = parallel.ParallelSolver(workers=2, max_nodes=10, split_nodes=5)
+        with pytest.raises(solver.SearchLimitError, match=r"after 10 search nodes"):
+            search.solve(game_grid)
@@ -1,7 +1,9 @@
 """Tests for parser.py."""
 
-from pipes_game import parser
-from pipes_game.grid import UNSET
+import pytest
+
+from pipes_game import generator, parser
+from pipes_game.grid import CompactPipesGrid, PipesGrid, Point, UNSET
 
 # pylint: disable=missing-function-docstring
 
@@ -45,3 +47,92 @@ def test_parse_from_file__parses_a_text_file_into_a_grid(tmp_path):
         ["C", UNSET, "C"],
     ]
     assert grid.pipe_labels == {"A", "B", "C"}
+
+
+def test_parse_from_lines__creates_the_given_grid_type():
+    grid = parser.parse_from_lines(["A#A"], grid_type=CompactPipesGrid)
+
+    assert isinstance(grid, CompactPipesGrid)
+    assert grid.array == [["A", UNSET, "A"]]
+
+
+def test_grid_to_lines__formats_a_grid_as_parsed_lines():
+    lines = ["A#A", "B#B"]
+    grid = parser.parse_from_lines(lines)
+    assert parser.grid_to_lines(grid) == lines
+
+    grid.set_cell(grid.points[1], "A")
+    assert parser.grid_to_lines(grid) == ["AAA", "B#B"]
+
+
+def test_iter_puzzles__parses_each_grid_in_a_file(tmp_path):
+    the_file = tmp_path / "puzzles.txt"
+    the_file.write_text("; first\nA#A\nB#B\n\n\nAB\n#B\nA#\n; last\n\nA##A\n")
+    grids = list(parser.iter_puzzles(the_file))
+
+    assert all(isinstance(grid, CompactPipesGrid) for grid in grids)
+    assert [parser.grid_to_lines(grid) for grid in grids] == [
+        ["A#A", "B#B"],
+        ["AB", "#B", "A#"],
+        ["A##A"],
+    ]
+    assert grids[0].pipe_labels == {"A", "B"}
+    assert grids[1].pipe_endpoints["A"]["end"] == Point(0, 2)
+
+
+def test_iter_puzzles__accepts_windows_line_endings(tmp_path):
+    the_file = tmp_path / "puzzles.txt"
+    the_file.write_bytes(b"A#A\r\nB#B\r\n\r\nC#C\r\n")
+    grids = list(parser.iter_puzzles(the_file))
+    assert [parser.grid_to_lines(grid) for grid in grids] == [["A#A", "B#B"], ["C#C"]]
+
+
+@pytest.mark.parametrize("grid_type", [PipesGrid, CompactPipesGrid])
+def test_iter_puzzles__creates_the_given_grid_type(tmp_path, grid_type):
+    the_file = tmp_path / "puzzles.txt"
+    the_file.write_text("\u00e9#\u00e9\nB#B\n\nA#A\n", encoding="utf-8")
+    grids = list(parser.iter_puzzles(the_file, grid_type=grid_type))
+
+    assert {type(grid) for grid in grids} == {grid_type}
+    assert grids[0].array == [["\u00e9", UNSET, "\u00e9"], ["B", UNSET, "B"]]
+    assert grids[1].array == [["A", UNSET, "A"]]
+
+
+def test_iter_puzzles__generates_nothing_for_an_empty_file(tmp_path):
+    the_file = tmp_path / "puzzles.txt"
+    the_file.write_text("")
+    assert not list(parser.iter_puzzles(the_file))
+
+
+def test_iter_puzzles__raises_value_error_naming_an_invalid_grid(tmp_path):
+    the_file = tmp_path / "puzzles.txt"
+    the_file.write_text("A#A\n\nA#A\nB#\n")
+    grids = parser.iter_puzzles(the_file)
+
+    assert parser.grid_to_lines(next(grids)) == ["A#A"]
+    with pytest.raises(ValueError, match="Grid 2"):
+        next(grids)
+
+
+def test_iter_puzzles__parses_generated_grids_with_many_pipes(tmp_path):
+    lines = generator.generate(20, 20, 100, seed=2)
+    the_file = tmp_path / "puzzles.txt"
+    the_file.write_text("\n".join(lines + [""] + lines) + "\n", encoding="utf-8")
+    grids = list(parser.iter_puzzles(the_file))
+
+    assert [parser.grid_to_lines(grid) for grid in grids] == [lines, lines]
+
+
+@pytest.mark.parametrize("grid_type", [PipesGrid, CompactPipesGrid])
+def test_parse_from_lines__raises_value_error_if_a_label_is_the_header_prefix(
+    grid_type,
+):
+    with pytest.raises(ValueError, match="not a valid pipe label"):
+        parser.parse_from_lines(["A#A", ";#;"], grid_type=grid_type)
+
+
+def test_iter_puzzles__raises_value_error_if_a_label_is_the_header_prefix(tmp_path):
+    the_file = tmp_path / "puzzles.txt"
+    the_file.write_text("A#A\n#;;\n")
+    with pytest.raises(ValueError, match="Grid 1"):
+        list(parser.iter_puzzles(the_file))
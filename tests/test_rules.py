@@ -0,0 +1,111 @@
+"""Tests for rules.py."""
+
+import pytest
+
+from pipes_game import parser, rules, solver
+from pipes_game.grid import Point
+
+# pylint: disable=missing-class-docstring, missing-function-docstring
+# pylint: disable=too-few-public-methods
+
+
+class TestRules:
+    def test_forced_extension_fills_the_only_unset_neighbor_of_an_endpoint(self):
+        engine = rules.RuleEngine(
+            parser.parse_from_lines(["A#A"]), ["forced-extension"]
+        )
+        assert engine.find_move() == (Point(1, 0), "A")
+
+    def test_dead_end_fills_a_cell_with_only_2_ways_in(self):
+        game_grid = parser.parse_from_lines(["##A", "#B#", "#BA"])
+        engine = rules.RuleEngine(game_grid, ["dead-end"])
+        assert engine.find_move() == (Point(2, 1), "A")
+
+    def test_dead_end_finds_a_cell_with_fewer_than_2_ways_in(self):
+        game_grid = parser.parse_from_lines(["BB##", "####", "#AA#"])
+        engine = rules.RuleEngine(game_grid, ["dead-end"])
+        with pytest.raises(rules.Contradiction, match=r"is a dead end"):
+            engine.find_move()
+
+    def test_reachability_extends_into_the_only_region_leading_to_the_other_end(self):
+        game_grid = parser.parse_from_lines(["##A", "#B#", "#BA"])
+        engine = rules.RuleEngine(game_grid, ["reachability"])
+        assert engine.find_move() == (Point(2, 1), "A")
+
+    def test_reachability_finds_a_pipe_cut_off_from_its_other_end(self):
+        game_grid = parser.parse_from_lines(["###", "#BA", "#AB"])
+        engine = rules.RuleEngine(game_grid, ["reachability"])
+        with pytest.raises(rules.Contradiction, match=r"is cut off"):
+            engine.find_move()
+
+    @pytest.mark.parametrize(
+        ["allow_touching", "move"], [(False, (Point(1, 1), "A")), (True, None)]
+    )
+    def test_forced_extension_waits_if_the_pipe_could_pass_next_to_itself(
+        self, allow_touching, move
+    ):
+        game_grid = parser.parse_from_lines(["A##A", "####"])
+        game_grid.set_cell(Point(0, 1), "A")
+        engine = rules.RuleEngine(game_grid, ["forced-extension"], allow_touching)
+        assert engine.find_move() == move
+
+    def test_no_2x2_finds_a_pipe_filling_a_block(self):
+        game_grid = parser.parse_from_lines(["A##", "###", "A##"])
+        for position in (Point(1, 0), Point(1, 1), Point(0, 1)):
+            game_grid.set_cell(position, "A")
+        assert rules.RuleEngine(game_grid.copy(), ["forced-extension"]).propagate()
+        assert not rules.RuleEngine(game_grid.copy(), ["no-2x2"]).propagate()
+
+
+class TestRuleEngine:
+    def test_propagate_runs_the_rules_to_a_fixpoint(self):
+        game_grid = parser.parse_from_lines(["####C", "#A###", "#C#B#", "B##A#"])
+        engine = rules.RuleEngine(game_grid)
+
+        assert engine.propagate()
+        assert solver.is_solved(game_grid)
+        assert engine.find_move() is None
+
+    def test_hits_are_counted_for_each_rule(self):
+        game_grid = parser.parse_from_lines(["####C", "#A###", "#C#B#", "B##A#"])
+        engine = rules.RuleEngine(game_grid)
+        engine.propagate()
+
+        assert set(engine.hits) == set(rules.DEFAULT_RULES)
+        assert sum(engine.hits.values()) == game_grid.checkpoint()
+
+    def test_registered_rules_can_be_run(self, monkeypatch):
+        monkeypatch.setattr(rules, "RULES", dict(rules.RULES))
+
+        @rules.register_rule("always-fails")
+        class AlwaysFails(rules.GridRule):  # pylint: disable=unused-variable
+            def apply(self):
+                raise rules.Contradiction("Always fails")
+
+        engine = rules.RuleEngine(parser.parse_from_lines(["A#A"]), ["always-fails"])
+        assert not engine.propagate()
+        assert engine.hits == {"always-fails": 1}
+
+    @pytest.mark.parametrize("rule_type", [rules.CellRule, rules.GridRule])
+    def test_a_rule_must_implement_apply(self, rule_type):
+        class NoApply(rule_type):  # pylint: disable=abstract-method
+            pass
+
+        engine = rules.RuleEngine(parser.parse_from_lines(["A#A"]))
+        with pytest.raises(TypeError):
+            NoApply(engine)  # pylint: disable=abstract-class-instantiated
+
+    def test_can_move_now_into_a_cell_with_only_one_way_onward(self):
+        game_grid = parser.parse_from_lines(["A##A", "####"])
+        engine = rules.RuleEngine(game_grid, allow_touching=True)
+        assert engine.can_move_now(Point(1, 0), "A") is False
+        game_grid.set_cell(Point(0, 1), "A")
+        game_grid.set_cell(Point(1, 1), "A")
+        assert engine.can_move_now(Point(2, 1), "A") is False
+        game_grid.set_cell(Point(1, 0), "A")
+        assert engine.can_move_now(Point(2, 0), "A") is False
+        assert engine.can_move_now(Point(2, 1), "A") is True
+
+    def test_value_error_is_raised_for_an_unknown_rule(self):
+        with pytest.raises(ValueError, match=r"Unknown rule 'nope'"):
+            rules.RuleEngine(parser.parse_from_lines(["A#A"]), ["nope"])
@@ -0,0 +1,91 @@
+"""Tests for sat.py."""
+
+import pytest
+
+from pipes_game import parser, sat, solver
+from pipes_game.grid import Point
+
+# pylint: disable=missing-function-docstring
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["A#A", "B#B"],
+        ["B###", "#AB#", "###A"],
+        ["BA#C", "####", "##A#", "B##C"],
+        ["####C", "#A###", "#C#B#", "B##A#"],
+    ],
+)
+def test_solve__solves_the_grid(lines):
+    game_grid = parser.parse_from_lines(lines)
+    solution = sat.SatSolver().solve(game_grid)
+    assert solver.is_solved(solution)
+    assert parser.grid_to_lines(solution) == parser.grid_to_lines(
+        solver.solve(game_grid)
+    )
+
+
+def test_solve__rules_out_cycles_away_from_the_pipes():
+    # The free cells in the middle could otherwise make a cycle of their own
+    game_grid = parser.parse_from_lines(["A####", "#####", "#####", "#####", "####A"])
+    search = sat.SatSolver()
+    assert solver.is_solved(search.solve(game_grid))
+
+
+def test_solve__finds_paths_which_extend_both_endpoints_in_turn():
+    # Pipe A must pass next to itself, and can only be drawn in certain orders
+    game_grid = parser.parse_from_lines(["####A", "#####", "#####", "####B", "A###B"])
+    assert solver.is_solved(sat.SatSolver().solve(game_grid))
+
+
+def test_solve__leaves_the_game_grid_unchanged():
+    game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+    sat.SatSolver().solve(game_grid)
+    assert parser.grid_to_lines(game_grid) == ["B###", "#AB#", "###A"]
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["A#B", "###", "B#A"],
+        ["ABA", "CBC", "###"],
+        # The only path is a spiral, which is complete as soon as it is started
+        ["A##", "#A#", "###"],
+    ],
+)
+def test_solve__raises_if_there_is_no_solution(lines):
+    with pytest.raises(solver.UnsolvableError):
+        sat.SatSolver().solve(parser.parse_from_lines(lines))
+
+
+def test_solve__gives_up_at_the_node_limit():
+    search = sat.SatSolver(max_nodes=0)
+    with pytest.raises(solver.SearchLimitError, match="0 search nodes"):
+        search.solve(parser.parse_from_lines(["BA#C", "####", "##A#", "B##C"]))
+    assert search.nodes == 0
+
+
+@pytest.mark.parametrize(
+    ["points", "expected"],
+    [
+        (
+            [(0, 0), (1, 0), (2, 0), (2, 1), (1, 1), (0, 1), (0, 2), (1, 2), (2, 2)],
+            True,
+        ),
+        (
+            [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2), (0, 2), (0, 1), (1, 1)],
+            False,
+        ),
+    ],
+)
+def test_can_be_drawn(points, expected):
+    game_grid = parser.parse_from_lines(["###", "###", "###"])
+    path = [game_grid.to_index(Point(*point)) for point in points]
+    assert sat.can_be_drawn(game_grid, path) == expected
+
+
+def test_follow_edges__stops_at_an_endpoint_or_back_at_the_start():
+    used = {0: [1], 1: [0, 2], 2: [1], 3: [4, 5], 4: [3, 5], 5: [4, 3]}
+    assert sat.follow_edges(used, 0) == [0, 1, 2]
+    assert sat.follow_edges(used, 3) == [3, 4, 5]
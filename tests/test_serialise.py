@@ -0,0 +1,122 @@
+"""Tests for serialise.py."""
+
+import numpy
+import pytest
+
+from pipes_game import parser, serialise
+from pipes_game.grid import CompactPipesGrid, PipesGrid, Point
+
+# pylint: disable=missing-function-docstring
+
+LINES = ["A##B", "####", "A#CB", "C###"]
+
+
+@pytest.fixture(name="partial_grid")
+def _partial_grid() -> CompactPipesGrid:
+    """Return a grid which is partly solved.
+
+    :returns: the grid
+    """
+    grid = parser.parse_from_lines(LINES, grid_type=CompactPipesGrid)
+    grid.set_cell(Point(0, 1), "A")
+    grid.set_cell(Point(3, 1), "B")
+    grid.set_cell(Point(2, 1), "B")
+    return grid
+
+
+@pytest.mark.parametrize("grid_type", [PipesGrid, CompactPipesGrid])
+def test_loads__restores_the_state_of_a_partly_solved_grid(partial_grid, grid_type):
+    grid = serialise.loads(serialise.dumps(partial_grid), grid_type=grid_type)
+
+    assert type(grid) is grid_type  # pylint: disable=unidiomatic-typecheck
+    assert grid.array == partial_grid.array
+    assert grid.pipe_labels == partial_grid.pipe_labels
+    assert grid.pipe_endpoints == partial_grid.pipe_endpoints
+    assert grid.get_moves() == partial_grid.get_moves()
+    assert grid.zobrist_hash == partial_grid.zobrist_hash
+    assert grid.count_free_neighbors(Point(1, 1)) == 2
+
+    grid.rollback(1)
+    assert parser.grid_to_lines(grid) == ["A##B", "A###", "A#CB", "C###"]
+
+
+def test_dumps__can_leave_out_the_moves(partial_grid):
+    grid = serialise.loads(serialise.dumps(partial_grid, include_moves=False))
+    assert grid.array == partial_grid.array
+    assert not grid.get_moves()
+
+
+def test_dumps__converts_other_grid_types(partial_grid):
+    pipes_grid = PipesGrid(
+        partial_grid.num_cols,
+        partial_grid.num_rows,
+        partial_grid.array,
+        set(partial_grid.pipe_labels),
+        partial_grid.pipe_endpoints,
+        partial_grid.get_moves(),
+    )
+    assert serialise.dumps(pipes_grid) == serialise.dumps(partial_grid)
+
+
+def test_dumps__aligns_the_cell_codes_to_be_read_with_numpy(partial_grid):
+    data = serialise.dumps(partial_grid)
+    offset = serialise.HEADER.size + serialise.ALIGNMENT
+    codes = numpy.frombuffer(data, numpy.uint8, count=16, offset=offset)
+    assert codes.tolist() == partial_grid.codes.tolist()
+
+
+@pytest.mark.parametrize(
+    "num_labels,dtype",
+    [(300, numpy.uint16), (40000, numpy.uint16), (70000, numpy.int32)],
+)
+def test_dumps__stores_wide_codes_if_there_are_many_labels(num_labels, dtype):
+    labels = [chr(0x10000 + i) for i in range(num_labels)]
+    grid = CompactPipesGrid(
+        2, num_labels, [[label, label] for label in labels], set(labels)
+    )
+
+    loaded = serialise.loads(serialise.dumps(grid))
+    assert loaded.codes.dtype == dtype
+    assert loaded.array == grid.array
+
+
+def test_load__reads_a_file_from_dump(partial_grid, tmp_path):
+    the_file = tmp_path / "grid.pipes"
+    serialise.dump(partial_grid, the_file)
+
+    grid = serialise.load(the_file)
+    assert grid.array == partial_grid.array
+    assert grid.get_moves() == partial_grid.get_moves()
+
+
+@pytest.mark.parametrize(
+    "data,message",
+    [
+        (b"", "not a serialised grid"),
+        (b"PIPS" + bytes(20), "not a serialised grid"),
+        (serialise.MAGIC + b"\x02\x00" + bytes(18), "version 2"),
+    ],
+)
+def test_loads__raises_value_error_if_not_a_grid_of_this_version(data, message):
+    with pytest.raises(ValueError, match=message):
+        serialise.loads(data)
+
+
+def test_loads__raises_value_error_if_truncated(partial_grid):
+    data = serialise.dumps(partial_grid)
+    with pytest.raises(ValueError, match="truncated"):
+        serialise.loads(data[:-1])
+
+
+def test_loads__raises_value_error_if_a_code_is_out_of_range(partial_grid):
+    data = bytearray(serialise.dumps(partial_grid))
+    data[serialise.HEADER.size + serialise.ALIGNMENT] = 4
+    with pytest.raises(ValueError, match="cell code"):
+        serialise.loads(bytes(data))
+
+
+def test_load__raises_value_error_if_the_file_is_empty(tmp_path):
+    the_file = tmp_path / "grid.pipes"
+    the_file.write_bytes(b"")
+    with pytest.raises(ValueError):
+        serialise.load(the_file)
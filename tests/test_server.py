@@ -0,0 +1,152 @@
+"""Tests for server.py."""
+
+import asyncio
+import json
+import pathlib
+import tempfile
+
+import pytest
+
+from pipes_game import server
+
+# pylint: disable=missing-function-docstring
+
+SOLVABLE = "A#A\nB#B"
+UNSOLVABLE = "A#B\n###\nB#A"
+
+
+@pytest.fixture(name="socket_path")
+def _socket_path():
+    """Return a path for a Unix socket, which must be short.
+
+    :returns: the path
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        yield pathlib.Path(directory) / "pipes.sock"
+
+
+async def _send(socket_path, *requests):
+    """Send requests to a server on one connection, and read all of the responses.
+
+    :param socket_path: the path of the server's socket
+    :param requests: the requests, which are sent as JSON unless they are strings
+
+    :returns: the responses
+    """
+    reader, writer = await asyncio.open_unix_connection(
+        str(socket_path), limit=server.DEFAULT_MAX_REQUEST_BYTES
+    )
+    for request in requests:
+        line = request if isinstance(request, str) else json.dumps(request)
+        writer.write(line.encode() + b"\n")
+    writer.write_eof()
+    responses = [json.loads(line) async for line in reader]
+    writer.close()
+    return responses
+
+
+def _serve(solve_server, *requests):
+    """Start a server, send it requests, and stop it.
+
+    :param solve_server: the server
+    :param requests: the requests
+
+    :returns: the responses
+    """
+
+    async def run() -> list:
+        """Serve the requests.
+
+        :returns: the responses
+        """
+        await solve_server.start()
+        try:
+            return await _send(solve_server.socket_path, *requests)
+        finally:
+            await solve_server.close()
+
+    return asyncio.run(run())
+
+
+def test_server__solves_each_grid(socket_path):
+    responses = _serve(
+        server.SolveServer(socket_path, workers=1),
+        {"id": 1, "grid": SOLVABLE},
+        {"id": 2, "grid": UNSOLVABLE},
+    )
+    by_id = {response["id"]: response for response in responses}
+    assert by_id[1]["status"] == "solved"
+    assert by_id[1]["solution"] == ["AAA", "BBB"]
+    assert by_id[2]["status"] == "unsolvable"
+    assert all(response["seconds"] >= 0 for response in responses)
+    assert not socket_path.exists()
+
+
+def test_server__coalesces_requests_for_the_same_grid(socket_path):
+    responses = _serve(
+        server.SolveServer(socket_path, workers=1),
+        {"id": 1, "grid": SOLVABLE},
+        {"id": 2, "grid": SOLVABLE},
+        {"command": "stats"},
+    )
+    stats = next(response for response in responses if "requests" in response)
+    assert (stats["requests"], stats["coalesced"]) == (2, 1)
+    solutions = [response["solution"] for response in responses if "id" in response]
+    assert solutions == [["AAA", "BBB"], ["AAA", "BBB"]]
+
+
+def test_server__reports_the_latency(socket_path):
+    solve_server = server.SolveServer(socket_path, workers=1, queue_size=1)
+
+    async def run() -> dict:
+        """Solve some grids, and then get the stats.
+
+        :returns: the stats
+        """
+        await solve_server.start()
+        try:
+            await _send(socket_path, {"grid": SOLVABLE}, {"grid": UNSOLVABLE})
+            (stats,) = await _send(socket_path, {"command": "stats"})
+            return stats
+        finally:
+            await solve_server.close()
+
+    stats = asyncio.run(run())
+    assert stats["queue_depth"] == stats["in_flight"] == 0
+    assert stats["latency"]["count"] == 2
+    assert 0 <= stats["latency"]["p50"] <= stats["latency"]["max"]
+
+
+def test_server__rejects_invalid_requests(socket_path):
+    responses = _serve(
+        server.SolveServer(socket_path, workers=1),
+        "not json",
+        {"id": 3},
+        {"id": 4, "grid": "A#A\nB#"},
+    )
+    assert [response["status"] for response in responses] == ["invalid"] * 3
+    assert [response.get("id") for response in responses] == [None, 3, 4]
+
+
+def test_server__rejects_requests_which_are_too_long(socket_path):
+    responses = _serve(
+        server.SolveServer(socket_path, workers=1, max_request_bytes=64),
+        {"id": 1, "grid": "A" + "#" * 100 + "A"},
+        {"id": 2, "grid": SOLVABLE},
+    )
+    assert responses[0]["status"] == "invalid"
+    assert "longer than 64 bytes" in responses[0]["error"]
+    assert responses[1]["id"] == 2
+    assert responses[1]["status"] == "solved"
+
+
+def test_server__solves_grids_larger_than_the_default_line_limit(socket_path):
+    labels = [chr(0x100 + i) for i in range(256)]
+    grid = "\n".join(label + "#" * 254 + label for label in labels)
+    (response,) = _serve(server.SolveServer(socket_path, workers=1), {"grid": grid})
+    assert response["status"] == "solved"
+
+
+def test_init__rejects_an_empty_queue(socket_path):
+    with pytest.raises(ValueError):
+        server.SolveServer(socket_path, queue_size=0)
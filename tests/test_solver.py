@@ -0,0 +1,176 @@
+"""Tests for solver.py."""
+
+import random
+
+import pytest
+
+from pipes_game import parser, sat, solver
+from pipes_game.grid import UNSET, Point
+
+# pylint: disable=missing-class-docstring, missing-function-docstring
+
+
+class TestIterSolve:
+    def test_fills_the_only_unset_neighbor_of_an_endpoint(self):
+        game_grid = parser.parse_from_lines(["A#A"])
+        solver.iter_solve(game_grid)
+        assert game_grid.array == [["A", "A", "A"]]
+
+    def test_runtime_error_is_raised_if_there_is_no_forced_move(self):
+        game_grid = parser.parse_from_lines(["A##", "###", "##A"])
+        with pytest.raises(RuntimeError, match=r"Could find a solve!"):
+            solver.iter_solve(game_grid)
+
+
+class TestSolve:
+    @pytest.mark.parametrize(
+        ["lines"],
+        [
+            (["A#A", "B#B"],),
+            (["A#C#", "B###", "#BAC"],),
+            (["####AB", "#D#AB#", "#####C", "#####D", "#####C"],),
+            (["B###", "#AB#", "###A"],),
+            (["####C", "#A###", "#C#B#", "B##A#"],),
+            # Each of these pipes has to pass next to itself, and can only be drawn
+            # by extending its endpoints in a certain order
+            (["A##A", "####"],),
+            (["A##", "###", "##A"],),
+            (["####A", "#####", "#####", "####B", "A###B"],),
+        ],
+    )
+    def test_returns_a_solved_grid(self, lines):
+        game_grid = parser.parse_from_lines(lines)
+        solution = solver.solve(game_grid)
+
+        assert solution.is_complete()
+        assert all(value != UNSET for _, value in solution)
+
+    @pytest.mark.parametrize(["decompose"], [(False,), (True,)])
+    def test_finds_a_solution_whenever_the_sat_solver_does(self, decompose):
+        rng = random.Random(0)
+        for _ in range(200):
+            num_cols, num_rows = rng.choice([(3, 3), (4, 3), (4, 4)])
+            cells = rng.sample(range(num_cols * num_rows), 2 * rng.randint(1, 3))
+            lines = [["#"] * num_cols for _ in range(num_rows)]
+            for i, cell in enumerate(cells):
+                lines[cell // num_cols][cell % num_cols] = "ABC"[i // 2]
+            game_grid = parser.parse_from_lines(["".join(line) for line in lines])
+
+            answers = []
+            for search in (solver.SearchSolver(decompose=decompose), sat.SatSolver()):
+                try:
+                    answers.append(solver.is_solved(search.solve(game_grid)))
+                except solver.UnsolvableError:
+                    answers.append(False)
+            assert answers[0] == answers[1], parser.grid_to_lines(game_grid)
+
+    def test_input_grid_is_not_modified(self):
+        game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+        solver.solve(game_grid)
+        assert game_grid.array[0] == ["B", UNSET, UNSET, UNSET]
+
+    @pytest.mark.parametrize(
+        ["lines"],
+        [
+            (["A#B", "###", "B#A"],),
+            (["A#A", "###"],),
+            (["AB", "BA"],),
+        ],
+    )
+    def test_unsolvable_error_is_raised_if_there_is_no_solution(self, lines):
+        game_grid = parser.parse_from_lines(lines)
+        with pytest.raises(solver.UnsolvableError, match=r"Game grid has no solution"):
+            solver.solve(game_grid)
+
+    def test_search_limit_error_is_raised_if_out_of_nodes(self):
+        game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+        with pytest.raises(solver.SearchLimitError, match=r"after 1 search nodes"):
+            solver.solve(game_grid, max_nodes=1)
+
+    def test_search_limit_error_is_raised_if_out_of_time(self):
+        game_grid = parser.parse_from_lines(["####C", "#A###", "#C#B#", "B##A#"])
+        with pytest.raises(solver.SearchLimitError, match=r"after 0 seconds"):
+            solver.solve(game_grid, timeout=0)
+
+    def test_observer_is_called_after_each_move(self):
+        game_grid = parser.parse_from_lines(["B###", "#AB#", "###A"])
+        moves = []
+        solution = solver.SearchSolver(
+            observer=lambda grid_: moves.append(grid_.checkpoint())
+        ).solve(game_grid)
+
+        assert moves[-1] == solution.checkpoint() == 8
+
+    @pytest.mark.parametrize(["check_connectivity"], [(False,), (True,)])
+    def test_connectivity_check_cuts_the_search(self, check_connectivity):
+        game_grid = parser.parse_from_lines(["A#B#A", "##B##"])
+        search = solver.SearchSolver(
+            check_connectivity=check_connectivity, rules=["forced-extension"]
+        )
+        with pytest.raises(solver.UnsolvableError):
+            search.solve(game_grid)
+        # One node for each pass, with and without pipes passing next to themselves
+        assert (search.nodes == 2) is check_connectivity
+
+    def test_deduction_rules_cut_the_search(self):
+        game_grid = parser.parse_from_lines(["####C", "#A###", "#C#B#", "B##A#"])
+        with_rules = solver.SearchSolver()
+        without_rules = solver.SearchSolver(rules=["forced-extension"])
+        for search in (with_rules, without_rules):
+            search.solve(game_grid)
+
+        assert with_rules.rule_hits["dead-end"] > 0
+        assert with_rules.nodes < without_rules.nodes
+
+    @pytest.mark.parametrize(
+        ["right", "is_solvable"],
+        [
+            (["ED#F", "####", "##D#", "E##F"], True),
+            (["D##E", "####", "####", "E##D"], False),
+        ],
+    )
+    def test_decompose_searches_each_component_separately(self, right, is_solvable):
+        left = ["BA#C", "####", "##A#", "B##C"]
+        lines = [a + wall + b for a, wall, b in zip(left, "WWXX", right)]
+        game_grid = parser.parse_from_lines(lines)
+        search = solver.SearchSolver(decompose=True)
+        if is_solvable:
+            assert solver.is_solved(search.solve(game_grid))
+        else:
+            with pytest.raises(solver.UnsolvableError):
+                search.solve(game_grid)
+
+    def test_decompose_keeps_to_the_node_limit(self):
+        left = ["BA#C", "####", "##A#", "B##C"]
+        lines = [a + wall + a.lower() for a, wall in zip(left, "WWXX")]
+        search = solver.SearchSolver(max_nodes=4, decompose=True)
+        with pytest.raises(solver.SearchLimitError, match=r"after 4 search nodes"):
+            search.solve(parser.parse_from_lines(lines))
+
+    def test_transposition_table_skips_refuted_states(self):
+        game_grid = parser.parse_from_lines(
+            ["##A##", "B####", "#####", "####A", "#B###"]
+        )
+        options = {"rules": ["forced-extension"], "allow_touching": False}
+        with_table = solver.SearchSolver(**options)
+        without_table = solver.SearchSolver(table_size=None, **options)
+        for search in (with_table, without_table):
+            with pytest.raises(solver.UnsolvableError):
+                search.solve(game_grid)
+
+        assert without_table.table is None
+        assert with_table.table.hits > 0
+        assert with_table.nodes < without_table.nodes
+
+
+class TestGetMostConstrainedBranch:
+    def test_extends_the_endpoint_with_fewest_options(self):
+        game_grid = parser.parse_from_lines(["A###", "####", "###A"])
+        pipe, options = solver.get_most_constrained_branch(game_grid)
+        assert (pipe, options) == ("A", [Point(1, 0), Point(0, 1)])
+
+    def test_extends_both_endpoints_of_a_pipe(self):
+        game_grid = parser.parse_from_lines(["A###", "####", "###A"])
+        pipe, options = solver.get_most_constrained_branch(game_grid, both_ends=True)
+        assert pipe == "A"
+        assert set(options) == {Point(1, 0), Point(0, 1), Point(3, 1), Point(2, 2)}
@@ -0,0 +1,65 @@
+"""Tests that the solver path starts quickly, without the GUI or rendering stack."""
+
+import subprocess
+import sys
+
+import pytest
+
+# pylint: disable=missing-function-docstring
+
+# Modules which are slow to import, or need a display stack to be installed
+HEAVY_MODULES = {"cairo", "cv2", "gi", "numpy"}
+
+# A generous limit on the time to import the solver path, in microseconds
+MAX_IMPORT_MICROSECONDS = 250_000
+
+
+def _import_in_subprocess(code: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter, reporting the time taken by imports.
+
+    :param code: the code to run
+
+    :returns: the completed process
+    """
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize(
+    ["module"],
+    [
+        ("pipes_game.parser",),
+        ("pipes_game.grid",),
+        ("pipes_game.solver",),
+        ("pipes_game.batch",),
+        ("pipes_game.__main__",),
+    ],
+)
+def test_solver_path_only_imports_the_standard_library(module):
+    result = _import_in_subprocess(
+        f"import sys, {module}; print(' '.join(sorted(sys.modules)))"
+    )
+    assert not HEAVY_MODULES & set(result.stdout.split())
+
+
+def test_solver_path_imports_quickly():
+    result = _import_in_subprocess(
+        "import pipes_game.parser, pipes_game.grid, pipes_game.solver"
+    )
+    # Each line of the report is "import time: self [us] | cumulative | module", with
+    # the module name indented by one space per level of nesting
+    rows = [
+        line.split("|")
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    ]
+    cumulative = sum(
+        int(row[1])
+        for row in rows
+        if row[2].startswith(" pipes_game") and not row[2].startswith("  ")
+    )
+    assert cumulative < MAX_IMPORT_MICROSECONDS
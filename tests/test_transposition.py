@@ -0,0 +1,40 @@
+"""Tests for transposition.py."""
+
+import pytest
+
+from pipes_game import transposition
+
+# pylint: disable=missing-function-docstring
+
+
+def test_lookups_are_counted_as_hits_or_misses():
+    table = transposition.TranspositionTable(4)
+    table.add(1)
+
+    assert 1 in table
+    assert 2 not in table
+    assert 1 in table
+    assert (table.hits, table.misses) == (2, 1)
+    assert table.hit_rate == pytest.approx(2 / 3)
+
+
+def test_least_recently_used_hash_is_evicted_when_full():
+    table = transposition.TranspositionTable(2)
+    table.add(1)
+    table.add(2)
+    assert 1 in table
+    table.add(3)
+
+    assert len(table) == 2
+    assert 1 in table
+    assert 2 not in table
+    assert 3 in table
+
+
+def test_hit_rate_is_0_without_lookups():
+    assert transposition.TranspositionTable(1).hit_rate == 0
+
+
+def test_value_error_is_raised_if_max_size_is_less_than_1():
+    with pytest.raises(ValueError, match=r"at least 1 hash"):
+        transposition.TranspositionTable(0)